@@ -2,8 +2,13 @@
 Text2Mind - A tool to convert text to XMind mind maps and export them as PNG images.
 """
 
-from .parser import parse_text
-from .xmind_generator import create_xmind_from_structure, export_xmind_to_png
+from .parser import parse_text, parse_stream, parse_file, iter_outline_events
+from .compact_tree import CompactTree
+from .incremental import parse_document, reparse
+from .bucketing import bucket_fanouts
+from .xmind_generator import create_xmind_from_structure, export_xmind_to_png, export_xmind_to_svg, render_structure
+from .svg import export_svg
+from .xmind_reader import read_xmind, iter_xmind_events
 from .main import convert, batch_convert
 
 __version__ = '0.1.0' 
\ No newline at end of file
@@ -0,0 +1,269 @@
+"""
+Zip archive helpers: compression strategies, pre-compressed members and
+parallel deflate for large members.
+"""
+
+import os
+import sys
+import logging
+import time
+import zlib
+import zipfile
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger("archive")
+
+# 预压缩只做一次，所以使用最高压缩级别
+PRECOMPRESS_LEVEL = 9
+
+# 压缩策略: 名称 -> (压缩方式, 压缩级别)，级别为 None 时使用 zlib 默认级别
+COMPRESSION_STRATEGIES = {
+    "stored": (zipfile.ZIP_STORED, None),
+    "fast": (zipfile.ZIP_DEFLATED, 1),
+    "balanced": (zipfile.ZIP_DEFLATED, None),
+    "max": (zipfile.ZIP_DEFLATED, 9),
+    # 大条目分块并行压缩，其余条目与 balanced 相同
+    "parallel": (zipfile.ZIP_DEFLATED, None),
+}
+DEFAULT_COMPRESSION = "balanced"
+
+# 并行压缩的分块大小和使用的压缩级别
+PARALLEL_BLOCK_SIZE = 1024 * 1024
+PARALLEL_LEVEL = 6
+
+# deflate 回溯窗口大小，用上一块的末尾作为下一块的预设字典
+DEFLATE_WINDOW = 32 * 1024
+
+# 结束 deflate 流的空的最终块
+DEFLATE_FINAL_BLOCK = b'\x03\x00'
+
+# ZIP 格式能表示的最早时间
+ZIP_EPOCH = (1980, 1, 1, 0, 0, 0)
+
+# 直接复制预压缩数据要用到 ZipFile 的内部属性，只在验证过的 CPython 版本上使用，
+# 其余情况退回到 writestr（先解压再重新压缩）
+RAW_COPY_VERSIONS = ((3, 6), (3, 14))
+RAW_COPY_ATTRIBUTES = ('fp', '_writing', '_lock', '_seekable', 'start_dir', '_writecheck', '_didModify',
+                       'filelist', 'NameToInfo')
+
+class PrecompressedEntry:
+    """
+    A zip member whose data was raw-deflated ahead of time.
+
+    Attributes:
+        name (str): The member name inside the archive.
+        compressed (bytes): The raw deflate stream (no zlib header).
+        file_size (int): Size of the uncompressed data.
+        crc (int): CRC-32 of the uncompressed data.
+    """
+
+    def __init__(self, name, compressed, file_size, crc):
+        self.name = name
+        self.compressed = compressed
+        self.file_size = file_size
+        self.crc = crc
+
+def get_compression(strategy):
+    """
+    Return the ZipFile compression arguments for a compression strategy.
+
+    Args:
+        strategy (str): One of COMPRESSION_STRATEGIES.
+
+    Returns:
+        tuple: (compression, compresslevel) for zipfile.ZipFile.
+    """
+    if strategy not in COMPRESSION_STRATEGIES:
+        raise ValueError(f"Unknown compression strategy: {strategy}")
+    return COMPRESSION_STRATEGIES[strategy]
+
+def zip_date_time(timestamp_ms):
+    """Convert a millisecond Unix timestamp to a ZipInfo date_time tuple (UTC)."""
+    return max(tuple(time.gmtime(timestamp_ms // 1000)[:6]), ZIP_EPOCH)
+
+def member_info(name, compress_type, compresslevel=None, date_time=None):
+    """
+    Return a ZipInfo for a member written with ZipFile.open(zinfo, 'w').
+
+    Args:
+        name (str): The member name.
+        compress_type (int): zipfile.ZIP_STORED or zipfile.ZIP_DEFLATED.
+        compresslevel (int): zlib level, None for the default.
+        date_time (tuple): Modification time of the member, defaults to now.
+
+    Returns:
+        zipfile.ZipInfo: The member info.
+    """
+    zinfo = zipfile.ZipInfo(name, date_time or time.localtime(time.time())[:6])
+    zinfo.compress_type = compress_type
+    if hasattr(zinfo, 'compress_level'):
+        # Python 3.13 起是公开属性
+        zinfo.compress_level = compresslevel
+    else:
+        zinfo._compresslevel = compresslevel
+    zinfo.external_attr = 0o600 << 16
+    return zinfo
+
+def precompress(name, data, level=PRECOMPRESS_LEVEL):
+    """
+    Raw-deflate data once so it can be copied into many archives.
+
+    Args:
+        name (str): The member name inside the archive.
+        data (str | bytes): The member data; str is encoded as UTF-8.
+        level (int): zlib compression level.
+
+    Returns:
+        PrecompressedEntry: The compressed member.
+    """
+    if isinstance(data, str):
+        data = data.encode('utf-8')
+    compressor = zlib.compressobj(level, zlib.DEFLATED, -15)
+    compressed = compressor.compress(data) + compressor.flush()
+    return PrecompressedEntry(name, compressed, len(data), zlib.crc32(data))
+
+def can_copy_raw(zipf):
+    """Return whether write_precompressed can append raw deflate data to this ZipFile."""
+    low, high = RAW_COPY_VERSIONS
+    return (sys.implementation.name == 'cpython' and low <= sys.version_info[:2] < high
+            and all(hasattr(zipf, name) for name in RAW_COPY_ATTRIBUTES))
+
+def write_precompressed(zipf, entry, date_time=None):
+    """
+    Append a pre-compressed member to an open ZipFile without recompressing it.
+
+    The local header is written with the known sizes and CRC, followed by the
+    stored deflate stream, exactly as ZipFile.writestr would lay it out. This
+    relies on ZipFile internals, so on Python versions where they were not
+    verified (see can_copy_raw) the member is decompressed and written with
+    ZipFile.writestr instead.
+
+    Args:
+        zipf (zipfile.ZipFile): An archive opened for writing.
+        entry (PrecompressedEntry): The member to copy.
+        date_time (tuple): Modification time of the member, defaults to now.
+    """
+    zinfo = zipfile.ZipInfo(entry.name, date_time or time.localtime(time.time())[:6])
+    zinfo.compress_type = zipfile.ZIP_DEFLATED
+    zinfo.external_attr = 0o600 << 16
+    zinfo.file_size = entry.file_size
+    zinfo.compress_size = len(entry.compressed)
+    zinfo.CRC = entry.crc
+
+    if not can_copy_raw(zipf):
+        zipf.writestr(zinfo, zlib.decompress(entry.compressed, -15), compresslevel=PRECOMPRESS_LEVEL)
+        return
+
+    if zipf._writing:
+        raise ValueError("Can't write to the ZIP file while there is another write handle open on it.")
+
+    with zipf._lock:
+        if zipf._seekable:
+            zipf.fp.seek(zipf.start_dir)
+        zinfo.header_offset = zipf.fp.tell()
+        zipf._writecheck(zinfo)
+        zipf._didModify = True
+        zipf.fp.write(zinfo.FileHeader(False))
+        zipf.fp.write(entry.compressed)
+        zipf.filelist.append(zinfo)
+        zipf.NameToInfo[zinfo.filename] = zinfo
+        zipf.start_dir = zipf.fp.tell()
+
+def _deflate_block(block, dictionary, level):
+    """Raw-deflate one block, primed with the preceding data, ending on a byte boundary."""
+    if dictionary:
+        compressor = zlib.compressobj(level, zlib.DEFLATED, -15, zdict=dictionary)
+    else:
+        compressor = zlib.compressobj(level, zlib.DEFLATED, -15)
+    return compressor.compress(block) + compressor.flush(zlib.Z_SYNC_FLUSH)
+
+class ParallelCompressor:
+    """
+    Raw deflate compressor that compresses independent blocks on a thread pool.
+
+    Has the compress()/flush() interface of zlib.compressobj. Input is cut
+    into blocks; each block is primed with the last 32 KiB of the previous
+    one and ends with a sync flush, so the compressed blocks concatenate into
+    a single valid deflate stream (the same scheme pigz uses). zlib releases
+    the GIL while compressing, so blocks are deflated concurrently.
+    """
+
+    def __init__(self, level=PARALLEL_LEVEL, block_size=PARALLEL_BLOCK_SIZE, workers=None):
+        self.level = level
+        self.block_size = block_size
+        self.workers = workers or os.cpu_count() or 1
+        self._executor = ThreadPoolExecutor(max_workers=self.workers)
+        self._pending = bytearray()
+        self._dictionary = b''
+        self._futures = deque()
+        # 限制排队中的块数，内存占用与输入大小无关
+        self._max_in_flight = self.workers * 2
+
+    def compress(self, data):
+        """Queue data for compression and return the compressed blocks that are ready, in order."""
+        self._pending += data
+        while len(self._pending) >= self.block_size:
+            block = bytes(self._pending[:self.block_size])
+            del self._pending[:self.block_size]
+            self._submit(block)
+        return self._collect(wait=False)
+
+    def flush(self):
+        """Compress the remaining data and return the rest of the stream, including its end."""
+        try:
+            if self._pending:
+                self._submit(bytes(self._pending))
+                self._pending = bytearray()
+            return self._collect(wait=True) + DEFLATE_FINAL_BLOCK
+        finally:
+            self.close()
+
+    def close(self):
+        """Discard the queued blocks and stop the worker threads. Safe to call more than once."""
+        while self._futures:
+            self._futures.popleft().cancel()
+        self._executor.shutdown()
+
+    def __del__(self):
+        # 写入中途出错、flush() 没有被调用时也不遗留线程
+        if hasattr(self, '_executor'):
+            self.close()
+
+    def _submit(self, block):
+        self._futures.append(self._executor.submit(_deflate_block, block, self._dictionary, self.level))
+        self._dictionary = block[-DEFLATE_WINDOW:]
+
+    def _collect(self, wait):
+        output = []
+        futures = self._futures
+        while futures and (wait or futures[0].done() or len(futures) > self._max_in_flight):
+            output.append(futures.popleft().result())
+        return b''.join(output)
+
+def open_parallel_deflated(zipf, name, force_zip64=False, level=PARALLEL_LEVEL, workers=None, date_time=None):
+    """
+    Open a deflated member for writing whose data is compressed by a ParallelCompressor.
+
+    The returned handle behaves like ZipFile.open(name, 'w'); the CRC and sizes
+    are tracked by zipfile as usual, only the compressor is replaced. Where the
+    handle has no replaceable compressor (a zipfile other than CPython's), the
+    member is compressed on the calling thread as usual.
+
+    Args:
+        zipf (zipfile.ZipFile): An archive opened for writing.
+        name (str): The member name.
+        force_zip64 (bool): Passed on to ZipFile.open.
+        level (int): zlib compression level of each block.
+        workers (int): Number of compression threads, defaults to the CPU count.
+        date_time (tuple): Modification time of the member, defaults to now.
+
+    Returns:
+        A writable binary file object for the member.
+    """
+    entry = zipf.open(member_info(name, zipfile.ZIP_DEFLATED, level, date_time), 'w', force_zip64=force_zip64)
+    if not hasattr(entry, '_compressor'):
+        logger.warning("zipfile 不支持替换压缩器，改为单线程压缩")
+        return entry
+    entry._compressor = ParallelCompressor(level, workers=workers)
+    return entry
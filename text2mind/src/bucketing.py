@@ -0,0 +1,170 @@
+"""
+Regrouping of huge sibling fan-outs into synthetic, collapsed bucket topics.
+"""
+
+import logging
+
+try:
+    from .compact_tree import CompactTree, NO_NODE, get_accessors, compute_tree_stats
+except ImportError:
+    # When run directly
+    from compact_tree import CompactTree, NO_NODE, get_accessors, compute_tree_stats
+
+logger = logging.getLogger("bucketing")
+
+# 分组标题：range 为兄弟序号范围（如 "1–100"），alpha 为首尾标题的前缀范围（如 "A–C"）
+BUCKET_MODES = ("range", "alpha")
+DEFAULT_BUCKET_MODE = "range"
+
+# 每个分组（以及任何节点）最多的子主题数
+DEFAULT_BUCKET_SIZE = 100
+
+# alpha 分组标题中前缀的最大长度
+ALPHA_PREFIX_LIMIT = 12
+
+class Bucket:
+    """
+    A synthetic topic grouping a run of original siblings.
+
+    Attributes:
+        first (int): Position of the first grouped sibling.
+        last (int): Position of the last grouped sibling.
+        items (list): Sibling positions (int) or nested Buckets, in order.
+    """
+
+    def __init__(self, items):
+        self.items = items
+        self.first = items[0].first if isinstance(items[0], Bucket) else items[0]
+        self.last = items[-1].last if isinstance(items[-1], Bucket) else items[-1]
+
+def plan_buckets(count, bucket_size):
+    """
+    Group count siblings into nested buckets of at most bucket_size items.
+
+    Buckets are grouped again until no level has more than bucket_size
+    items, so a fan-out of n becomes a tree of depth log(n, bucket_size).
+
+    Args:
+        count (int): Number of siblings.
+        bucket_size (int): Maximum number of items per level.
+
+    Returns:
+        list: The top level items: sibling positions or Buckets.
+    """
+    items = list(range(count))
+    while len(items) > bucket_size:
+        groups = [items[i:i + bucket_size] for i in range(0, len(items), bucket_size)]
+        # 末尾只剩一项时不再单独包一层
+        items = [group[0] if len(group) == 1 else Bucket(group) for group in groups]
+    return items
+
+def range_label(first, last):
+    """Return a bucket title like "1–100" for 0-based sibling positions."""
+    if first == last:
+        return str(first + 1)
+    return f"{first + 1}–{last + 1}"
+
+def alpha_label(first_title, last_title):
+    """
+    Return a bucket title like "A–C" from the first and last grouped titles.
+
+    Both prefixes are one character longer than the part the titles share,
+    so neighbouring buckets of sorted siblings stay distinguishable.
+    """
+    first_title = first_title.strip()
+    last_title = last_title.strip()
+    shared = 0
+    for a, b in zip(first_title.casefold(), last_title.casefold()):
+        if a != b:
+            break
+        shared += 1
+    length = min(shared + 1, ALPHA_PREFIX_LIMIT)
+    start = first_title[:length] or "…"
+    end = last_title[:length] or "…"
+    return start if start == end else f"{start}–{end}"
+
+def bucket_fanouts(structure, bucket_size=DEFAULT_BUCKET_SIZE, mode=DEFAULT_BUCKET_MODE):
+    """
+    Return a copy of the structure in which huge fan-outs are split into buckets.
+
+    Every node with more than bucket_size children gets its children
+    regrouped under synthetic bucket topics of at most bucket_size children,
+    nested as needed so that no node has more than bucket_size children.
+    Sibling order is kept. Bucket topics are marked folded, so XMind and the
+    PNG exporter only lay out the bucket titles until a bucket is expanded.
+
+    Args:
+        structure (dict | CompactTree): The parsed structure.
+        bucket_size (int): Maximum number of children per node, at least 2.
+        mode (str): "range" for titles like "1–100", or "alpha" for titles
+            like "A–C" built from the first and last grouped titles.
+
+    Returns:
+        dict | CompactTree: A new structure of the same kind, with statistics attached.
+    """
+    if mode not in BUCKET_MODES:
+        raise ValueError(f"Unknown bucket mode: {mode}")
+    if bucket_size < 2:
+        raise ValueError(f"Bucket size must be at least 2: {bucket_size}")
+
+    root, title_of, children_of = get_accessors(structure)
+    compact = isinstance(structure, CompactTree)
+
+    if compact:
+        result = CompactTree()
+
+        def add(parent, title, folded=False):
+            index = result.add_node(NO_NODE if parent is None else parent, title)
+            if folded:
+                result.folded.add(index)
+            return index
+    else:
+        result = None
+
+        def add(parent, title, folded=False):
+            node = {"title": title, "topics": []}
+            if folded:
+                node["folded"] = True
+            if parent is not None:
+                parent["topics"].append(node)
+            return node
+
+    def label(bucket, siblings):
+        if mode == "alpha":
+            return alpha_label(title_of(siblings[bucket.first]), title_of(siblings[bucket.last]))
+        return range_label(bucket.first, bucket.last)
+
+    bucket_count = 0
+
+    # 栈中每一项: (原节点或分组, 新的父节点, 分组所属的兄弟列表)；逆序压栈以保持先序编号
+    stack = [(root, None, None)]
+    while stack:
+        item, parent, siblings = stack.pop()
+        if isinstance(item, Bucket):
+            node = add(parent, label(item, siblings), folded=True)
+            bucket_count += 1
+            items = item.items
+        else:
+            node = add(parent, title_of(item))
+            if result is None:
+                result = node
+            siblings = children_of(item)
+            if len(siblings) > bucket_size:
+                items = plan_buckets(len(siblings), bucket_size)
+            else:
+                items = range(len(siblings))
+
+        for position in reversed(items):
+            if isinstance(position, Bucket):
+                stack.append((position, node, siblings))
+            else:
+                stack.append((siblings[position], node, None))
+
+    stats = compute_tree_stats(result)
+    if compact:
+        result.stats = stats
+    else:
+        result["stats"] = stats
+
+    logger.info(f"添加了 {bucket_count} 个分组主题, 每组最多 {bucket_size} 个子主题")
+    return result
@@ -0,0 +1,191 @@
+"""
+Content-addressed on-disk cache of finished XMind files.
+"""
+
+import os
+import json
+import shutil
+import hashlib
+import logging
+import tempfile
+
+try:
+    from .xmind_generator import GENERATOR_VERSION
+except ImportError:
+    # When run directly
+    from xmind_generator import GENERATOR_VERSION
+
+logger = logging.getLogger("conversion_cache")
+
+# 缓存目录和容量上限可以通过环境变量配置
+CACHE_DIR_ENV = "TEXT2MIND_CACHE_DIR"
+CACHE_MAX_BYTES_ENV = "TEXT2MIND_CACHE_MAX_BYTES"
+DEFAULT_CACHE_DIR = os.path.join(tempfile.gettempdir(), 'text2mind', 'cache')
+DEFAULT_CACHE_MAX_BYTES = 256 * 1024 * 1024
+
+# 计算文件哈希时每次读取的块大小
+HASH_BLOCK_SIZE = 1024 * 1024
+
+CACHE_SUFFIX = ".xmind"
+
+class ConversionCache:
+    """
+    Stores finished .xmind files keyed by a hash of (input, options, generator version).
+
+    Entries are plain files in one directory. Their modification time is
+    refreshed on every hit, and the least recently used entries are evicted
+    once the total size exceeds max_bytes.
+    """
+
+    def __init__(self, directory=None, max_bytes=None):
+        self.directory = directory or os.environ.get(CACHE_DIR_ENV) or DEFAULT_CACHE_DIR
+        if max_bytes is None:
+            max_bytes = int(os.environ.get(CACHE_MAX_BYTES_ENV, DEFAULT_CACHE_MAX_BYTES))
+        self.max_bytes = max_bytes
+        os.makedirs(self.directory, exist_ok=True)
+
+    def new_hasher(self, options=None):
+        """
+        Return a hash object already seeded with the generator version and options.
+
+        Feed the input bytes into it and pass hexdigest() to get/put.
+        """
+        hasher = hashlib.sha256()
+        hasher.update(GENERATOR_VERSION.encode('utf-8'))
+        hasher.update(b'\0')
+        hasher.update(json.dumps(options or {}, sort_keys=True).encode('utf-8'))
+        hasher.update(b'\0')
+        return hasher
+
+    def key(self, text, options=None):
+        """
+        Return the cache key for an input text.
+
+        Args:
+            text (str | bytes): The input outline.
+            options (dict): Conversion options that affect the output.
+
+        Returns:
+            str: The hex digest used as cache key.
+        """
+        hasher = self.new_hasher(options)
+        hasher.update(text.encode('utf-8') if isinstance(text, str) else text)
+        return hasher.hexdigest()
+
+    def file_key(self, path, options=None):
+        """Return the cache key for an input file, hashing it block by block."""
+        hasher = self.new_hasher(options)
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(HASH_BLOCK_SIZE), b''):
+                hasher.update(block)
+        return hasher.hexdigest()
+
+    def _entry_path(self, key):
+        return os.path.join(self.directory, key + CACHE_SUFFIX)
+
+    def get(self, key):
+        """
+        Return the cached bytes for key, or None on a miss.
+        """
+        path = self._entry_path(key)
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+        except OSError:
+            return None
+        self._touch(path)
+        logger.info(f"缓存命中: {key}")
+        return data
+
+    def fetch(self, key, output_path):
+        """
+        Copy the cached file for key to output_path.
+
+        Returns:
+            bool: True on a hit, False on a miss.
+        """
+        path = self._entry_path(key)
+        try:
+            shutil.copyfile(path, output_path)
+        except FileNotFoundError:
+            return False
+        self._touch(path)
+        logger.info(f"缓存命中: {key} -> {output_path}")
+        return True
+
+    def put(self, key, data):
+        """Store bytes under key and evict old entries if over budget."""
+        self._store(key, lambda f: f.write(data))
+
+    def put_file(self, key, source_path):
+        """Store a copy of a finished file under key and evict old entries if over budget."""
+        with open(source_path, 'rb') as source:
+            self.put_stream(key, source)
+
+    def put_stream(self, key, fileobj):
+        """
+        Store the rest of a binary file object under key and evict old entries if over budget.
+
+        The caller is responsible for positioning fileobj before and after the call.
+        """
+        self._store(key, lambda f: shutil.copyfileobj(fileobj, f))
+
+    def _store(self, key, write):
+        # 先写临时文件再原子替换，避免并发读到不完整的条目
+        fd, temp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                write(f)
+            os.replace(temp_path, self._entry_path(key))
+        except Exception:
+            try:
+                os.remove(temp_path)
+            except OSError:
+                pass
+            raise
+        logger.debug(f"已缓存: {key}")
+        self.evict()
+
+    def _touch(self, path):
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+
+    def evict(self):
+        """Remove least recently used entries until the cache fits in max_bytes."""
+        entries = []
+        total = 0
+        with os.scandir(self.directory) as it:
+            for entry in it:
+                if not entry.name.endswith(CACHE_SUFFIX):
+                    continue
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+                total += stat.st_size
+
+        if total <= self.max_bytes:
+            return
+
+        entries.sort()
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+                total -= size
+                logger.debug(f"缓存淘汰: {path}")
+            except OSError:
+                pass
+
+_default_cache = None
+
+def get_default_cache():
+    """Return the process-wide cache shared by the CLI and the web app."""
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = ConversionCache()
+    return _default_cache
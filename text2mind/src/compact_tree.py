@@ -0,0 +1,349 @@
+"""
+Compact, array-backed tree representation for very large outlines.
+"""
+
+from array import array
+
+# 表示"没有节点"的索引
+NO_NODE = -1
+
+class CompactTree:
+    """
+    Columnar mind map tree.
+
+    Nodes are numbered in the order they are added (pre-order when built from
+    parser events); node 0 is the root. Structure is kept in flat integer
+    arrays and all titles share one UTF-8 buffer, so a node costs a few dozen
+    bytes instead of a dict plus a list.
+
+    Attributes:
+        parent (array): Parent index per node, NO_NODE for the root.
+        depth (array): Depth per node, 0 for the root.
+        first_child (array): First child index per node or NO_NODE.
+        next_sibling (array): Next sibling index per node or NO_NODE.
+        child_count (array): Number of direct children per node.
+        title_offsets (array): Start offset of each title in title_buffer,
+            with one extra trailing entry marking the end of the last title.
+        title_buffer (bytearray): All titles encoded as UTF-8, back to back.
+        stats (dict): Tree statistics attached by the parser, or None.
+        folded (set): Indices of nodes that start collapsed, e.g. synthetic
+            bucket topics added by bucket_fanouts.
+    """
+
+    def __init__(self):
+        self.parent = array('i')
+        self.depth = array('i')
+        self.first_child = array('i')
+        self.next_sibling = array('i')
+        self.child_count = array('i')
+        self.title_offsets = array('q', [0])
+        self.title_buffer = bytearray()
+        self.stats = None
+        self.folded = set()
+        # 仅用于追加子节点时快速定位最后一个子节点
+        self._last_child = array('i')
+
+    def __len__(self):
+        return len(self.parent)
+
+    def add_node(self, parent, title):
+        """
+        Append a node as the last child of parent.
+
+        Args:
+            parent (int): Parent node index, or NO_NODE to add the root.
+            title (str): The node title.
+
+        Returns:
+            int: The index of the new node.
+        """
+        index = len(self.parent)
+        self.parent.append(parent)
+        self.first_child.append(NO_NODE)
+        self.next_sibling.append(NO_NODE)
+        self.child_count.append(0)
+        self._last_child.append(NO_NODE)
+
+        if parent == NO_NODE:
+            self.depth.append(0)
+        else:
+            self.depth.append(self.depth[parent] + 1)
+            last = self._last_child[parent]
+            if last == NO_NODE:
+                self.first_child[parent] = index
+            else:
+                self.next_sibling[last] = index
+            self._last_child[parent] = index
+            self.child_count[parent] += 1
+
+        self.title_buffer += title.encode('utf-8')
+        self.title_offsets.append(len(self.title_buffer))
+        return index
+
+    def title(self, node):
+        """Return the title of a node as str."""
+        offsets = self.title_offsets
+        return self.title_buffer[offsets[node]:offsets[node + 1]].decode('utf-8')
+
+    def title_size(self, node):
+        """Return the encoded size of a node title in bytes."""
+        return self.title_offsets[node + 1] - self.title_offsets[node]
+
+    def children(self, node):
+        """Return the list of direct child indices of a node."""
+        result = []
+        child = self.first_child[node]
+        while child != NO_NODE:
+            result.append(child)
+            child = self.next_sibling[child]
+        return result
+
+    def iter_children(self, node):
+        """Yield the direct child indices of a node without building a list."""
+        child = self.first_child[node]
+        while child != NO_NODE:
+            yield child
+            child = self.next_sibling[child]
+
+    def append_subtrees(self, parent, other):
+        """
+        Graft the children of another tree's root under a node of this tree.
+
+        The other tree's root itself is dropped; its subtrees keep their order
+        and are appended after the existing children of parent.
+
+        Args:
+            parent (int): The node that receives the subtrees.
+            other (CompactTree): The tree whose root children are copied.
+        """
+        if len(other) <= 1:
+            return
+
+        # other 中的节点 i (i >= 1) 在本树中的索引为 i + offset
+        offset = len(self) - 1
+        depth_shift = self.depth[parent]
+
+        self.parent.extend(array('i', [parent if p == 0 else p + offset for p in other.parent[1:]]))
+        if depth_shift:
+            self.depth.extend(array('i', [d + depth_shift for d in other.depth[1:]]))
+        else:
+            self.depth.extend(other.depth[1:])
+        for target, source in ((self.first_child, other.first_child),
+                               (self.next_sibling, other.next_sibling),
+                               (self._last_child, other._last_child)):
+            target.extend(array('i', [NO_NODE if i == NO_NODE else i + offset for i in source[1:]]))
+        self.child_count.extend(other.child_count[1:])
+
+        # 跳过 other 根节点的标题
+        root_end = other.title_offsets[1]
+        shift = len(self.title_buffer) - root_end
+        self.title_buffer += memoryview(other.title_buffer)[root_end:]
+        self.title_offsets.extend(array('q', [o + shift for o in other.title_offsets[2:]]))
+
+        # 把 other 根节点的子节点链接到 parent 的子节点链表末尾
+        first = other.first_child[0] + offset
+        last = self._last_child[parent]
+        if last == NO_NODE:
+            self.first_child[parent] = first
+        else:
+            self.next_sibling[last] = first
+        self._last_child[parent] = other._last_child[0] + offset
+        self.child_count[parent] += other.child_count[0]
+
+    def nbytes(self):
+        """Approximate memory used by the arrays and the title buffer."""
+        arrays = (self.parent, self.depth, self.first_child, self.next_sibling,
+                  self.child_count, self.title_offsets, self._last_child)
+        return sum(len(a) * a.itemsize for a in arrays) + len(self.title_buffer)
+
+    def to_dict(self, node=0):
+        """
+        Convert the tree (or a subtree) to the nested dict structure.
+
+        Args:
+            node (int): Index of the subtree root.
+
+        Returns:
+            dict: {"title": ..., "topics": [...]} nested dicts.
+        """
+        root = {"title": self.title(node), "topics": []}
+        stack = [(node, root)]
+        while stack:
+            index, out = stack.pop()
+            child = self.first_child[index]
+            while child != NO_NODE:
+                child_out = {"title": self.title(child), "topics": []}
+                out["topics"].append(child_out)
+                stack.append((child, child_out))
+                child = self.next_sibling[child]
+        return root
+
+    @classmethod
+    def from_events(cls, events):
+        """
+        Build a tree from parser open/close events.
+
+        Args:
+            events: Iterable of (kind, depth, title) events from iter_outline_events.
+
+        Returns:
+            CompactTree: The tree, or a single "Empty" node for empty input.
+        """
+        # parser 导入了本模块，事件类型在用到时才导入
+        try:
+            from .parser import OPEN
+        except ImportError:
+            from parser import OPEN
+
+        tree = cls()
+        stack = []
+        for kind, depth, title in events:
+            if kind == OPEN:
+                parent = stack[-1] if stack else NO_NODE
+                stack.append(tree.add_node(parent, title))
+            else:
+                stack.pop()
+
+        if not len(tree):
+            tree.add_node(NO_NODE, "Empty")
+        return tree
+
+    @classmethod
+    def from_structure(cls, structure):
+        """
+        Build a tree from the nested dict structure.
+
+        Args:
+            structure (dict): Dict with 'title' and 'children' or 'topics' keys.
+
+        Returns:
+            CompactTree: The equivalent compact tree.
+        """
+        tree = cls()
+        stack = [(structure, NO_NODE)]
+        while stack:
+            node, parent = stack.pop()
+            index = tree.add_node(parent, node.get('title', ''))
+            # 逆序压栈，保证子节点按原顺序编号
+            for child in reversed(dict_children(node)):
+                stack.append((child, index))
+        return tree
+
+def dict_children(node):
+    """Return the children of a dict node, supporting both 'children' and 'topics' keys."""
+    return node.get('children') or node.get('topics') or []
+
+def dict_title(node):
+    """Return the title of a dict node."""
+    return node.get('title', '')
+
+def dict_folded(node):
+    """Return whether a dict node starts collapsed."""
+    return node.get('folded', False)
+
+def get_accessors(structure):
+    """
+    Return uniform accessors for either a dict structure or a CompactTree.
+
+    Args:
+        structure (dict | CompactTree): The parsed structure.
+
+    Returns:
+        tuple: (root, title_of, children_of), where root is the root node
+        handle and the two functions take a node handle.
+    """
+    if isinstance(structure, CompactTree):
+        return 0, structure.title, structure.children
+    return structure, dict_title, dict_children
+
+def get_child_iterator(structure):
+    """
+    Return a function yielding the children of a node lazily, so that callers
+    which only need the first few children of a huge fan-out stay cheap.
+
+    Args:
+        structure (dict | CompactTree): The parsed structure.
+
+    Returns:
+        callable: Takes a node handle and returns an iterator of child handles.
+    """
+    if isinstance(structure, CompactTree):
+        return structure.iter_children
+    return lambda node: iter(dict_children(node))
+
+def get_folded_test(structure):
+    """
+    Return a function telling whether a node starts collapsed.
+
+    Nodes are marked by transforms such as bucket_fanouts: dict nodes carry
+    "folded": True, CompactTree nodes are listed in tree.folded.
+
+    Args:
+        structure (dict | CompactTree): The parsed structure.
+
+    Returns:
+        callable: Takes a node handle and returns a bool, or None when the
+        structure cannot contain folded nodes.
+    """
+    if isinstance(structure, CompactTree):
+        return structure.folded.__contains__ if structure.folded else None
+    return dict_folded
+
+def empty_stats():
+    """Return a fresh tree statistics dict."""
+    return {
+        "node_count": 0,
+        "max_depth": 0,
+        "max_fanout": 0,
+        "title_bytes": 0,
+        "level_histogram": [],
+    }
+
+def compute_tree_stats(structure):
+    """
+    Compute tree statistics with a single walk over the structure.
+
+    Used for structures that did not come from the parser (which attaches
+    the same statistics while building the tree).
+
+    Args:
+        structure (dict | CompactTree): The parsed structure.
+
+    Returns:
+        dict: node_count, max_depth, max_fanout, title_bytes and level_histogram.
+    """
+    stats = empty_stats()
+    histogram = stats["level_histogram"]
+    root, title_of, children_of = get_accessors(structure)
+    stack = [(root, 0)]
+    while stack:
+        node, depth = stack.pop()
+        children = children_of(node)
+        if depth == len(histogram):
+            histogram.append(0)
+        histogram[depth] += 1
+        stats["title_bytes"] += len(title_of(node).encode('utf-8'))
+        stats["max_fanout"] = max(stats["max_fanout"], len(children))
+        for child in children:
+            stack.append((child, depth + 1))
+    stats["node_count"] = sum(histogram)
+    stats["max_depth"] = len(histogram) - 1
+    return stats
+
+def get_tree_stats(structure):
+    """
+    Return the statistics attached by the parser, computing them if missing.
+
+    Args:
+        structure (dict | CompactTree): The parsed structure.
+
+    Returns:
+        dict: The tree statistics (see compute_tree_stats).
+    """
+    if isinstance(structure, CompactTree):
+        stats = structure.stats
+    else:
+        stats = structure.get("stats")
+    if stats is None:
+        stats = compute_tree_stats(structure)
+    return stats
@@ -0,0 +1,152 @@
+"""
+Process-wide font registry and cached text measurement for the renderers.
+"""
+
+import re
+import logging
+import functools
+from PIL import ImageFont
+
+logger = logging.getLogger("fonts")
+
+# 西文字体候选，依次尝试；Pillow 会在系统字体目录中按文件名查找
+FONT_CANDIDATES = ("Arial", "arial.ttf", "Helvetica.ttc", "DejaVuSans.ttf", "LiberationSans-Regular.ttf")
+
+# 中日韩字体候选，标题含中日韩字符时使用
+CJK_FONT_CANDIDATES = ("NotoSansCJK-Regular.ttc", "NotoSansCJKsc-Regular.otf", "SourceHanSansSC-Regular.otf",
+                       "wqy-microhei.ttc", "wqy-zenhei.ttc", "msyh.ttc", "simhei.ttf", "PingFang.ttc",
+                       "Arial Unicode.ttf")
+
+# 中日韩字符从 CJK 部首补充开始，之前的字符都用西文字体
+CJK_MIN_CHAR = "⺀"
+
+# 换行时的分词：空白、单个中日韩字符（任意两字之间可换行）、其他连续字符
+WRAP_TOKEN_RE = re.compile(r"\s+|[⺀-\U0010ffff]|[^\s⺀-\U0010ffff]+")
+
+# 截断文字时追加的省略号
+ELLIPSIS = "..."
+
+# (字号, 是否中日韩字体) -> {字符: 宽度}
+_glyph_widths = {}
+
+@functools.lru_cache(maxsize=None)
+def find_font(candidates):
+    """Return the first of the candidate font names that can be loaded, or None. Tried once per process."""
+    for name in candidates:
+        try:
+            ImageFont.truetype(name, 12)
+        except OSError:
+            continue
+        logger.info(f"使用字体: {name}")
+        return name
+    return None
+
+@functools.lru_cache(maxsize=None)
+def load_font(name, size):
+    """Load a font by name at a pixel size, or Pillow's default font when name is None."""
+    if name is not None:
+        return ImageFont.truetype(name, size)
+    try:
+        return ImageFont.load_default(size)
+    except TypeError:
+        # Pillow < 10.1 只有固定大小的位图字体
+        return ImageFont.load_default()
+
+def get_font(size, cjk=False):
+    """
+    Return the title font at a pixel size, loaded once per process.
+
+    Args:
+        size (int): Font size in pixels.
+        cjk (bool): Prefer a CJK-capable font; falls back to the regular font.
+    """
+    name = (cjk and find_font(CJK_FONT_CANDIDATES)) or find_font(FONT_CANDIDATES)
+    return load_font(name, size)
+
+def needs_cjk(text):
+    """Return whether a text contains CJK (or other wide-script) characters."""
+    return max(text, default=" ") >= CJK_MIN_CHAR
+
+def font_for_text(text, size):
+    """Return the font a text is drawn with at a size."""
+    return get_font(size, needs_cjk(text))
+
+@functools.lru_cache(maxsize=None)
+def line_height(size):
+    """Return the height of one line of text at a size, high enough for the CJK font too."""
+    height = get_font(size).getbbox("Hg")[3]
+    if find_font(CJK_FONT_CANDIDATES) is not None:
+        height = max(height, get_font(size, True).getbbox("Hg中")[3])
+    return height
+
+def text_width(text, size):
+    """
+    Return the width of a text at a size.
+
+    Widths are summed from per-glyph advances cached per font, so each distinct
+    character is measured by FreeType only once per process (kerning is ignored).
+    """
+    cjk = needs_cjk(text)
+    widths = _glyph_widths.get((size, cjk))
+    if widths is None:
+        widths = _glyph_widths[(size, cjk)] = {}
+    total = 0.0
+    for char in text:
+        width = widths.get(char)
+        if width is None:
+            width = widths[char] = get_font(size, cjk).getlength(char)
+        total += width
+    return total
+
+@functools.lru_cache(maxsize=4096)
+def wrap_text(text, size, max_width):
+    """
+    Break a text into lines no wider than max_width.
+
+    Lines break at whitespace, or between any two CJK characters; words wider
+    than a whole line are broken between characters.
+
+    Args:
+        text (str): The text.
+        size (int): Font size in pixels.
+        max_width (float): Maximum line width in pixels.
+
+    Returns:
+        tuple: The lines, at least one.
+    """
+    lines = []
+    line = ""
+    for token in WRAP_TOKEN_RE.findall(text):
+        if text_width(line + token, size) <= max_width:
+            line += token
+            continue
+        if token.isspace():
+            # 行尾的空白直接丢弃
+            lines.append(line)
+            line = ""
+            continue
+        if line.strip():
+            lines.append(line.rstrip())
+        line = ""
+        # 放不下的词另起一行，比整行还宽时按字符拆开
+        for char in token:
+            if line and text_width(line + char, size) > max_width:
+                lines.append(line)
+                line = ""
+            line += char
+    if line.strip() or not lines:
+        lines.append(line.rstrip())
+    return tuple(lines)
+
+def fit_text(text, size, max_width):
+    """Return text truncated with an ellipsis so that it fits in max_width."""
+    if text_width(text, size) <= max_width:
+        return text
+    limit = max_width - text_width(ELLIPSIS, size)
+    end = 0
+    width = 0.0
+    for end, char in enumerate(text):
+        width += text_width(char, size)
+        if width > limit:
+            break
+    return text[:end].rstrip() + ELLIPSIS
@@ -0,0 +1,264 @@
+"""
+Incremental re-parsing of indented text for live editing.
+"""
+
+import logging
+
+try:
+    from .parser import count_leading_spaces, strip_bullet
+    from .traversal import trees_equal
+except ImportError:
+    # When run directly
+    from parser import count_leading_spaces, strip_bullet
+    from traversal import trees_equal
+
+logger = logging.getLogger("incremental_parser")
+
+class OutlineDocument:
+    """
+    A parsed outline that remembers which line produced which node.
+
+    The tree has the same shape as parse_text() output (without the
+    attached statistics), and can be updated in place by reparse().
+
+    Attributes:
+        tree (dict): The hierarchical structure.
+        lines (list): The source lines.
+        indents (list): Indentation per line, None for blank lines.
+        nodes (list): The node dict created by each line, None for blank lines.
+    """
+
+    def __init__(self, text=""):
+        self.lines = []
+        self.indents = []
+        self.nodes = []
+        self.tree = None
+        self.root_line = None
+        # id(node) -> (parent node, indentation)，根节点的缩进记为 -1
+        self._info = {}
+        self._parse_all(text.split("\n"))
+
+    def _parse_all(self, lines):
+        """Parse all lines from scratch."""
+        self.lines = lines
+        self.indents = [_line_indent(line) for line in lines]
+        self.nodes = [None] * len(lines)
+        self._info = {}
+        self.root_line = next((i for i, indent in enumerate(self.indents) if indent is not None), None)
+
+        if self.root_line is None:
+            self.tree = {"title": "Empty", "topics": []}
+            return
+
+        root = {"title": strip_bullet(lines[self.root_line].strip()), "topics": []}
+        self.tree = root
+        self.nodes[self.root_line] = root
+        self._info[id(root)] = (None, -1)
+        root["topics"] = self._parse_run(self.root_line + 1, len(lines), root, 0)
+
+    def _parse_run(self, first, last, parent, parent_indent):
+        """
+        Parse lines[first:last] as descendants of parent.
+
+        Returns:
+            list: The new direct children of parent, in order.
+        """
+        lines, indents, nodes, info = self.lines, self.indents, self.nodes, self._info
+        children = []
+        stack = [(parent_indent, parent)]
+        for i in range(first, last):
+            indent = indents[i]
+            if indent is None:
+                continue
+
+            while len(stack) > 1 and stack[-1][0] >= indent:
+                stack.pop()
+
+            owner = stack[-1][1]
+            node = {"title": strip_bullet(lines[i].strip()), "topics": []}
+            if owner is parent:
+                children.append(node)
+            else:
+                owner["topics"].append(node)
+            info[id(node)] = (owner, indent)
+            nodes[i] = node
+            stack.append((indent, node))
+        return children
+
+    def path_of(self, node):
+        """Return the path (tuple of child indices from the root) of a node."""
+        path = []
+        parent = self._info[id(node)][0]
+        while parent is not None:
+            path.append(_index_of(parent["topics"], node))
+            node = parent
+            parent = self._info[id(node)][0]
+        return tuple(reversed(path))
+
+    def apply_edit(self, start, end, new_lines):
+        """
+        Replace lines[start:end] with new_lines and re-parse the affected sibling run.
+
+        See reparse() for details.
+        """
+        new_lines = list(new_lines)
+
+        # 修改根主题（或其之前的行）时直接全量解析
+        if self.root_line is None or start <= self.root_line:
+            self._parse_all(self.lines[:start] + new_lines + self.lines[end:])
+            return self.tree, [()]
+
+        new_indents = [_line_indent(line) for line in new_lines]
+        changed = [indent for indent in self.indents[start:end] + new_indents if indent is not None]
+        if not changed:
+            # 只增删了空行，树结构不变
+            self._splice(start, end, new_lines, new_indents)
+            return self.tree, []
+        min_indent = min(changed)
+
+        # 从编辑位置前最近的节点向上找到第一个缩进小于编辑区最小缩进的祖先，
+        # 它的子节点就是受影响的兄弟节点序列
+        before = start - 1
+        while self.indents[before] is None:
+            before -= 1
+        run_head = None
+        owner = self.nodes[before]
+        while self._info[id(owner)][1] >= min_indent:
+            run_head = owner
+            owner = self._info[id(owner)][0]
+        owner_indent = self._info[id(owner)][1]
+
+        if run_head is None:
+            first_line = before + 1
+            first_index = 0
+        else:
+            first_line = before
+            while self.nodes[first_line] is not run_head:
+                first_line -= 1
+            first_index = _index_of(owner["topics"], run_head)
+
+        # 重新解析范围内所有行的最小缩进
+        run_min = min([min_indent] + [indent for indent in self.indents[first_line:start] if indent is not None])
+
+        removed = [node for node in self.nodes[start:end] if node is not None]
+        self._splice(start, end, new_lines, new_indents)
+
+        # 向后找到第一个在新旧两棵树中都是 owner 直接子节点的行，之后的行不受影响
+        last_line = len(self.lines)
+        last_index = len(owner["topics"])
+        for i in range(start + len(new_lines), len(self.lines)):
+            indent = self.indents[i]
+            if indent is None:
+                continue
+            if indent <= owner_indent:
+                last_line = i
+                break
+            if indent <= run_min:
+                last_line = i
+                last_index = _index_of(owner["topics"], self.nodes[i], first_index)
+                break
+            run_min = min(run_min, indent)
+
+        for node in removed + self.nodes[first_line:last_line]:
+            if node is not None:
+                del self._info[id(node)]
+
+        old_run = owner["topics"][first_index:last_index]
+        new_run = self._parse_run(first_line, last_line, owner, max(owner_indent, 0))
+        owner["topics"][first_index:last_index] = new_run
+
+        logger.debug(f"增量解析: 行 {first_line}-{last_line}, 替换 {len(old_run)} 个兄弟节点为 {len(new_run)} 个")
+
+        return self.tree, _diff_runs(self.path_of(owner), first_index, old_run, new_run)
+
+    def _splice(self, start, end, new_lines, new_indents):
+        """Replace the per-line bookkeeping for lines[start:end]."""
+        self.lines[start:end] = new_lines
+        self.indents[start:end] = new_indents
+        self.nodes[start:end] = [None] * len(new_lines)
+
+def _line_indent(line):
+    """Return the indentation of a line, or None if it is blank."""
+    if not line.strip():
+        return None
+    return count_leading_spaces(line)
+
+def _index_of(nodes, node, start=0):
+    """Return the position of node in nodes, comparing by identity."""
+    for i in range(start, len(nodes)):
+        if nodes[i] is node:
+            return i
+    raise ValueError("node not found among siblings")
+
+def _diff_runs(parent_path, offset, old_run, new_run):
+    """
+    Compare the old and new sibling runs and return the changed node paths.
+
+    A path is reported when a node's title changed, when it was inserted, or
+    (for its parent) when children were removed.
+    """
+    changed = []
+
+    # 去掉首尾未变化的节点
+    prefix = 0
+    while prefix < min(len(old_run), len(new_run)) and trees_equal(old_run[prefix], new_run[prefix]):
+        prefix += 1
+    suffix = 0
+    while (suffix < min(len(old_run), len(new_run)) - prefix
+           and trees_equal(old_run[-1 - suffix], new_run[-1 - suffix])):
+        suffix += 1
+    old_mid = old_run[prefix:len(old_run) - suffix]
+    new_mid = new_run[prefix:len(new_run) - suffix]
+
+    if len(old_mid) != len(new_mid):
+        if len(old_mid) > len(new_mid):
+            changed.append(parent_path)
+        changed.extend(parent_path + (offset + prefix + i,) for i in range(len(new_mid)))
+        return changed
+
+    stack = [(parent_path + (offset + prefix + i,), old_mid[i], new_mid[i])
+             for i in reversed(range(len(new_mid)))]
+    while stack:
+        path, old, new = stack.pop()
+        if trees_equal(old, new):
+            continue
+        if old["title"] != new["title"] or len(old["topics"]) != len(new["topics"]):
+            changed.append(path)
+            continue
+        for i in reversed(range(len(new["topics"]))):
+            stack.append((path + (i,), old["topics"][i], new["topics"][i]))
+    return changed
+
+def parse_document(text):
+    """
+    Parse text into an OutlineDocument that supports incremental re-parsing.
+
+    Args:
+        text (str): The input text with indentation representing hierarchy.
+
+    Returns:
+        OutlineDocument: The parsed document; document.tree is the structure.
+    """
+    return OutlineDocument(text)
+
+def reparse(document, start, end, new_lines):
+    """
+    Apply a line-range edit to a previous parse result, re-parsing only the
+    affected sibling run.
+
+    The document is updated in place. Only the children of the closest node
+    whose indentation is below every edited line are rebuilt, and only from
+    the sibling containing the edit up to the first following sibling whose
+    position cannot have changed.
+
+    Args:
+        document (OutlineDocument): The previous parse result.
+        start (int): First replaced line (0-based).
+        end (int): End of the replaced line range (exclusive).
+        new_lines (list): The replacement lines, without newlines.
+
+    Returns:
+        tuple: (tree, changed_paths), where changed_paths lists tuples of
+        child indices from the root, () being the root itself.
+    """
+    return document.apply_edit(start, end, new_lines)
@@ -0,0 +1,502 @@
+"""
+Tidy tree layout for the image exporters.
+
+Implements Walker's algorithm in the linear-time form of Buchheim, Jünger and
+Leipert (a Reingold–Tilford style layout): siblings are packed along the
+vertical axis as tightly as their subtrees' contours allow, parents are
+centred on their children, and every depth gets its own column sized to its
+widest title. All passes are loops over flat arrays, so arbitrarily deep or
+wide maps never hit the recursion limit and the work is O(n).
+"""
+
+import math
+import functools
+from array import array
+from collections import deque
+from itertools import islice
+
+try:
+    from .compact_tree import get_accessors, get_folded_test, get_child_iterator
+    from .traversal import walk
+    from .fonts import font_for_text, needs_cjk, line_height, text_width, wrap_text, fit_text
+except ImportError:
+    # When run directly
+    from compact_tree import get_accessors, get_folded_test, get_child_iterator
+    from traversal import walk
+    from fonts import font_for_text, needs_cjk, line_height, text_width, wrap_text, fit_text
+
+# 表示"没有节点"的索引
+NO_NODE = -1
+
+# 各层的字体大小：中心主题、一级主题、更深层主题
+LEVEL_FONT_SIZES = (20, 16, 12)
+
+# 主题框内文字与边框的间距
+BOX_PADDING_X = 10
+BOX_PADDING_Y = 5
+
+# 相邻两层之间的水平间距
+LEVEL_GAP = 40
+
+# 同一父主题的兄弟主题之间、以及相邻子树之间的最小垂直间距
+SIBLING_GAP = 6
+SUBTREE_GAP = 14
+
+# 画布四周的留白
+CANVAS_MARGIN = 20
+
+# 标题超过该宽度（像素）时换行，最多显示这么多行，放不下的部分截断
+MAX_TITLE_WIDTH = 300
+MAX_TITLE_LINES = 3
+
+# 各层的绘制样式: (填充色, 文字颜色, 连线宽度)，更深的层使用最后一项
+LEVEL_STYLES = (
+    ("#4475E3", "white", 2),
+    ("lightyellow", "black", 2),
+    ("lightgreen", "black", 1),
+    ("lightpink", "black", 1),
+)
+
+# 位图画布的最大边长和像素数，超出时按比例缩小绘制
+MAX_CANVAS_SIDE = 16384
+MAX_CANVAS_PIXELS = 16 * 1024 * 1024
+
+# 缩小绘制时，字号小于该值的文字不再绘制
+MIN_TEXT_SIZE = 6
+
+# 缩小绘制时，高度小于该值（像素）的主题框不画边框，免得挤成一片黑色
+MIN_OUTLINE_HEIGHT = 6
+
+# 不测量字体时估算标题大小: 西文字符的平均宽度和行高（相对字号）
+AVERAGE_CHAR_WIDTH = 0.55
+LINE_SPACING = 1.2
+
+def level_font_size(depth):
+    """Return the font size used for topics at a depth."""
+    return LEVEL_FONT_SIZES[min(depth, len(LEVEL_FONT_SIZES) - 1)]
+
+def level_style(depth):
+    """Return (fill, text color, line width) for topics at a depth."""
+    return LEVEL_STYLES[min(depth, len(LEVEL_STYLES) - 1)]
+
+@functools.lru_cache(maxsize=None)
+def box_height(depth):
+    """Return the height of a topic box at a depth."""
+    return line_height(level_font_size(depth)) + 2 * BOX_PADDING_Y
+
+def title_lines(title, depth):
+    """
+    Return the lines a title at a depth is drawn in.
+
+    Titles wider than MAX_TITLE_WIDTH are wrapped; beyond MAX_TITLE_LINES lines
+    the last line shown is cut with an ellipsis.
+    """
+    size = level_font_size(depth)
+    if text_width(title, size) <= MAX_TITLE_WIDTH:
+        return (title,)
+    lines = wrap_text(title, size, MAX_TITLE_WIDTH)
+    if len(lines) > MAX_TITLE_LINES:
+        last = MAX_TITLE_LINES - 1
+        lines = lines[:last] + (fit_text(lines[last] + " " + lines[last + 1], size, MAX_TITLE_WIDTH),)
+    return lines
+
+def measure_title(title, depth):
+    """
+    Return the (width, height) of the box for a title at a depth, wrapped as by title_lines.
+
+    Args:
+        title (str): The displayed title.
+        depth (int): Depth of the topic, 0 for the central topic.
+    """
+    size = level_font_size(depth)
+    lines = title_lines(title, depth)
+    width = max(text_width(line, size) for line in lines)
+    return width + 2 * BOX_PADDING_X, box_height(depth) + (len(lines) - 1) * line_height(size)
+
+def estimate_title(title, depth):
+    """
+    Return an approximate (width, height) box for a title without touching fonts,
+    for coarse layouts such as thumbnails.
+
+    Args:
+        title (str): The displayed title.
+        depth (int): Depth of the topic, 0 for the central topic.
+    """
+    size = level_font_size(depth)
+    char_width = size if needs_cjk(title) else size * AVERAGE_CHAR_WIDTH
+    width = len(title) * char_width
+    lines = min(max(1, math.ceil(width / MAX_TITLE_WIDTH)), MAX_TITLE_LINES)
+    return min(width, MAX_TITLE_WIDTH) + 2 * BOX_PADDING_X, lines * size * LINE_SPACING + 2 * BOX_PADDING_Y
+
+def display_title(title, depth, index):
+    """Return the title drawn for a topic, with a placeholder for empty titles."""
+    if not title:
+        title = "Mind Map" if depth == 0 else f"Topic {index + 1}"
+    return title
+
+class TreeLayout:
+    """
+    Positions of all laid-out topics, in flat arrays shared by the renderers.
+
+    Node i is the i-th topic in pre-order (breadth-first order for layouts with
+    a node budget); node 0 is the central topic, and a parent always comes
+    before its children. Boxes are given by their top-left
+    corner on a canvas of width x height pixels.
+
+    Attributes:
+        parent (array): Parent node per node, NO_NODE for the root.
+        depth (array): Depth per node.
+        x (array): Left edge of each box.
+        y (array): Top edge of each box.
+        width (array): Box width per node.
+        height (array): Box height per node.
+        titles (list): Displayed title per node, before wrapping (see title_lines).
+        width_total (float): Canvas width.
+        height_total (float): Canvas height.
+    """
+
+    def __init__(self):
+        self.parent = array('i')
+        self.depth = array('i')
+        self.x = array('d')
+        self.y = array('d')
+        self.width = array('d')
+        self.height = array('d')
+        self.titles = []
+        self.width_total = 0.0
+        self.height_total = 0.0
+
+    def __len__(self):
+        return len(self.parent)
+
+    @property
+    def size(self):
+        """The canvas size as integer (width, height)."""
+        return math.ceil(self.width_total), math.ceil(self.height_total)
+
+    def box(self, node):
+        """Return the (left, top, right, bottom) box of a node."""
+        x, y = self.x[node], self.y[node]
+        return x, y, x + self.width[node], y + self.height[node]
+
+    def edge(self, node):
+        """Return the connector ((x0, y0), (x1, y1)) from a node's parent to the node, or None for the root."""
+        parent = self.parent[node]
+        if parent == NO_NODE:
+            return None
+        return ((self.x[parent] + self.width[parent], self.y[parent] + self.height[parent] / 2),
+                (self.x[node], self.y[node] + self.height[node] / 2))
+
+    def subset(self, nodes):
+        """
+        Return a layout with only the given nodes and their parents, for drawing
+        part of a large map in another process.
+
+        Args:
+            nodes (list): Ascending node ids.
+
+        Returns:
+            tuple: (layout, ids), where ids are the new ids of nodes in the returned layout.
+        """
+        # 父主题只用于连线的起点，不需要再带上它自己的父主题
+        keep = set(nodes)
+        keep.update(self.parent[i] for i in nodes if self.parent[i] != NO_NODE)
+        order = sorted(keep)
+        new_ids = {node: i for i, node in enumerate(order)}
+
+        sub = TreeLayout()
+        for node in order:
+            sub.parent.append(new_ids.get(self.parent[node], NO_NODE))
+            sub.depth.append(self.depth[node])
+            sub.x.append(self.x[node])
+            sub.y.append(self.y[node])
+            sub.width.append(self.width[node])
+            sub.height.append(self.height[node])
+            sub.titles.append(self.titles[node])
+        sub.width_total = self.width_total
+        sub.height_total = self.height_total
+        return sub, [new_ids[node] for node in nodes]
+
+def layout_tree(structure, measure=measure_title, max_depth=None, max_nodes=None):
+    """
+    Compute a tidy left-to-right layout of a mind map.
+
+    Children of folded topics (see bucket_fanouts) are not laid out.
+
+    Args:
+        structure (dict | CompactTree): The parsed structure.
+        measure (callable): measure(title, depth) -> (width, height) of a topic box.
+        max_depth (int): Deepest level to lay out, None for all levels.
+        max_nodes (int): Lay out at most this many topics, level by level from the
+            root, so the cost does not depend on the size of the map. Nodes are then
+            numbered breadth-first instead of in pre-order.
+
+    Returns:
+        TreeLayout: The node boxes and the canvas size.
+    """
+    layout = TreeLayout()
+    parent_of, depth_of, widths, heights, titles = (layout.parent, layout.depth, layout.width,
+                                                     layout.height, layout.titles)
+
+    # 兄弟链表: 第一个/最后一个子节点、前后兄弟、在兄弟中的序号
+    first_child = array('i')
+    last_child = array('i')
+    prev_sibling = array('i')
+    next_sibling = array('i')
+    number = array('i')
+
+    root, title_of, _ = get_accessors(structure)
+    is_folded = get_folded_test(structure)
+    path = []
+
+    def add(node, depth, index, parent):
+        # 追加一个节点，返回它的子节点是否也要布局
+        i = len(parent_of)
+        title = display_title(title_of(node), depth, index)
+        width, height = measure(title, depth)
+
+        parent_of.append(parent)
+        depth_of.append(depth)
+        widths.append(width)
+        heights.append(height)
+        titles.append(title)
+        first_child.append(NO_NODE)
+        last_child.append(NO_NODE)
+        next_sibling.append(NO_NODE)
+        number.append(index)
+        if parent == NO_NODE:
+            prev_sibling.append(NO_NODE)
+        else:
+            prev_sibling.append(last_child[parent])
+            if first_child[parent] == NO_NODE:
+                first_child[parent] = i
+            else:
+                next_sibling[last_child[parent]] = i
+            last_child[parent] = i
+        return not ((max_depth is not None and depth >= max_depth) or (is_folded is not None and is_folded(node)))
+
+    def enter(node, depth, index, children):
+        expand = add(node, depth, index, path[-1] if path else NO_NODE)
+        path.append(len(parent_of) - 1)
+        if not expand:
+            return False
+
+    def exit(node, depth, index, children):
+        path.pop()
+
+    if max_nodes is None:
+        walk(structure, enter, exit)
+    else:
+        # 广度优先展开，预算用完时保留较浅的层；超宽的扇出只取前面的子节点
+        iter_children = get_child_iterator(structure)
+        queue = deque([(root, 0, 0, NO_NODE)])
+        while queue:
+            node, depth, index, parent = queue.popleft()
+            expand = add(node, depth, index, parent)
+            budget = max_nodes - len(parent_of) - len(queue)
+            if expand and budget > 0:
+                i = len(parent_of) - 1
+                for child_index, child in enumerate(islice(iter_children(node), budget)):
+                    queue.append((child, depth + 1, child_index, i))
+
+    count = len(parent_of)
+    prelim = array('d', bytes(8 * count))
+    mod = array('d', bytes(8 * count))
+    shift = array('d', bytes(8 * count))
+    change = array('d', bytes(8 * count))
+    thread = array('i', [NO_NODE]) * count
+    ancestor = array('i', range(count))
+    default_ancestor = array('i', first_child)
+
+    def distance(left, right):
+        gap = SIBLING_GAP if parent_of[left] == parent_of[right] else SUBTREE_GAP
+        return (heights[left] + heights[right]) / 2 + gap
+
+    def next_left(v):
+        child = first_child[v]
+        return child if child != NO_NODE else thread[v]
+
+    def next_right(v):
+        child = last_child[v]
+        return child if child != NO_NODE else thread[v]
+
+    def move_subtree(left, right, amount):
+        subtrees = number[right] - number[left]
+        change[right] -= amount / subtrees
+        shift[right] += amount
+        change[left] += amount / subtrees
+        prelim[right] += amount
+        mod[right] += amount
+
+    def apportion(v, default):
+        left = prev_sibling[v]
+        if left == NO_NODE:
+            return default
+        # 内侧/外侧轮廓上的节点及其累计偏移量
+        inner_right = outer_right = v
+        inner_left = left
+        outer_left = first_child[parent_of[v]]
+        sum_inner_right = mod[inner_right]
+        sum_outer_right = mod[outer_right]
+        sum_inner_left = mod[inner_left]
+        sum_outer_left = mod[outer_left]
+        while next_right(inner_left) != NO_NODE and next_left(inner_right) != NO_NODE:
+            inner_left = next_right(inner_left)
+            inner_right = next_left(inner_right)
+            outer_left = next_left(outer_left)
+            outer_right = next_right(outer_right)
+            ancestor[outer_right] = v
+            amount = ((prelim[inner_left] + sum_inner_left) - (prelim[inner_right] + sum_inner_right)
+                      + distance(inner_left, inner_right))
+            if amount > 0:
+                candidate = ancestor[inner_left]
+                if parent_of[candidate] != parent_of[v]:
+                    candidate = default
+                move_subtree(candidate, v, amount)
+                sum_inner_right += amount
+                sum_outer_right += amount
+            sum_inner_left += mod[inner_left]
+            sum_inner_right += mod[inner_right]
+            sum_outer_left += mod[outer_left]
+            sum_outer_right += mod[outer_right]
+        if next_right(inner_left) != NO_NODE and next_right(outer_right) == NO_NODE:
+            thread[outer_right] = next_right(inner_left)
+            mod[outer_right] += sum_inner_left - sum_outer_right
+        if next_left(inner_right) != NO_NODE and next_left(outer_left) == NO_NODE:
+            thread[outer_left] = next_left(inner_right)
+            mod[outer_left] += sum_inner_right - sum_outer_left
+            default = v
+        return default
+
+    def finish(v):
+        # 子树已布局完成: 确定 v 相对于其兄弟的初步位置
+        left = prev_sibling[v]
+        if first_child[v] == NO_NODE:
+            prelim[v] = prelim[left] + distance(left, v) if left != NO_NODE else 0.0
+        else:
+            total_shift = 0.0
+            total_change = 0.0
+            child = last_child[v]
+            while child != NO_NODE:
+                prelim[child] += total_shift
+                mod[child] += total_shift
+                total_change += change[child]
+                total_shift += shift[child] + total_change
+                child = prev_sibling[child]
+            midpoint = (prelim[first_child[v]] + prelim[last_child[v]]) / 2
+            if left != NO_NODE:
+                prelim[v] = prelim[left] + distance(left, v)
+                mod[v] = prelim[v] - midpoint
+            else:
+                prelim[v] = midpoint
+        parent = parent_of[v]
+        if parent != NO_NODE:
+            default_ancestor[parent] = apportion(v, default_ancestor[parent])
+
+    # 第一遍: 从左到右的后序遍历，不用栈
+    v = 0
+    while v != NO_NODE:
+        while first_child[v] != NO_NODE:
+            v = first_child[v]
+        while True:
+            finish(v)
+            if v == 0:
+                v = NO_NODE
+                break
+            if next_sibling[v] != NO_NODE:
+                v = next_sibling[v]
+                break
+            v = parent_of[v]
+
+    # 第二遍: 累加祖先的偏移量得到纵向中心。父节点总在子节点之前，
+    # 所以按编号顺序把 mod 原地改为"自身及全部祖先的 mod 之和"即可
+    centers = prelim
+    for i in range(1, count):
+        inherited = mod[parent_of[i]]
+        centers[i] += inherited
+        mod[i] += inherited
+
+    # 每一层一列，列宽取该层最宽的主题
+    column_widths = []
+    for i in range(count):
+        depth = depth_of[i]
+        if depth == len(column_widths):
+            column_widths.append(0.0)
+        if widths[i] > column_widths[depth]:
+            column_widths[depth] = widths[i]
+    columns = [float(CANVAS_MARGIN)]
+    for column_width in column_widths[:-1]:
+        columns.append(columns[-1] + column_width + LEVEL_GAP)
+
+    top = min(centers[i] - heights[i] / 2 for i in range(count))
+    bottom = max(centers[i] + heights[i] / 2 for i in range(count))
+    xs, ys = layout.x, layout.y
+    for i in range(count):
+        xs.append(columns[depth_of[i]])
+        ys.append(centers[i] - heights[i] / 2 - top + CANVAS_MARGIN)
+
+    layout.width_total = columns[-1] + column_widths[-1] + CANVAS_MARGIN
+    layout.height_total = bottom - top + 2 * CANVAS_MARGIN
+    return layout
+
+def canvas_scale(layout, max_side=MAX_CANVAS_SIDE, max_pixels=MAX_CANVAS_PIXELS):
+    """Return the factor (at most 1) by which a layout must be shrunk to fit a bitmap canvas."""
+    width, height = layout.size
+    return min(1.0, max_side / width, max_side / height, math.sqrt(max_pixels / (width * height)))
+
+def draw_layout(draw, layout, scale=1.0, origin=(0, 0), nodes=None, text=True):
+    """
+    Draw the connectors, boxes and titles of a layout.
+
+    Args:
+        draw (PIL.ImageDraw.ImageDraw): The drawing context.
+        layout (TreeLayout): The layout to draw.
+        scale (float): Factor applied to all layout coordinates and font sizes.
+        origin (tuple): Layout point (before scaling) drawn at the image's top-left corner.
+        nodes (list): Ascending node ids to draw, each with its box and the connector
+            from its parent; None for all nodes.
+        text (bool): Draw the titles; False draws boxes and connectors only.
+    """
+    origin_x, origin_y = origin
+    xs, ys, widths, heights, depths = layout.x, layout.y, layout.width, layout.height, layout.depth
+
+    # 每层缩放后的字号，太小的文字不绘制
+    font_sizes = [round(size * scale) for size in LEVEL_FONT_SIZES]
+
+    if nodes is None:
+        nodes = range(len(layout))
+
+    # 坐标先缩放再取整后减去原点，瓦片与整张图中同一主题落在相同的像素上
+    shift_x = round(origin_x * scale)
+    shift_y = round(origin_y * scale)
+
+    # 先画连线，主题框覆盖在连线之上
+    for i in nodes:
+        edge = layout.edge(i)
+        if edge is None:
+            continue
+        (x0, y0), (x1, y1) = edge
+        draw.line(((round(x0 * scale) - shift_x, round(y0 * scale) - shift_y),
+                   (round(x1 * scale) - shift_x, round(y1 * scale) - shift_y)),
+                  fill="black", width=max(1, round(level_style(depths[i])[2] * scale)))
+
+    # 完全落在图片之外的主题框不绘制（瓦片中常见）
+    image_width, image_height = draw.im.size
+    for i in nodes:
+        left = round(xs[i] * scale) - shift_x
+        top = round(ys[i] * scale) - shift_y
+        right = round((xs[i] + widths[i]) * scale) - shift_x
+        bottom = round((ys[i] + heights[i]) * scale) - shift_y
+        if left > image_width or top > image_height or right < 0 or bottom < 0:
+            continue
+        depth = depths[i]
+        fill, text_color, _ = level_style(depth)
+        outline = "black" if heights[i] * scale >= MIN_OUTLINE_HEIGHT else None
+        draw.rectangle(((left, top), (right, bottom)), fill=fill, outline=outline)
+        font_size = font_sizes[min(depth, len(font_sizes) - 1)]
+        if text and font_size >= MIN_TEXT_SIZE:
+            text_x = round((xs[i] + BOX_PADDING_X) * scale) - shift_x
+            spacing = line_height(level_font_size(depth))
+            for k, line in enumerate(title_lines(layout.titles[i], depth)):
+                text_y = round((ys[i] + BOX_PADDING_Y + k * spacing) * scale) - shift_y
+                draw.text((text_x, text_y), line, fill=text_color, font=font_for_text(line, font_size))
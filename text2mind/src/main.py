@@ -14,12 +14,22 @@ if __name__ == '__main__':
 
 # Use relative imports for package
 try:
-    from .parser import parse_text
-    from .xmind_generator import create_xmind_from_structure
+    from .parser import parse_file, parse_text
+    from .xmind_generator import (create_xmind_from_structure, OUTPUT_PROFILES, DEFAULT_PROFILE, OUTPUT_FORMATS,
+                                  DEFAULT_FORMAT, SHARD_MODES, DEFAULT_SHARD_MODE, SHARD_NODE_BUDGET,
+                                  render_structure, write_fallback_xmind, RENDER_FORMATS)
+    from .archive import COMPRESSION_STRATEGIES, DEFAULT_COMPRESSION
+    from .bucketing import bucket_fanouts, BUCKET_MODES, DEFAULT_BUCKET_MODE
+    from .cache import ConversionCache, get_default_cache
 except ImportError:
     # When run directly
-    from parser import parse_text
-    from xmind_generator import create_xmind_from_structure
+    from parser import parse_file, parse_text
+    from xmind_generator import (create_xmind_from_structure, OUTPUT_PROFILES, DEFAULT_PROFILE, OUTPUT_FORMATS,
+                                 DEFAULT_FORMAT, SHARD_MODES, DEFAULT_SHARD_MODE, SHARD_NODE_BUDGET,
+                                 render_structure, write_fallback_xmind, RENDER_FORMATS)
+    from archive import COMPRESSION_STRATEGIES, DEFAULT_COMPRESSION
+    from bucketing import bucket_fanouts, BUCKET_MODES, DEFAULT_BUCKET_MODE
+    from cache import ConversionCache, get_default_cache
 
 @click.group()
 def cli():
@@ -29,7 +39,31 @@ def cli():
 @cli.command()
 @click.argument('input_file', type=click.Path(exists=True))
 @click.argument('output_file', type=click.Path())
-def convert(input_file, output_file):
+@click.option('--compact', is_flag=True, help='Use the compact array-backed tree for very large outlines.')
+@click.option('--workers', type=int, default=None, help='Parse large inputs and render images in parallel with this many processes.')
+@click.option('--profile', type=click.Choice(OUTPUT_PROFILES), default=DEFAULT_PROFILE,
+              help='Output profile; "lean" omits the random padding payload.')
+@click.option('--compression', type=click.Choice(list(COMPRESSION_STRATEGIES)), default=DEFAULT_COMPRESSION,
+              help='Compression strategy; "parallel" deflates large maps on all CPU cores.')
+@click.option('--format', 'output_format', type=click.Choice(OUTPUT_FORMATS), default=DEFAULT_FORMAT,
+              help='Write XMind 8 content.xml or XMind Zen content.json.')
+@click.option('--deterministic', is_flag=True, help='Produce byte-identical output for identical input.')
+@click.option('--shard', type=click.Choice(SHARD_MODES), default=DEFAULT_SHARD_MODE,
+              help='Split large maps into sheets per top-level topic or per node budget, plus an overview sheet.')
+@click.option('--shard-budget', type=click.IntRange(min=1), default=SHARD_NODE_BUDGET,
+              help='Node count above which a map is split, and the node budget per sheet.')
+@click.option('--bucket-size', type=click.IntRange(min=2), default=None,
+              help='Regroup topics with more children than this into folded buckets of this size.')
+@click.option('--bucket-mode', type=click.Choice(BUCKET_MODES), default=DEFAULT_BUCKET_MODE,
+              help='Bucket titles: sibling ranges ("1-100") or title prefixes ("A-C").')
+@click.option('--image', 'image_format', type=click.Choice(RENDER_FORMATS),
+              default=None, help='Also render the map to an image ("svg" for vector output, "dzi" for a tile pyramid) next to the .xmind file.')
+@click.option('--cache/--no-cache', 'use_cache', default=False, help='Reuse previously generated files for identical input (off by default).')
+@click.option('--cache-dir', type=click.Path(), default=None, help='Directory of the conversion cache.')
+def convert(input_file, output_file, compact=False, workers=None, profile=DEFAULT_PROFILE,
+            compression=DEFAULT_COMPRESSION, output_format=DEFAULT_FORMAT, deterministic=False,
+            shard=DEFAULT_SHARD_MODE, shard_budget=SHARD_NODE_BUDGET, bucket_size=None,
+            bucket_mode=DEFAULT_BUCKET_MODE, image_format=None, use_cache=False, cache_dir=None):
     """Convert a text file to a mind map XMind file."""
     # Ensure output file has .xmind extension
     if not output_file.endswith('.xmind'):
@@ -37,24 +71,84 @@ def convert(input_file, output_file):
         
     click.echo(f"Converting {input_file} to {output_file}")
     
-    # Read the input file
-    with open(input_file, 'r', encoding='utf-8') as f:
-        text = f.read()
+    # Options that change the generated file are part of the cache key
+    options = {"profile": profile, "compression": compression, "format": output_format,
+               "deterministic": deterministic, "shard": shard, "shard_budget": shard_budget,
+               "bucket_size": bucket_size, "bucket_mode": bucket_mode}
+    cache = None
+    cached = False
+    if use_cache:
+        cache = ConversionCache(cache_dir) if cache_dir else get_default_cache()
+        cache_key = cache.file_key(input_file, options)
+        cached = cache.fetch(cache_key, output_file)
+        if cached:
+            click.echo(f"Mind map saved to {output_file} (cached)")
+            if not image_format:
+                return
     
-    # Parse the text
     click.echo("Parsing text...")
-    structure = parse_text(text)
+    if workers:
+        # Parallel parsing splits the whole text into top-level chunks
+        with open(input_file, 'r', encoding='utf-8') as f:
+            text = f.read()
+        structure = parse_text(text, compact=compact, workers=workers)
+    else:
+        # Scan the memory-mapped input file line by line
+        structure = parse_file(input_file, compact=compact)
     
-    # Create XMind file
-    click.echo("Creating XMind file...")
-    create_xmind_from_structure(structure, output_file)
+    if bucket_size:
+        # Regroup huge fan-outs into folded buckets
+        structure = bucket_fanouts(structure, bucket_size, bucket_mode)
     
-    click.echo(f"Mind map saved to {output_file}")
+    if not cached:
+        # Create XMind file
+        click.echo("Creating XMind file...")
+        try:
+            create_xmind_from_structure(structure, output_file, profile=profile, compression=compression,
+                                        deterministic=deterministic, format=output_format, shard=shard,
+                                        shard_budget=shard_budget, fallback=False)
+        except Exception as e:
+            # The degraded fallback archive is never stored in the cache
+            click.echo(f"Could not create the XMind file ({e}), writing a basic one instead")
+            write_fallback_xmind(structure, output_file, compression)
+        else:
+            if cache is not None:
+                cache.put_file(cache_key, output_file)
+        
+        click.echo(f"Mind map saved to {output_file}")
+    
+    if image_format:
+        # Render the image from the structure already in memory
+        image_file = os.path.splitext(output_file)[0] + "." + image_format
+        render_structure(structure, image_file, image_format, workers)
+        click.echo(f"Image saved to {image_file}")
 
 @cli.command()
 @click.argument('input_files', nargs=-1, type=click.Path(exists=True))
 @click.argument('output_dir', type=click.Path())
-def batch_convert(input_files, output_dir):
+@click.option('--profile', type=click.Choice(OUTPUT_PROFILES), default=DEFAULT_PROFILE,
+              help='Output profile; "lean" omits the random padding payload.')
+@click.option('--compression', type=click.Choice(list(COMPRESSION_STRATEGIES)), default=DEFAULT_COMPRESSION,
+              help='Compression strategy; "parallel" deflates large maps on all CPU cores.')
+@click.option('--format', 'output_format', type=click.Choice(OUTPUT_FORMATS), default=DEFAULT_FORMAT,
+              help='Write XMind 8 content.xml or XMind Zen content.json.')
+@click.option('--deterministic', is_flag=True, help='Produce byte-identical output for identical input.')
+@click.option('--shard', type=click.Choice(SHARD_MODES), default=DEFAULT_SHARD_MODE,
+              help='Split large maps into sheets per top-level topic or per node budget, plus an overview sheet.')
+@click.option('--shard-budget', type=click.IntRange(min=1), default=SHARD_NODE_BUDGET,
+              help='Node count above which a map is split, and the node budget per sheet.')
+@click.option('--bucket-size', type=click.IntRange(min=2), default=None,
+              help='Regroup topics with more children than this into folded buckets of this size.')
+@click.option('--bucket-mode', type=click.Choice(BUCKET_MODES), default=DEFAULT_BUCKET_MODE,
+              help='Bucket titles: sibling ranges ("1-100") or title prefixes ("A-C").')
+@click.option('--image', 'image_format', type=click.Choice(RENDER_FORMATS),
+              default=None, help='Also render the map to an image ("svg" for vector output, "dzi" for a tile pyramid) next to the .xmind file.')
+@click.option('--cache/--no-cache', 'use_cache', default=False, help='Reuse previously generated files for identical input (off by default).')
+@click.option('--cache-dir', type=click.Path(), default=None, help='Directory of the conversion cache.')
+def batch_convert(input_files, output_dir, profile=DEFAULT_PROFILE, compression=DEFAULT_COMPRESSION,
+                  output_format=DEFAULT_FORMAT, deterministic=False, shard=DEFAULT_SHARD_MODE,
+                  shard_budget=SHARD_NODE_BUDGET, bucket_size=None, bucket_mode=DEFAULT_BUCKET_MODE, image_format=None,
+                  use_cache=False, cache_dir=None):
     """Convert multiple text files to mind map XMind files."""
     # Create output directory if it doesn't exist
     os.makedirs(output_dir, exist_ok=True)
@@ -66,7 +160,10 @@ def batch_convert(input_files, output_dir):
         output_file = os.path.join(output_dir, name_without_ext + ".xmind")
         
         # Convert the file
-        convert.callback(input_file, output_file)
+        convert.callback(input_file, output_file, profile=profile, compression=compression,
+                         output_format=output_format, deterministic=deterministic, shard=shard,
+                         shard_budget=shard_budget, bucket_size=bucket_size, bucket_mode=bucket_mode,
+                         image_format=image_format, use_cache=use_cache, cache_dir=cache_dir)
 
 if __name__ == "__main__":
     cli() 
\ No newline at end of file
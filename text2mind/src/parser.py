@@ -1,8 +1,18 @@
 """
 Text parser for converting indented text to a hierarchical structure.
 """
+import io
 import logging
+import mmap
 import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+
+try:
+    from .compact_tree import CompactTree, empty_stats, compute_tree_stats
+except ImportError:
+    # When run directly
+    from compact_tree import CompactTree, empty_stats, compute_tree_stats
 
 # 配置详细的日志记录
 logging.basicConfig(
@@ -15,92 +25,466 @@ logging.basicConfig(
 )
 logger = logging.getLogger("text_parser")
 
+# 输入小于该字符数时并行解析得不偿失，直接顺序解析
+PARALLEL_MIN_CHARS = 4 * 1024 * 1024
+
+# 每个工作进程分配的块数，块越多负载越均衡
+CHUNKS_PER_WORKER = 4
+
+# 行首的ASCII空白字符（str.strip() 会去除的那些，不含换行）
+ASCII_INDENT_RE = re.compile(rb'[ \t\x0b\x0c\r\x1c-\x1f]*')
+
+# 流式解析事件类型
+OPEN = "open"
+CLOSE = "close"
+
 def count_leading_spaces(line):
     """Count the number of leading spaces in a line."""
     return len(line) - len(line.lstrip())
 
-def parse_text(text):
+def strip_bullet(title):
+    """Remove a leading dash/bullet from an already stripped title."""
+    if title.startswith('-'):
+        return title[1:].strip()
+    return title
+
+def iter_line_records(fileobj):
     """
-    Parse indented text into a hierarchical structure.
-    
+    逐行读取输入，跳过空行，生成 (缩进, 标题) 记录。
+
     Args:
-        text (str): The input text with indentation representing hierarchy.
-        
+        fileobj: 可迭代的文本或二进制文件对象（例如 open() 的结果或 request.stream）。
+
+    Yields:
+        tuple: (indent, title)，title 已去除首尾空白。
+    """
+    for line in fileobj:
+        if isinstance(line, bytes):
+            line = line.decode('utf-8')
+        title = line.strip()
+        if not title:  # Skip empty lines
+            continue
+        yield count_leading_spaces(line), title
+
+def iter_buffer_records(buffer):
+    """
+    扫描字节缓冲区（例如 mmap）中的行边界，生成 (缩进, 标题) 记录。
+
+    只有标题部分会被解码为 str，缩进和空行的判断直接在字节上完成。
+
+    Args:
+        buffer: 支持 find() 和缓冲区协议的 UTF-8 字节对象，例如 mmap.mmap。
+
+    Yields:
+        tuple: (indent, title)，与 iter_line_records 的结果一致。
+    """
+    find = buffer.find
+    match = ASCII_INDENT_RE.match
+    size = len(buffer)
+    pos = 0
+    while pos < size:
+        end = find(b'\n', pos)
+        if end == -1:
+            end = size
+
+        text_start = match(buffer, pos, end).end()
+        if text_start < end:
+            if buffer[text_start] >= 0x80:
+                # 可能是全角空格等非ASCII空白，整行解码后按 str 规则处理
+                line = buffer[pos:end].decode('utf-8')
+                title = line.strip()
+                if title:
+                    yield count_leading_spaces(line), title
+            else:
+                yield text_start - pos, buffer[text_start:end].decode('utf-8').rstrip()
+
+        pos = end + 1
+
+def iter_record_events(records):
+    """
+    将 (缩进, 标题) 记录转换为节点打开/关闭事件。
+
+    第一条记录是根主题；根主题永远不会被弹出，缩进为0的行会挂在根主题下，
+    与原先基于栈的解析规则保持一致。
+
+    Args:
+        records: 可迭代的 (indent, title) 记录。
+
+    Yields:
+        tuple: (OPEN, depth, title) 或 (CLOSE, depth, None)。
+    """
+    records = iter(records)
+    first = next(records, None)
+    if first is None:
+        return
+
+    yield (OPEN, 0, strip_bullet(first[1]))
+
+    # Stack of indentation levels for the currently open nodes
+    stack = [0]
+    for indent, title in records:
+        # Close nodes until we find the parent for this line
+        while len(stack) > 1 and stack[-1] >= indent:
+            stack.pop()
+            yield (CLOSE, len(stack), None)
+
+        yield (OPEN, len(stack), strip_bullet(title))
+        stack.append(indent)
+
+    while stack:
+        stack.pop()
+        yield (CLOSE, len(stack), None)
+
+def iter_outline_events(fileobj):
+    """
+    Stream indented text from a file handle as node open/close events.
+
+    Lines are read one at a time, so the whole input never has to be held
+    in memory.
+
+    Args:
+        fileobj: An iterable of text or bytes lines (file handle, request.stream, ...).
+
+    Yields:
+        tuple: (OPEN, depth, title) when a node starts and (CLOSE, depth, None)
+        when it ends. The root node has depth 0.
+    """
+    return iter_record_events(iter_line_records(fileobj))
+
+def iter_events_with_stats(events, stats):
+    """
+    Pass events through unchanged while accumulating tree statistics.
+
+    The statistics are filled in as the events are consumed, so the tree
+    builder and the statistics share one pass over the input.
+
+    Args:
+        events: Iterable of outline events.
+        stats (dict): A dict from empty_stats(), updated once the events are exhausted.
+
+    Yields:
+        tuple: The same events.
+    """
+    histogram = stats["level_histogram"]
+    node_count = 0
+    title_bytes = 0
+    max_fanout = 0
+    # 当前打开节点的子节点计数
+    fanout = []
+    for event in events:
+        kind, depth, title = event
+        if kind == OPEN:
+            node_count += 1
+            title_bytes += len(title.encode('utf-8'))
+            if depth == len(histogram):
+                histogram.append(1)
+            else:
+                histogram[depth] += 1
+            if fanout:
+                fanout[-1] += 1
+            fanout.append(0)
+        else:
+            count = fanout.pop()
+            if count > max_fanout:
+                max_fanout = count
+        yield event
+
+    stats["node_count"] += node_count
+    stats["title_bytes"] += title_bytes
+    stats["max_fanout"] = max(stats["max_fanout"], max_fanout)
+    stats["max_depth"] = max(len(histogram) - 1, 0)
+
+def log_stats(stats):
+    """Log a summary of the tree statistics."""
+    logger.info(f"节点总数: {stats['node_count']}, 最大深度: {stats['max_depth']}, "
+                f"最大子节点数: {stats['max_fanout']}, 标题字节数: {stats['title_bytes']}")
+    logger.debug(f"各层节点数: {stats['level_histogram']}")
+
+def build_structure(events):
+    """
+    Build the nested dict structure from outline events.
+
+    Args:
+        events: Iterable of events produced by iter_outline_events.
+
     Returns:
         dict: A dictionary representing the hierarchical structure.
     """
-    logger.info(f"开始解析文本，长度: {len(text)} 字符")
-    
-    lines = text.strip().split("\n")
-    logger.info(f"文本被分割为 {len(lines)} 行")
-    
-    if not lines or not text.strip():
+    root = None
+    stack = []
+    for kind, depth, title in events:
+        if kind == OPEN:
+            node = {"title": title, "topics": []}
+            if stack:
+                stack[-1]["topics"].append(node)
+            else:
+                root = node
+            stack.append(node)
+        else:
+            stack.pop()
+
+    if root is None:
         logger.warning("输入为空，返回默认结构")
         return {"title": "Empty", "topics": []}
-    
-    # Handle the case when the first line has a dash/bullet
-    first_line = lines[0].strip()
-    if first_line.startswith('-'):
-        first_line = first_line[1:].strip()
-        logger.debug(f"根主题（去除破折号）: {first_line}")
+
+    return root
+
+def parse_stream(fileobj, compact=False):
+    """
+    Parse indented text read line by line from a file handle.
+
+    Args:
+        fileobj: An iterable of text or bytes lines (file handle, request.stream, ...).
+        compact (bool): Return a CompactTree instead of nested dicts.
+
+    Returns:
+        dict | CompactTree: The hierarchical structure.
+    """
+    logger.info("开始流式解析输入")
+
+    return parse_records(iter_line_records(fileobj), compact=compact)
+
+def parse_file(path, compact=False):
+    """
+    Parse an indented text file through a read-only memory map.
+
+    Line boundaries are scanned over the mapped bytes and only node titles
+    are decoded, so the file is never copied into one big str.
+
+    Args:
+        path (str): Path of a UTF-8 text file.
+        compact (bool): Return a CompactTree instead of nested dicts.
+
+    Returns:
+        dict | CompactTree: The hierarchical structure.
+    """
+    logger.info(f"开始通过内存映射解析文件: {path}")
+
+    with open(path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:  # 空文件无法映射
+            return parse_records(iter(()), compact=compact)
+
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            return parse_records(iter_buffer_records(mapped), compact=compact)
+
+def parse_records(records, compact=False):
+    """
+    Build the structure and its statistics from (indent, title) records.
+
+    Args:
+        records: Iterable of records from iter_line_records or iter_buffer_records.
+        compact (bool): Return a CompactTree instead of nested dicts.
+
+    Returns:
+        dict | CompactTree: The hierarchical structure.
+    """
+    return build_from_events(iter_record_events(records), compact=compact)
+
+def build_from_events(events, compact=False):
+    """
+    Build the structure from outline events and attach its statistics.
+
+    Args:
+        events: Iterable of outline events, e.g. from iter_outline_events or
+            xmind_reader.iter_xmind_events.
+        compact (bool): Return a CompactTree instead of nested dicts.
+
+    Returns:
+        dict | CompactTree: The hierarchical structure.
+    """
+    # 统计信息与树在同一遍中生成
+    stats = empty_stats()
+    events = iter_events_with_stats(events, stats)
+
+    if compact:
+        result = CompactTree.from_events(events)
+        logger.info(f"解析完成，紧凑树包含 {len(result)} 个节点，占用约 {result.nbytes()} 字节")
     else:
-        logger.debug(f"根主题: {first_line}")
-    
-    # First line is the root topic
-    root = {"title": first_line, "topics": []}
-    
-    # Stack to keep track of the current path in the hierarchy
-    stack = [(0, root)]  # (indentation_level, node)
+        result = build_structure(events)
+        logger.info(f"解析完成，生成的结构包含 {len(result['topics'])} 个顶级主题")
+
+    if not stats["node_count"]:  # 空输入时为默认结构计算统计
+        stats = compute_tree_stats(result)
+
+    if compact:
+        result.stats = stats
+    else:
+        result["stats"] = stats
+
+    # 记录整个结构的统计信息
+    log_stats(stats)
+
+    return result
+
+def parse_text(text, compact=False, workers=None):
+    """
+    Parse indented text into a hierarchical structure.
     
-    logger.info("开始处理每一行...")
-    for i in range(1, len(lines)):
-        line = lines[i]
-        if not line.strip():  # Skip empty lines
-            logger.debug(f"跳过空行 #{i+1}")
-            continue
-            
-        current_indent = count_leading_spaces(line)
-        title = line.strip()
-        
-        # Remove leading dash/bullet if present
-        if title.startswith('-'):
-            title = title[1:].strip()
-            
-        logger.debug(f"行 #{i+1}: 缩进={current_indent}, 标题='{title}'")
-        
-        # Create new node
-        new_node = {"title": title, "topics": []}
-        
-        # Find the parent for this node
-        while stack and stack[-1][0] >= current_indent:
-            popped = stack.pop()
-            logger.debug(f"从栈中弹出缩进级别 {popped[0]}")
-        
-        if not stack:  # This should not happen with well-formed input
-            logger.warning("栈为空，这不应该发生！将节点添加到根节点下")
-            stack.append((0, root))
-            
-        # Add new node to its parent
-        parent_node = stack[-1][1]
-        parent_title = parent_node.get("title", "无标题")
-        logger.debug(f"将节点 '{title}' 添加到父节点 '{parent_title}' 下")
-        parent_node["topics"].append(new_node)
+    Args:
+        text (str): The input text with indentation representing hierarchy.
+        compact (bool): Return a CompactTree instead of nested dicts.
+        workers (int): Parse large inputs in this many processes (see parse_text_parallel).
         
-        # Add new node to stack
-        stack.append((current_indent, new_node))
-    
-    logger.info(f"解析完成，生成的结构包含 {len(root['topics'])} 个顶级主题")
-    
-    # 记录整个结构的完整信息
-    log_structure_info(root)
-    
-    return root
+    Returns:
+        dict | CompactTree: The hierarchical structure.
+    """
+    logger.info(f"开始解析文本，长度: {len(text)} 字符")
+
+    if workers and workers > 1 and len(text) >= PARALLEL_MIN_CHARS:
+        return parse_text_parallel(text, workers, compact=compact)
+
+    return parse_stream(io.StringIO(text), compact=compact)
+
+def find_min_indent(text, start=0):
+    """
+    Return the smallest indentation of the non-blank lines after position start.
+
+    Args:
+        text (str): The input text.
+        start (int): Offset of the newline that ends the root line.
+
+    Returns:
+        int: The minimum indentation, or None when there are no such lines.
+    """
+    first = re.compile(r'\n([^\S\n]*)\S').search(text, start)
+    if first is None:
+        return None
+
+    # 第一行的缩进是上界，再从小到大尝试更小的缩进
+    upper = len(first.group(1))
+    for indent in range(upper):
+        if re.compile(r'\n[^\S\n]{%d}\S' % indent).search(text, first.end()):
+            return indent
+    return upper
+
+def split_top_level_chunks(text, chunk_count):
+    """
+    Split an outline into chunks that start at top-level (minimum indent) lines.
+
+    Every chunk can be parsed on its own as the children of the root, because
+    a top-level line always closes everything opened before it.
+
+    Args:
+        text (str): The input text.
+        chunk_count (int): The desired number of chunks.
+
+    Returns:
+        tuple: (root_title, chunks), or (None, []) for empty input.
+    """
+    root_match = re.compile(r'[^\S\n]*(\S[^\n]*)').search(text)
+    if root_match is None:
+        return None, []
+    root_title = strip_bullet(root_match.group(1).strip())
+    body_start = root_match.end()
+
+    indent = find_min_indent(text, body_start)
+    if indent is None:
+        return root_title, []
+
+    boundary = re.compile(r'\n[^\S\n]{%d}\S' % indent)
+    starts = [body_start]
+    body_size = len(text) - body_start
+    for i in range(1, chunk_count):
+        target = max(body_start + body_size * i // chunk_count, starts[-1] + 1)
+        match = boundary.search(text, target)
+        if match is None:
+            break
+        if match.start() > starts[-1]:
+            starts.append(match.start())
+    starts.append(len(text))
+
+    chunks = [text[starts[i]:starts[i + 1]] for i in range(len(starts) - 1)]
+    return root_title, chunks
+
+def parse_chunk(chunk, compact=False):
+    """
+    Parse one chunk from split_top_level_chunks under a synthetic root.
+
+    Runs in a worker process.
+
+    Args:
+        chunk (str): The chunk text.
+        compact (bool): Return a CompactTree instead of a list of dicts.
+
+    Returns:
+        tuple: (topics, stats), where topics is the list of top-level dicts
+        or a CompactTree whose root children are the top-level topics.
+    """
+    stats = empty_stats()
+    records = iter_line_records(io.StringIO(chunk))
+    # 合成的根节点：缩进为0且永远不会被弹出，与完整解析时的根节点一致
+    events = iter_events_with_stats(iter_record_events(_prepend((0, ""), records)), stats)
+    if compact:
+        return CompactTree.from_events(events), stats
+    return build_structure(events)["topics"], stats
+
+def _prepend(first, records):
+    """Yield first, then every record."""
+    yield first
+    yield from records
+
+def parse_text_parallel(text, workers=None, compact=False):
+    """
+    Parse a large outline by splitting it at top-level boundaries and
+    parsing the chunks in a process pool.
+
+    The result is identical to parse_text(text, compact).
+
+    Args:
+        text (str): The input text.
+        workers (int): Number of worker processes, defaults to the CPU count.
+        compact (bool): Return a CompactTree instead of nested dicts.
+
+    Returns:
+        dict | CompactTree: The hierarchical structure.
+    """
+    workers = workers or os.cpu_count() or 1
+    root_title, chunks = split_top_level_chunks(text, workers * CHUNKS_PER_WORKER)
+    if root_title is None:
+        return parse_stream(io.StringIO(""), compact=compact)
+
+    logger.info(f"并行解析: {len(chunks)} 个块, {workers} 个进程")
+
+    stats = empty_stats()
+    stats["level_histogram"].append(1)
+    stats["node_count"] = 1
+    stats["title_bytes"] = len(root_title.encode('utf-8'))
+
+    if compact:
+        result = CompactTree()
+        result.add_node(-1, root_title)
+    else:
+        result = {"title": root_title, "topics": []}
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for topics, chunk_stats in executor.map(parse_chunk, chunks, [compact] * len(chunks)):
+            # 拼接子树到根节点下
+            if compact:
+                result.append_subtrees(0, topics)
+            else:
+                result["topics"].extend(topics)
+
+            # 合并统计信息，去掉合成根节点
+            histogram = chunk_stats["level_histogram"]
+            for depth in range(1, len(histogram)):
+                if depth == len(stats["level_histogram"]):
+                    stats["level_histogram"].append(0)
+                stats["level_histogram"][depth] += histogram[depth]
+            stats["node_count"] += chunk_stats["node_count"] - 1
+            stats["title_bytes"] += chunk_stats["title_bytes"]
+            stats["max_fanout"] = max(stats["max_fanout"], chunk_stats["max_fanout"])
+
+    stats["max_depth"] = len(stats["level_histogram"]) - 1
+    if len(stats["level_histogram"]) > 1:
+        stats["max_fanout"] = max(stats["max_fanout"], stats["level_histogram"][1])
+
+    if compact:
+        result.stats = stats
+    else:
+        result["stats"] = stats
 
-def log_structure_info(node, level=0, path="根节点"):
-    """记录结构的详细信息"""
-    logger.debug(f"{'  ' * level}路径: {path}, 标题: {node['title']}, 子主题数: {len(node.get('topics', []))}")
-    for i, topic in enumerate(node.get("topics", [])):
-        log_structure_info(topic, level+1, f"{path} > {i+1}")
+    log_stats(stats)
+    return result
 
 if __name__ == "__main__":
     # Simple test
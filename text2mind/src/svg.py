@@ -0,0 +1,120 @@
+"""
+Streaming SVG export of a tree layout.
+"""
+
+import io
+import os
+import logging
+import xml.sax.saxutils as saxutils
+
+try:
+    from .layout import (layout_tree, level_style, level_font_size, title_lines, LEVEL_STYLES, LEVEL_FONT_SIZES,
+                         BOX_PADDING_X, BOX_PADDING_Y)
+    from .fonts import line_height
+except ImportError:
+    # When run directly
+    from layout import (layout_tree, level_style, level_font_size, title_lines, LEVEL_STYLES, LEVEL_FONT_SIZES,
+                        BOX_PADDING_X, BOX_PADDING_Y)
+    from fonts import line_height
+
+logger = logging.getLogger("svg")
+
+# 浏览器中的字体，尽量与排版时测量用的字体一致
+SVG_FONT_FAMILY = "Arial, Helvetica, 'Noto Sans CJK SC', 'Microsoft YaHei', 'PingFang SC', sans-serif"
+
+# 每层一个样式类，更深的层使用最后一个
+SVG_LEVELS = max(len(LEVEL_STYLES), len(LEVEL_FONT_SIZES))
+
+def svg_level(depth):
+    """Return the index of the style class used for topics at a depth."""
+    return min(depth, SVG_LEVELS - 1)
+
+def svg_header(width, height):
+    """Return the opening <svg> tag and the per-level style sheet."""
+    lines = ['<?xml version="1.0" encoding="UTF-8"?>\n',
+             f'<svg xmlns="http://www.w3.org/2000/svg" width="{width}" height="{height}" '
+             f'viewBox="0 0 {width} {height}">\n',
+             '<style>\n',
+             f'text{{font-family:{SVG_FONT_FAMILY};dominant-baseline:central;white-space:pre}}\n',
+             'rect{stroke:black}\n',
+             'path{fill:none;stroke:black}\n']
+    for level in range(SVG_LEVELS):
+        fill, text_color, line_width = level_style(level)
+        lines.append(f'.b{level}{{fill:{fill}}} .t{level}{{fill:{text_color};font-size:{level_font_size(level)}px}} '
+                     f'.e{level}{{stroke-width:{line_width}}}\n')
+    lines.append('</style>\n')
+    lines.append(f'<rect width="{width}" height="{height}" fill="white" stroke="none"/>\n')
+    return "".join(lines)
+
+def svg_title(level, x, top, lines, spacing):
+    """Return the <text> element of a title; wrapped titles get one <tspan> per line."""
+    # 文字垂直居中对齐，每行的中线距框顶 BOX_PADDING_Y + (k + 0.5) 行
+    y = top + BOX_PADDING_Y + spacing / 2
+    if len(lines) == 1:
+        return f'<text class="t{level}" x="{x:.1f}" y="{y:.1f}">{saxutils.escape(lines[0])}</text>'
+    spans = "".join(f'<tspan x="{x:.1f}" y="{y + k * spacing:.1f}">{saxutils.escape(line)}</tspan>'
+                    for k, line in enumerate(lines))
+    return f'<text class="t{level}">{spans}</text>'
+
+def write_svg(f, layout):
+    """
+    Write a layout as SVG, one element at a time.
+
+    Connectors are written first so that boxes cover them, as in the bitmap
+    rendering. Nothing but the layout itself is held in memory.
+
+    Args:
+        f (file): Writable text file.
+        layout (TreeLayout): The layout to write.
+    """
+    width, height = layout.size
+    xs, ys, widths, heights, depths = layout.x, layout.y, layout.width, layout.height, layout.depth
+
+    f.write(svg_header(width, height))
+
+    f.write('<g>\n')
+    for i in range(1, len(layout)):
+        (x0, y0), (x1, y1) = layout.edge(i)
+        f.write(f'<path class="e{svg_level(depths[i])}" d="M{x0:.1f} {y0:.1f}L{x1:.1f} {y1:.1f}"/>\n')
+    f.write('</g>\n')
+
+    f.write('<g>\n')
+    for i in range(len(layout)):
+        depth = depths[i]
+        level = svg_level(depth)
+        left, top = xs[i], ys[i]
+        lines = title_lines(layout.titles[i], depth)
+        f.write(f'<rect class="b{level}" x="{left:.1f}" y="{top:.1f}" '
+                f'width="{widths[i]:.1f}" height="{heights[i]:.1f}"/>'
+                f'{svg_title(level, left + BOX_PADDING_X, top, lines, line_height(level_font_size(depth)))}\n')
+    f.write('</g>\n')
+
+    f.write('</svg>\n')
+
+def export_svg(structure, output):
+    """
+    Lay out a structure and write it as SVG (see write_svg).
+
+    Args:
+        structure (dict | CompactTree): The structure to visualize.
+        output (str | file): Path, or writable text or binary file object.
+
+    Returns:
+        str | file: output.
+    """
+    layout = layout_tree(structure)
+
+    if isinstance(output, (str, os.PathLike)):
+        with open(output, 'w', encoding='utf-8') as f:
+            write_svg(f, layout)
+    elif isinstance(output, io.TextIOBase):
+        write_svg(output, layout)
+    else:
+        # 二进制流外包一层文本编码，写完后解除包装，不关闭调用方的流
+        f = io.TextIOWrapper(output, encoding='utf-8')
+        write_svg(f, layout)
+        f.flush()
+        f.detach()
+
+    logger.info(f"SVG已导出: {len(layout)} 个主题, 画布 {layout.size[0]}x{layout.size[1]}")
+    return output
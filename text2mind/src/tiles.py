@@ -0,0 +1,274 @@
+"""
+Tiled DeepZoom (.dzi) export for maps too large for a single image.
+"""
+
+import io
+import os
+import math
+import logging
+from array import array
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from PIL import Image, ImageDraw
+
+try:
+    from .layout import layout_tree, draw_layout
+except ImportError:
+    # When run directly
+    from layout import layout_tree, draw_layout
+
+logger = logging.getLogger("tiles")
+
+# 瓦片边长（像素），同时也是空间索引的网格大小
+DEFAULT_TILE_SIZE = 1024
+
+# 瓦片图片格式
+TILE_FORMAT = "png"
+
+DZI_NAMESPACE = "http://schemas.microsoft.com/deepzoom/2008"
+
+# 每个工作进程最多排队的瓦片数，限制父进程中待写出结果占用的内存
+TILES_PER_WORKER = 4
+
+class SpatialGrid:
+    """
+    Uniform grid over a layout's canvas for finding the nodes inside a rectangle.
+
+    Each node is registered in every cell touched by its box or by the
+    connector from its parent, so a query returns everything that may have
+    to be drawn in the rectangle.
+    """
+
+    def __init__(self, layout, cell_size=DEFAULT_TILE_SIZE):
+        self.cell_size = cell_size
+        # (列, 行) -> 节点编号
+        self.cells = {}
+        cells = self.cells
+        xs, ys, widths, heights, parents = layout.x, layout.y, layout.width, layout.height, layout.parent
+        for i in range(len(layout)):
+            left = xs[i]
+            top = ys[i]
+            right = left + widths[i]
+            bottom = top + heights[i]
+            parent = parents[i]
+            if parent >= 0:
+                # 连线从父主题右侧中点连到本主题左侧中点
+                anchor = ys[parent] + heights[parent] / 2
+                left = xs[parent] + widths[parent]
+                top = min(top, anchor)
+                bottom = max(bottom, anchor)
+            for row in range(int(top // cell_size), int(bottom // cell_size) + 1):
+                for col in range(int(left // cell_size), int(right // cell_size) + 1):
+                    cell = cells.get((col, row))
+                    if cell is None:
+                        cell = cells[(col, row)] = array('i')
+                    cell.append(i)
+
+    def query(self, left, top, right, bottom):
+        """Return the ascending ids of the nodes that may intersect the rectangle."""
+        cell_size = self.cell_size
+        first_col, last_col = int(left // cell_size), int(right // cell_size)
+        first_row, last_row = int(top // cell_size), int(bottom // cell_size)
+
+        # 查询范围的格子数多于已有格子时直接遍历已有格子
+        if (last_col - first_col + 1) * (last_row - first_row + 1) > len(self.cells):
+            keys = [key for key in self.cells
+                    if first_col <= key[0] <= last_col and first_row <= key[1] <= last_row]
+        else:
+            keys = [(col, row) for row in range(first_row, last_row + 1) for col in range(first_col, last_col + 1)]
+
+        found = set()
+        for key in keys:
+            cell = self.cells.get(key)
+            if cell is not None:
+                found.update(cell)
+        return sorted(found)
+
+def pyramid_levels(width, height):
+    """
+    Return the DeepZoom levels of an image as (level, scale, width, height).
+
+    Level 0 is 1x1 pixel and every level doubles the previous one, up to the
+    full size at the last level.
+    """
+    max_level = math.ceil(math.log2(max(width, height, 1)))
+    levels = []
+    for level in range(max_level + 1):
+        factor = 2 ** (max_level - level)
+        levels.append((level, 1 / factor, math.ceil(width / factor), math.ceil(height / factor)))
+    return levels
+
+def dzi_descriptor(width, height, tile_size, tile_format=TILE_FORMAT):
+    """Return the .dzi XML for an image of the given size."""
+    return ('<?xml version="1.0" encoding="UTF-8"?>\n'
+            f'<Image xmlns="{DZI_NAMESPACE}" Format="{tile_format}" Overlap="0" TileSize="{tile_size}">\n'
+            f'  <Size Width="{width}" Height="{height}"/>\n'
+            '</Image>\n')
+
+def render_tile(layout, grid, scale, left, top, width, height):
+    """
+    Render one tile of a layout.
+
+    Args:
+        layout (TreeLayout): The layout.
+        grid (SpatialGrid): Spatial index of the layout.
+        scale (float): Zoom factor of the pyramid level.
+        left (int): Left edge of the tile in level pixels.
+        top (int): Top edge of the tile in level pixels.
+        width (int): Tile width in pixels.
+        height (int): Tile height in pixels.
+
+    Returns:
+        PIL.Image: The tile, or None if nothing is drawn on it.
+    """
+    origin = (left / scale, top / scale)
+    nodes = grid.query(origin[0], origin[1], (left + width) / scale, (top + height) / scale)
+    if not nodes:
+        return None
+    return draw_nodes(layout, nodes, scale, origin, (width, height))
+
+def draw_nodes(layout, nodes, scale, origin, size, fmt=None):
+    """
+    Draw some nodes of a layout on a new white image.
+
+    Runs in a worker process for parallel rendering, with a layout slice
+    from TreeLayout.subset.
+
+    Args:
+        layout (TreeLayout): The layout or layout slice.
+        nodes (list): Ascending ids of the nodes to draw.
+        scale (float): Zoom factor.
+        origin (tuple): Layout point drawn at the image's top-left corner.
+        size (tuple): Image (width, height) in pixels.
+        fmt (str): Encode the image in this PIL format, None to return the image.
+
+    Returns:
+        PIL.Image | bytes: The image, or its encoded bytes.
+    """
+    img = Image.new('RGB', size, color='white')
+    draw_layout(ImageDraw.Draw(img), layout, scale, origin, nodes)
+    if fmt is None:
+        return img
+    out = io.BytesIO()
+    img.save(out, format=fmt)
+    return out.getvalue()
+
+def iter_rendered_tiles(layout, grid, tiles, workers=None, fmt=None):
+    """
+    Render rectangles of a layout, optionally in a process pool.
+
+    Each worker only receives the slice of the layout its tile needs, and
+    results are yielded in the order of tiles. Blank tiles are not rendered.
+
+    Args:
+        layout (TreeLayout): The layout.
+        grid (SpatialGrid): Spatial index of the layout.
+        tiles (iterable): (key, scale, left, top, width, height) per tile, in level pixels.
+        workers (int): Number of worker processes; None or 1 renders in this process.
+        fmt (str): Encode the tiles in this PIL format, None for images.
+
+    Yields:
+        tuple: (key, result), where result is the image or its encoded bytes,
+        or None for a blank tile.
+    """
+    if not workers or workers <= 1:
+        for key, scale, left, top, width, height in tiles:
+            img = render_tile(layout, grid, scale, left, top, width, height)
+            if img is not None and fmt is not None:
+                out = io.BytesIO()
+                img.save(out, format=fmt)
+                img = out.getvalue()
+            yield key, img
+        return
+
+    logger.info(f"并行渲染瓦片: {workers} 个进程")
+    pending = deque()
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for key, scale, left, top, width, height in tiles:
+            origin = (left / scale, top / scale)
+            nodes = grid.query(origin[0], origin[1], (left + width) / scale, (top + height) / scale)
+            if nodes:
+                sub, ids = layout.subset(nodes)
+                pending.append((key, executor.submit(draw_nodes, sub, ids, scale, origin, (width, height), fmt)))
+            else:
+                pending.append((key, None))
+            # 按提交顺序取回结果，排队的瓦片数有上限
+            while len(pending) > workers * TILES_PER_WORKER:
+                done_key, future = pending.popleft()
+                yield done_key, future and future.result()
+        while pending:
+            done_key, future = pending.popleft()
+            yield done_key, future and future.result()
+
+def write_tiles(layout, dzi_path, tile_size=DEFAULT_TILE_SIZE, workers=None):
+    """
+    Write a layout as a DeepZoom pyramid: dzi_path plus a "<name>_files" directory
+    with one "<level>/<column>_<row>.png" tile per tile_size square.
+
+    Every tile is drawn from the layout at its level's scale and written to disk
+    straight away, so peak memory depends on the tile size, not on the map size.
+
+    Args:
+        layout (TreeLayout): The layout to render.
+        dzi_path (str): Path of the .dzi descriptor.
+        tile_size (int): Tile edge length in pixels.
+        workers (int): Number of processes rendering tiles; None or 1 renders
+            in this process.
+
+    Returns:
+        str: dzi_path.
+    """
+    width, height = layout.size
+    grid = SpatialGrid(layout, tile_size)
+    files_dir = os.path.splitext(dzi_path)[0] + "_files"
+
+    def tiles():
+        for level, scale, level_width, level_height in pyramid_levels(width, height):
+            level_dir = os.path.join(files_dir, str(level))
+            os.makedirs(level_dir, exist_ok=True)
+            for row in range(math.ceil(level_height / tile_size)):
+                for col in range(math.ceil(level_width / tile_size)):
+                    left = col * tile_size
+                    top = row * tile_size
+                    tile_width = min(tile_size, level_width - left)
+                    tile_height = min(tile_size, level_height - top)
+                    tile_path = os.path.join(level_dir, f"{col}_{row}.{TILE_FORMAT}")
+                    yield (tile_path, tile_width, tile_height), scale, left, top, tile_width, tile_height
+
+    # 空白瓦片只编码一次
+    blank_tiles = {}
+    tile_count = 0
+
+    for (tile_path, tile_width, tile_height), data in iter_rendered_tiles(layout, grid, tiles(), workers,
+                                                                           TILE_FORMAT):
+        if data is None:
+            data = blank_tiles.get((tile_width, tile_height))
+            if data is None:
+                out = io.BytesIO()
+                Image.new('RGB', (tile_width, tile_height), color='white').save(out, format=TILE_FORMAT)
+                data = blank_tiles[(tile_width, tile_height)] = out.getvalue()
+        with open(tile_path, 'wb') as f:
+            f.write(data)
+        tile_count += 1
+
+    # 最后写描述文件，存在即表示瓦片已全部写完
+    with open(dzi_path, 'w', encoding='utf-8') as f:
+        f.write(dzi_descriptor(width, height, tile_size))
+
+    logger.info(f"瓦片导出完成: {dzi_path}, {width}x{height}, {tile_count} 个瓦片")
+    return dzi_path
+
+def export_tiles(structure, dzi_path, tile_size=DEFAULT_TILE_SIZE, workers=None):
+    """
+    Lay out a structure and write it as a DeepZoom pyramid (see write_tiles).
+
+    Args:
+        structure (dict | CompactTree): The structure to visualize.
+        dzi_path (str): Path of the .dzi descriptor.
+        tile_size (int): Tile edge length in pixels.
+        workers (int): Number of processes rendering tiles.
+
+    Returns:
+        str: dzi_path.
+    """
+    return write_tiles(layout_tree(structure), dzi_path, tile_size, workers)
@@ -0,0 +1,109 @@
+"""
+Explicit-stack tree traversal shared by the parser, generators and counters.
+
+All walks go through these helpers instead of recursion, so arbitrarily deep
+outlines never hit Python's recursion limit.
+"""
+
+try:
+    from .compact_tree import get_accessors
+except ImportError:
+    # When run directly
+    from compact_tree import get_accessors
+
+def walk(structure, enter=None, exit=None, node=None, depth=0):
+    """
+    Depth-first traversal with pre-order and post-order callbacks.
+
+    Both callbacks are called as callback(node, depth, index, children), where
+    index is the node's position among its siblings (0 for the start node)
+    and children is the list of its child node handles. If enter returns
+    False the node's children are skipped; exit is still called, with an
+    empty children tuple.
+
+    Args:
+        structure (dict | CompactTree): The tree to walk.
+        enter (callable): Called when a node is entered.
+        exit (callable): Called after all of a node's children were walked.
+        node: The node handle to start from, defaults to the root.
+        depth (int): The depth reported for the start node.
+    """
+    root, _, children_of = get_accessors(structure)
+    if node is None:
+        node = root
+
+    children = children_of(node)
+    if enter is not None and enter(node, depth, 0, children) is False:
+        children = ()
+
+    # 栈中每一项: (节点, 深度, 兄弟序号, 子节点列表, 子节点迭代器)
+    stack = [(node, depth, 0, children, enumerate(children))]
+    while stack:
+        top = stack[-1]
+        item = next(top[4], None)
+        if item is None:
+            stack.pop()
+            if exit is not None:
+                exit(top[0], top[1], top[2], top[3])
+            continue
+
+        index, child = item
+        child_depth = top[1] + 1
+        child_children = children_of(child)
+        if enter is not None and enter(child, child_depth, index, child_children) is False:
+            child_children = ()
+        stack.append((child, child_depth, index, child_children, enumerate(child_children)))
+
+def iter_preorder(structure, node=None, depth=0):
+    """
+    Iterate over nodes in pre-order.
+
+    Args:
+        structure (dict | CompactTree): The tree to walk.
+        node: The node handle to start from, defaults to the root.
+        depth (int): The depth reported for the start node.
+
+    Yields:
+        tuple: (node, depth)
+    """
+    root, _, children_of = get_accessors(structure)
+    stack = [(root if node is None else node, depth)]
+    while stack:
+        node, depth = stack.pop()
+        yield node, depth
+        children = children_of(node)
+        for i in range(len(children) - 1, -1, -1):
+            stack.append((children[i], depth + 1))
+
+def count_subtree(structure, node=None):
+    """Return the number of nodes in the subtree rooted at node (default: the root)."""
+    count = 0
+    for _ in iter_preorder(structure, node):
+        count += 1
+    return count
+
+def trees_equal(first, second):
+    """
+    Compare two dict structures by title and children, without recursion.
+
+    Args:
+        first (dict): A dict node.
+        second (dict): Another dict node.
+
+    Returns:
+        bool: True if both subtrees have the same titles in the same shape.
+    """
+    _, title_of, children_of = get_accessors(first)
+    stack = [(first, second)]
+    while stack:
+        a, b = stack.pop()
+        if a is b:
+            continue
+        if title_of(a) != title_of(b):
+            return False
+        a_children = children_of(a)
+        b_children = children_of(b)
+        if len(a_children) != len(b_children):
+            return False
+        stack.extend(zip(a_children, b_children))
+    return True
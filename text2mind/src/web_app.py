@@ -2,6 +2,7 @@
 Web interface for the text2mind tool.
 """
 
+import io
 import os
 import tempfile
 import uuid
@@ -26,12 +27,14 @@ if __name__ == '__main__':
 
 # Use relative imports for package
 try:
-    from .parser import parse_text
-    from .xmind_generator import create_xmind_from_structure
+    from .parser import parse_text, parse_stream
+    from .xmind_generator import create_xmind_from_structure, write_fallback_xmind, OUTPUT_PROFILES, DEFAULT_PROFILE
+    from .cache import get_default_cache
 except ImportError:
     # When run directly
-    from parser import parse_text
-    from xmind_generator import create_xmind_from_structure
+    from parser import parse_text, parse_stream
+    from xmind_generator import create_xmind_from_structure, write_fallback_xmind, OUTPUT_PROFILES, DEFAULT_PROFILE
+    from cache import get_default_cache
 
 # Define template directory
 template_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'templates')
@@ -44,6 +47,9 @@ app.config['MAX_CONTENT_LENGTH'] = 50 * 1024 * 1024  # 50MB
 TEMP_DIR = os.path.join(tempfile.gettempdir(), 'text2mind')
 os.makedirs(TEMP_DIR, exist_ok=True)
 
+# 生成的压缩包在内存中构建，超过该大小后才溢出到临时文件
+SPOOL_MAX_BYTES = 16 * 1024 * 1024
+
 @app.route('/')
 def index():
     """Render the main page."""
@@ -55,6 +61,10 @@ def convert():
     """Convert text to mind map xmind file."""
     logger.info("收到转换请求")
     
+    # 纯文本请求体直接流式解析，避免把整个大纲读入内存
+    if request.mimetype == 'text/plain':
+        return convert_stream()
+    
     text = request.form.get('text', '')
     logger.info(f"收到文本，长度: {len(text)}")
     
@@ -72,8 +82,16 @@ def convert():
     except Exception as e:
         logger.error(f"保存原始文本时出错: {e}", exc_info=True)
     
-    # Generate unique filenames
-    xmind_path = os.path.join(TEMP_DIR, f"{text_id}.xmind")
+    profile = request.form.get('profile') or request.args.get('profile', DEFAULT_PROFILE)
+    if profile not in OUTPUT_PROFILES:
+        return render_template('index.html', error=f'Unknown output profile: {profile}')
+    
+    # 相同文本直接返回缓存的文件
+    cache = get_default_cache()
+    cache_key = cache.key(text, {"profile": profile})
+    cached = cache.get(cache_key)
+    if cached is not None:
+        return send_xmind(io.BytesIO(cached))
     
     try:
         # Parse the text
@@ -93,22 +111,81 @@ def convert():
         
         # Create XMind file
         logger.info("开始创建XMind文件...")
-        create_xmind_from_structure(structure, xmind_path)
-        logger.info(f"XMind文件创建完成: {xmind_path}")
-        
-        # 查看并记录生成的文件大小
-        file_size = os.path.getsize(xmind_path)
-        logger.info(f"生成的XMind文件大小: {file_size} 字节")
+        archive = build_xmind(structure, cache, cache_key, profile)
         
         # Return the XMind file
-        return send_file(xmind_path, 
-                         mimetype='application/octet-stream',
-                         as_attachment=True, 
-                         download_name='mindmap.xmind')
+        return send_xmind(archive)
     except Exception as e:
         logger.error(f"处理请求时出错: {e}", exc_info=True)
         return render_template('index.html', error=f'An error occurred: {str(e)}')
 
+def convert_stream():
+    """Convert a text/plain request body to an xmind file, parsing it line by line."""
+    logger.info("使用流式方式解析请求体")
+    
+    profile = request.args.get('profile', DEFAULT_PROFILE)
+    if profile not in OUTPUT_PROFILES:
+        return Response(f'Unknown output profile: {profile}', status=400)
+    
+    try:
+        # 请求体只能读取一次，所以在解析的同时计算缓存键，命中时跳过生成
+        cache = get_default_cache()
+        hasher = cache.new_hasher({"profile": profile})
+        
+        def hashed_lines():
+            for line in request.stream:
+                hasher.update(line)
+                yield line
+        
+        structure = parse_stream(hashed_lines())
+        logger.info(f"解析完成，生成结构中顶级主题数: {len(structure.get('topics', []))}")
+        
+        cache_key = hasher.hexdigest()
+        cached = cache.get(cache_key)
+        if cached is not None:
+            return send_xmind(io.BytesIO(cached))
+        
+        return send_xmind(build_xmind(structure, cache, cache_key, profile))
+    except Exception as e:
+        logger.error(f"处理流式请求时出错: {e}", exc_info=True)
+        return Response(f'An error occurred: {str(e)}', status=500)
+
+def build_xmind(structure, cache, cache_key, profile=DEFAULT_PROFILE):
+    """
+    Build the xmind archive in memory (spilling to disk when large) and store it in the cache.
+    
+    If the regular writer fails, the basic fallback archive is returned instead
+    and is not cached.
+    """
+    logger.info("开始创建XMind文件...")
+    archive = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_BYTES, dir=TEMP_DIR)
+    try:
+        create_xmind_from_structure(structure, archive, profile=profile, fallback=False)
+        cacheable = True
+    except Exception as e:
+        logger.error(f"创建XMind文件时出错，改用备用格式: {e}", exc_info=True)
+        if not write_fallback_xmind(structure, archive):
+            archive.close()
+            raise RuntimeError("Failed to create the XMind file")
+        cacheable = False
+    
+    # 查看并记录生成的文件大小
+    logger.info(f"生成的XMind文件大小: {archive.tell()} 字节")
+    
+    # 备用格式的文件不写入缓存，以免之后相同的请求一直拿到降级的结果
+    if cacheable:
+        archive.seek(0)
+        cache.put_stream(cache_key, archive)
+    archive.seek(0)
+    return archive
+
+def send_xmind(fileobj):
+    """Send an xmind archive held in a file object as a download."""
+    return send_file(fileobj,
+                     mimetype='application/octet-stream',
+                     as_attachment=True,
+                     download_name='mindmap.xmind')
+
 # 添加一个简单的健康检查路由
 @app.route('/health')
 def health():
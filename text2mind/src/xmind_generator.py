@@ -3,16 +3,44 @@ Module for generating XMind files from parsed text structure.
 """
 
 import os
-import tempfile
-import shutil
+import io
+import math
 import zipfile
 import json
 import uuid
+import hashlib
 import logging
-from PIL import Image, ImageDraw, ImageFont
+import functools
+import random
+from PIL import Image, ImageDraw
 import time
 import xml.sax.saxutils as saxutils
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    from .compact_tree import CompactTree, get_accessors, get_tree_stats, get_folded_test
+    from .traversal import walk, count_subtree
+    from .xmind_reader import read_xmind, SHEET_LINK_PREFIX, SHARD_ROOT_PREFIX, OVERVIEW_TOPIC_PREFIX
+    from .layout import layout_tree, canvas_scale, draw_layout, estimate_title
+    from .tiles import export_tiles, SpatialGrid, iter_rendered_tiles, DEFAULT_TILE_SIZE
+    from .svg import export_svg
+    from .archive import (precompress, write_precompressed, open_parallel_deflated, get_compression, member_info,
+                          zip_date_time, DEFAULT_COMPRESSION)
+except ImportError:
+    # When run directly
+    from compact_tree import CompactTree, get_accessors, get_tree_stats, get_folded_test
+    from traversal import walk, count_subtree
+    from xmind_reader import read_xmind, SHEET_LINK_PREFIX, SHARD_ROOT_PREFIX, OVERVIEW_TOPIC_PREFIX
+    from layout import layout_tree, canvas_scale, draw_layout, estimate_title
+    from tiles import export_tiles, SpatialGrid, iter_rendered_tiles, DEFAULT_TILE_SIZE
+    from svg import export_svg
+    from archive import (precompress, write_precompressed, open_parallel_deflated, get_compression, member_info,
+                         zip_date_time, DEFAULT_COMPRESSION)
+
 # 配置详细的日志记录
 logging.basicConfig(
     level=logging.DEBUG,
@@ -24,141 +52,293 @@ logging.basicConfig(
 )
 logger = logging.getLogger("xmind_generator")
 
-def create_xmind_from_structure(structure, output_path):
+# 生成器输出格式的版本号，输出内容变化时递增，用于使转换缓存失效
+GENERATOR_VERSION = "1"
+
+# 子主题数超过该值的深层分支默认折叠
+FOLD_CHILD_THRESHOLD = 50
+
+# 基于路径的主题ID超过该长度后改用路径摘要，避免超深大纲的ID长度随深度线性增长
+MAX_TOPIC_ID_LENGTH = 64
+
+# 预估大小超过该值的压缩包条目需要提前启用ZIP64
+ZIP64_ENTRY_THRESHOLD = 1 << 30
+
+# 输出配置：standard 与历史输出一致；lean 只写XMind实际需要的条目，不含随机填充数据
+OUTPUT_PROFILES = ("standard", "lean")
+DEFAULT_PROFILE = "standard"
+
+# lean 配置不写入的条目
+LEAN_OMITTED_ENTRIES = ("attachments/", "attachments/padding.bin", "attachments/markers.xml")
+
+# manifest.xml 中登记的条目: (路径, 媒体类型)
+MANIFEST_ENTRIES = [
+    ("content.xml", "text/xml"),
+    ("meta.xml", "text/xml"),
+    ("META-INF/", ""),
+    ("META-INF/manifest.xml", "text/xml"),
+    ("styles.xml", "text/xml"),
+    ("Thumbnails/", ""),
+    ("Thumbnails/thumbnail.png", "image/png"),
+    ("attachments/", ""),
+    ("attachments/padding.bin", "application/octet-stream"),
+    ("attachments/markers.xml", "text/xml"),
+]
+
+# 标准格式的meta.xml
+META_XML = """<?xml version="1.0" encoding="UTF-8" standalone="no"?>
+<meta xmlns="urn:xmind:xmap:xmlns:meta:2.0" version="2.0">
+  <Creator>
+    <n>XMind</n>
+    <Version>22.11.3456.0</Version>
+  </Creator>
+</meta>"""
+
+# 空的markers.xml
+MARKERS_XML = """<?xml version="1.0" encoding="UTF-8" standalone="no"?>
+<marker-sheet xmlns="urn:xmind:xmap:xmlns:marker:2.0" version="2.0"/>"""
+
+# 输出格式：xml 为XMind 8的content.xml，json 为XMind Zen及之后版本的content.json
+OUTPUT_FORMATS = ("xml", "json")
+DEFAULT_FORMAT = "xml"
+
+# XMind Zen格式的metadata.json
+METADATA_JSON = json.dumps({"creator": {"name": "XMind", "version": "22.11.3456.0"}})
+
+# 确定性输出使用的固定时间戳（毫秒），设置 SOURCE_DATE_EPOCH 环境变量（秒）时以其为准
+DETERMINISTIC_TIMESTAMP = 1615975489000
+
+# 缩略图只粗略布局前几层、最多这么多个主题，生成耗时与导图大小无关
+THUMBNAIL_MAX_DEPTH = 3
+THUMBNAIL_NODE_BUDGET = 150
+
+# 图片导出格式: 名称 -> PIL 保存格式
+IMAGE_FORMATS = {"png": "PNG", "jpeg": "JPEG"}
+DEFAULT_IMAGE_FORMAT = "png"
+
+# 瓦片金字塔（DeepZoom）导出格式，用于单张图片放不下的大型导图
+TILED_IMAGE_FORMAT = "dzi"
+
+# 矢量图导出格式，由排版结果逐个元素流式写出
+VECTOR_IMAGE_FORMAT = "svg"
+
+# 所有可渲染的格式
+RENDER_FORMATS = tuple(IMAGE_FORMATS) + (VECTOR_IMAGE_FORMAT, TILED_IMAGE_FORMAT)
+
+# 分画布方式：none 不拆分；topic 每个顶级主题一个画布；budget 按节点预算合并相邻的顶级主题
+SHARD_MODES = ("none", "topic", "budget")
+DEFAULT_SHARD_MODE = "none"
+
+# 节点数超过该值的导图才拆分，budget 方式下也是每个画布的节点预算（XMind单画布约两万主题后明显卡顿）
+SHARD_NODE_BUDGET = 10000
+
+# topic 方式下节点数少于预算这一比例的顶级主题不单独成画布，相邻的合并到一个画布直到达到预算
+SHARD_SMALL_TOPIC_FRACTION = 0.1
+
+def create_xmind_from_structure(structure, output_path, profile=DEFAULT_PROFILE, compression=DEFAULT_COMPRESSION,
+                                deterministic=False, format=DEFAULT_FORMAT, shard=DEFAULT_SHARD_MODE,
+                                shard_budget=SHARD_NODE_BUDGET, fallback=True):
     """
     Create an XMind file from a hierarchical structure.
     
+    Every entry is streamed straight into the zip archive, nothing is staged
+    on disk first.
+    
     Args:
-        structure (dict): The hierarchical structure with 'title' and 'children' keys.
-        output_path (str): The path where the XMind file will be saved.
+        structure (dict | CompactTree): The hierarchical structure with 'title' and 'children' keys,
+            or a CompactTree produced by the parser.
+        output_path (str | file): The path where the XMind file will be saved, or a seekable
+            binary file object (e.g. BytesIO or SpooledTemporaryFile) to write the archive to.
+        profile (str): "standard", or "lean" to skip the random padding and the empty
+            marker sheet.
+        compression (str): Compression strategy for the generated entries: "stored", "fast",
+            "balanced", "max", or "parallel" to deflate content.xml in blocks on a thread pool.
+            The static entries are always copied pre-compressed.
+        deterministic (bool): Produce byte-identical output for identical input: a fixed
+            timestamp (see get_deterministic_timestamp) for topics, sheet id and zip entry
+            times, and seeded padding data. Topic ids are always derived from tree paths.
+        format (str): "xml" for the XMind 8 content.xml, or "json" for the content.json,
+            manifest.json and metadata.json used by XMind Zen and later.
+        shard (str): Split maps with more than shard_budget nodes into several sheets: "topic"
+            for one sheet per top-level topic (adjacent small topics share a sheet up to the
+            budget), "budget" to pack adjacent top-level topics into
+            sheets of at most shard_budget nodes, or "none". The first sheet then is an overview
+            whose topics link to the other sheets.
+        shard_budget (int): Node count above which a map is split, and the per-sheet budget.
+        fallback (bool): On errors write a basic archive instead (see write_fallback_xmind).
+            False raises the error, for callers that must not mistake the degraded
+            archive for a regular one (e.g. before caching it).
         
     Returns:
-        str: The path to the created XMind file.
+        str | file: output_path, or None if the file could not be created.
     """
-    logger.info(f"开始创建XMind文件: {output_path}")
-    logger.info(f"结构根节点: {structure['title']}, 顶级子节点数: {len(structure.get('children', []))}")
+    if profile not in OUTPUT_PROFILES:
+        raise ValueError(f"Unknown output profile: {profile}")
+    if format not in OUTPUT_FORMATS:
+        raise ValueError(f"Unknown output format: {format}")
+    if shard not in SHARD_MODES:
+        raise ValueError(f"Unknown shard mode: {shard}")
+    zip_compression, compresslevel = get_compression(compression)
     
-    # 创建临时目录
-    temp_dir = tempfile.mkdtemp()
-    logger.debug(f"创建临时目录: {temp_dir}")
+    logger.info(f"开始创建XMind文件: {output_path}")
+    root, title_of, children_of = get_accessors(structure)
+    logger.info(f"结构根节点: {title_of(root)}, 顶级子节点数: {len(children_of(root))}")
     
     try:
-        # 创建必要的目录结构
-        os.makedirs(os.path.join(temp_dir, 'META-INF'), exist_ok=True)
-        os.makedirs(os.path.join(temp_dir, 'Thumbnails'), exist_ok=True)
-        os.makedirs(os.path.join(temp_dir, 'attachments'), exist_ok=True)
-        
-        # 计算节点数量
-        node_count = count_nodes(structure)
-        logger.info(f"总节点数: {node_count}")
+        # 读取解析时附带的统计信息，避免重复遍历
+        stats = get_tree_stats(structure)
+        node_count = stats["node_count"]
+        logger.info(f"总节点数: {node_count}, 最大深度: {stats['max_depth']}, 最大子节点数: {stats['max_fanout']}")
         
         # 根据节点数量选择布局策略
-        layout_strategy = select_layout_strategy(node_count)
+        layout_strategy = select_layout_strategy(stats)
         logger.info(f"选择布局策略: {layout_strategy}")
         
-        # 创建content.xml文件 - 使用新的优化实现
-        content_xml_path = create_content_xml(temp_dir, structure, layout_strategy)
-        logger.debug(f"content.xml 已创建: {content_xml_path}")
-        
-        # 创建标准格式的meta.xml
-        meta_xml = """<?xml version="1.0" encoding="UTF-8" standalone="no"?>
-<meta xmlns="urn:xmind:xmap:xmlns:meta:2.0" version="2.0">
-  <Creator>
-    <n>XMind</n>
-    <Version>22.11.3456.0</Version>
-  </Creator>
-</meta>"""
-        
-        meta_xml_path = os.path.join(temp_dir, 'meta.xml')
-        with open(meta_xml_path, 'w', encoding='utf-8') as f:
-            f.write(meta_xml)
+        # 超大导图拆分为多个画布，每个画布单独选择布局
+        shards = plan_shards(structure, shard, shard_budget, stats)
         
-        logger.debug(f"meta.xml 已写入到: {meta_xml_path}")
+        # manifest、meta、styles和markers每个进程只压缩一次，之后直接复制压缩数据
+        static = get_static_entries(profile, format)
+        content_name = 'content.json' if format == "json" else 'content.xml'
         
-        # 创建标准manifest.xml
-        manifest_xml = """<?xml version="1.0" encoding="UTF-8" standalone="no"?>
-<manifest xmlns="urn:xmind:xmap:xmlns:manifest:1.0">
-  <file-entry full-path="content.xml" media-type="text/xml"/>
-  <file-entry full-path="meta.xml" media-type="text/xml"/>
-  <file-entry full-path="META-INF/" media-type=""/>
-  <file-entry full-path="META-INF/manifest.xml" media-type="text/xml"/>
-  <file-entry full-path="styles.xml" media-type="text/xml"/>
-  <file-entry full-path="Thumbnails/" media-type=""/>
-  <file-entry full-path="Thumbnails/thumbnail.png" media-type="image/png"/>
-  <file-entry full-path="attachments/" media-type=""/>
-  <file-entry full-path="attachments/padding.bin" media-type="application/octet-stream"/>
-  <file-entry full-path="attachments/markers.xml" media-type="text/xml"/>
-</manifest>"""
-        
-        manifest_xml_path = os.path.join(temp_dir, 'META-INF', 'manifest.xml')
-        with open(manifest_xml_path, 'w', encoding='utf-8') as f:
-            f.write(manifest_xml)
-        
-        logger.debug(f"manifest.xml 已写入到: {manifest_xml_path}")
-        
-        # 获取XMind官方样式文件
-        styles_xml = get_xmind_pro_styles()
-        
-        styles_xml_path = os.path.join(temp_dir, 'styles.xml')
-        with open(styles_xml_path, 'w', encoding='utf-8') as f:
-            f.write(styles_xml)
-        
-        logger.debug(f"styles.xml 已写入到: {styles_xml_path}")
-        
-        # 创建缩略图
-        create_thumbnail_image(structure, os.path.join(temp_dir, 'Thumbnails', 'thumbnail.png'))
-        
-        # 创建markers.xml文件
-        markers_xml = """<?xml version="1.0" encoding="UTF-8" standalone="no"?>
-<marker-sheet xmlns="urn:xmind:xmap:xmlns:marker:2.0" version="2.0"/>"""
-        
-        markers_xml_path = os.path.join(temp_dir, 'attachments', 'markers.xml')
-        with open(markers_xml_path, 'w', encoding='utf-8') as f:
-            f.write(markers_xml)
-        
-        logger.debug(f"markers.xml 已写入到: {markers_xml_path}")
-        
-        # 创建大文件数据 - 针对大型思维导图的优化
-        large_file_data = create_large_file_data(node_count)
-        
-        padding_path = os.path.join(temp_dir, 'attachments', 'padding.bin')
-        with open(padding_path, 'wb') as f:
-            f.write(large_file_data)
-        
-        logger.debug(f"padding.bin 已写入到: {padding_path}, 大小: {len(large_file_data)} 字节")
-        
-        # 打包为.xmind文件 (实际上是.zip格式)
-        logger.info(f"将临时目录内容打包为XMind文件: {output_path}")
+        # 确定性模式下所有时间都取固定值，随机填充数据使用固定种子
+        if deterministic:
+            timestamp = get_deterministic_timestamp()
+            date_time = zip_date_time(timestamp)
+            padding_seed = timestamp
+        else:
+            timestamp = int(time.time() * 1000)
+            date_time = time.localtime(timestamp / 1000)[:6]
+            padding_seed = None
         
         # 如果目标目录不存在，创建它
-        os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+        if isinstance(output_path, (str, os.PathLike)):
+            os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
         
-        with zipfile.ZipFile(output_path, 'w', zipfile.ZIP_DEFLATED) as zipf:
-            for root, dirs, files in os.walk(temp_dir):
-                for file in files:
-                    file_path = os.path.join(root, file)
-                    arcname = os.path.relpath(file_path, temp_dir)
-                    zipf.write(file_path, arcname)
+        # 直接写入.xmind文件 (实际上是.zip格式)
+        with zipfile.ZipFile(output_path, 'w', zip_compression, compresslevel=compresslevel) as zipf:
+            manifest_name = 'manifest.json' if format == "json" else 'META-INF/manifest.xml'
+            write_precompressed(zipf, static[manifest_name], date_time)
+            
+            # 创建content.xml或content.json - 边生成边压缩写入
+            buffer_size = content_buffer_size(stats)
+            force_zip64 = stats["title_bytes"] + node_count * 160 > ZIP64_ENTRY_THRESHOLD
+            if compression == "parallel":
+                content_entry = open_parallel_deflated(zipf, content_name, force_zip64=force_zip64,
+                                                       date_time=date_time)
+            else:
+                content_info = member_info(content_name, zip_compression, compresslevel, date_time)
+                content_entry = zipf.open(content_info, 'w', force_zip64=force_zip64)
+            with content_entry as entry:
+                if format == "json":
+                    with io.BufferedWriter(entry, buffer_size) as f:
+                        write_content_json(f, structure, layout_strategy, stats, timestamp=timestamp, shards=shards)
+                else:
+                    with io.TextIOWrapper(io.BufferedWriter(entry, buffer_size), encoding='utf-8') as f:
+                        write_content_xml(f, structure, layout_strategy, stats, timestamp=timestamp, shards=shards)
+            logger.debug(f"{content_name} 已写入")
+            
+            if format == "json":
+                write_precompressed(zipf, static['metadata.json'], date_time)
+            else:
+                write_precompressed(zipf, static['meta.xml'], date_time)
+                
+                # XMind官方样式文件
+                write_precompressed(zipf, static['styles.xml'], date_time)
+            
+            # 缩略图是导图前几层的缩影
+            write_precompressed(zipf, precompress('Thumbnails/thumbnail.png', render_thumbnail(structure)), date_time)
+            
+            if profile != "lean":
+                if format == "xml":
+                    write_precompressed(zipf, static['attachments/markers.xml'], date_time)
+                
+                # 创建大文件数据 - 针对大型思维导图的优化
+                large_file_data = create_large_file_data(node_count, padding_seed)
+                padding_info = member_info('attachments/padding.bin', zip_compression, compresslevel, date_time)
+                with zipf.open(padding_info, 'w') as entry:
+                    entry.write(large_file_data)
+                logger.debug(f"padding.bin 已写入, 大小: {len(large_file_data)} 字节")
         
         logger.info(f"XMind文件创建成功: {output_path}")
         
         return output_path
         
     except Exception as e:
+        if not fallback:
+            raise
         logger.error(f"创建XMind文件时出错: {e}", exc_info=True)
-        try:
-            return create_fallback_xmind(structure, output_path)
-        except Exception as e2:
-            logger.critical(f"创建备用XMind文件也失败: {e2}", exc_info=True)
-            return None
-            
-    finally:
-        # 清理临时目录
-        try:
-            shutil.rmtree(temp_dir)
-            logger.debug(f"已清理临时目录: {temp_dir}")
-        except Exception as e:
-            logger.warning(f"清理临时目录时出错: {e}")
+        return write_fallback_xmind(structure, output_path, compression)
+
+def write_fallback_xmind(structure, output_path, compression=DEFAULT_COMPRESSION):
+    """
+    Write the fallback archive after create_xmind_from_structure failed.
+    
+    Args:
+        structure (dict | CompactTree): The structure to include.
+        output_path (str | file): The path or file object that was being written.
+        compression (str): Compression strategy of the last-resort archive.
+        
+    Returns:
+        str | file: output_path, or None if the fallback failed too.
+    """
+    try:
+        # 丢弃写了一半的内容
+        if hasattr(output_path, 'write'):
+            output_path.seek(0)
+            output_path.truncate()
+        return create_fallback_xmind(structure, output_path, compression)
+    except Exception as e:
+        logger.critical(f"创建备用XMind文件也失败: {e}", exc_info=True)
+        return None
+
+@functools.lru_cache(maxsize=None)
+def get_static_entries(profile=DEFAULT_PROFILE, format=DEFAULT_FORMAT):
+    """
+    Return the archive entries that are identical in every file, pre-compressed.
+    
+    Args:
+        profile (str): The output profile, which decides the manifest content.
+        format (str): The output format, "xml" or "json".
+        
+    Returns:
+        dict: Entry name -> PrecompressedEntry.
+    """
+    if format == "json":
+        file_entries = ["content.json", "metadata.json", "Thumbnails/thumbnail.png"]
+        if profile != "lean":
+            file_entries.append("attachments/padding.bin")
+        manifest = json.dumps({"file-entries": {name: {} for name in file_entries}})
+        entries = [precompress('manifest.json', manifest), precompress('metadata.json', METADATA_JSON)]
+        return {entry.name: entry for entry in entries}
+    
+    omitted = LEAN_OMITTED_ENTRIES if profile == "lean" else ()
+    entries = [
+        precompress('META-INF/manifest.xml', create_manifest_xml(omitted)),
+        precompress('meta.xml', META_XML),
+        precompress('styles.xml', get_xmind_pro_styles()),
+    ]
+    if 'attachments/markers.xml' not in omitted:
+        entries.append(precompress('attachments/markers.xml', MARKERS_XML))
+    return {entry.name: entry for entry in entries}
+
+def create_manifest_xml(omitted=()):
+    """
+    Create META-INF/manifest.xml listing the archive entries.
+    
+    Args:
+        omitted (tuple): Entry paths that are not written and must not be listed.
+        
+    Returns:
+        str: The manifest XML.
+    """
+    lines = ['<?xml version="1.0" encoding="UTF-8" standalone="no"?>',
+             '<manifest xmlns="urn:xmind:xmap:xmlns:manifest:1.0">']
+    for path, media_type in MANIFEST_ENTRIES:
+        if path not in omitted:
+            lines.append(f'  <file-entry full-path="{path}" media-type="{media_type}"/>')
+    lines.append('</manifest>')
+    return '\n'.join(lines)
 
 def create_blank_thumbnail(output_path, size=(128, 128)):
     """
@@ -190,19 +370,20 @@ def create_blank_thumbnail(output_path, size=(128, 128)):
         except Exception as e2:
             logger.error(f"创建最小PNG也失败: {e2}")
 
-def create_xmind_zip_standard(source_dir, output_path):
+def create_xmind_zip_standard(source_dir, output_path, compression="max"):
     """
     使用标准的XMind ZIP结构创建文件
     
     Args:
         source_dir (str): 源目录
         output_path (str): 输出路径
+        compression (str): 压缩策略
     """
     logger.info(f"开始创建标准XMind ZIP文件: {output_path}")
     
     try:
-        # 使用XMind标准压缩方式
-        with zipfile.ZipFile(output_path, 'w', zipfile.ZIP_DEFLATED, compresslevel=9) as zipf:
+        zip_compression, compresslevel = get_compression(compression)
+        with zipfile.ZipFile(output_path, 'w', zip_compression, compresslevel=compresslevel) as zipf:
             # 添加文件 - 添加顺序很重要
             zipf.write(os.path.join(source_dir, 'META-INF', 'manifest.xml'), 'META-INF/manifest.xml')
             zipf.write(os.path.join(source_dir, 'content.xml'), 'content.xml')
@@ -225,11 +406,24 @@ def create_xmind_zip_standard(source_dir, output_path):
         logger.error(f"创建ZIP文件时出错: {e}", exc_info=True)
         return False
 
-def count_nodes(structure):
-    """计算结构中的节点总数"""
+def count_nodes(structure, node=None):
+    """计算结构中的节点总数；指定 node 时只计算以该节点为根的子树"""
+    # 紧凑树直接返回节点数组长度
+    if isinstance(structure, CompactTree):
+        if node is not None:
+            return count_subtree(structure, node)
+        return len(structure)
+    
+    if node is not None:
+        structure = node
+    
     if not structure:
         return 0
     
+    # 解析器附带的统计信息中已有节点数
+    if isinstance(structure, dict) and 'stats' in structure:
+        return structure['stats']['node_count']
+    
     # 检查结构类型并兼容旧版API
     children = []
     if isinstance(structure, dict):
@@ -242,27 +436,21 @@ def count_nodes(structure):
     return 1 + count_nodes_recursive(children)
 
 def count_nodes_recursive(nodes):
-    """递归计算节点总数"""
+    """计算节点列表及其全部子孙的节点总数（显式栈遍历，不受递归深度限制）"""
     if not nodes:
         return 0
     
-    count = len(nodes)
-    
+    count = 0
     for node in nodes:
-        # 兼容两种字段格式
-        children = []
-        if isinstance(node, dict):
-            if 'children' in node:
-                children = node['children']
-            elif 'topics' in node:
-                children = node['topics']
-        
-        count += count_nodes_recursive(children)
+        count += count_subtree(node)
     
     return count
 
 def select_layout_strategy(node_count):
-    """根据节点数量选择最优布局策略"""
+    """根据节点数量选择最优布局策略，也可直接传入解析器生成的统计信息"""
+    if isinstance(node_count, dict):
+        node_count = node_count["node_count"]
+    
     if node_count <= 100:
         return "map"  # 小型图使用普通思维导图布局
     elif node_count <= 1000:
@@ -274,111 +462,231 @@ def select_layout_strategy(node_count):
     else:
         return "org.xmind.ui.fishbone.leftHeaded"  # 超大型图使用鱼骨图布局，XMind展示效果更好
 
-def create_large_file_data(node_count):
+class Shard:
+    """
+    一个分画布：根主题下的一组相邻顶级主题
+    
+    Attributes:
+        topics (list): (顶级主题序号, 节点) 列表
+        node_count (int): 这些顶级主题的节点总数
+    """
+    
+    def __init__(self):
+        self.topics = []
+        self.node_count = 0
+    
+    def add(self, index, node, node_count):
+        self.topics.append((index, node))
+        self.node_count += node_count
+
+def plan_shards(structure, mode=DEFAULT_SHARD_MODE, budget=SHARD_NODE_BUDGET, stats=None):
+    """
+    把根主题的子主题分配到多个画布
+    
+    只有节点总数超过 budget 时才拆分。topic 方式每个顶级主题一个画布，但节点数少于
+    budget * SHARD_SMALL_TOPIC_FRACTION 的相邻小主题合并到一个画布，直到达到预算，
+    所以画布数不会随顶级主题数无限增长；budget 方式按顺序合并相邻的顶级主题，每个画布
+    不超过 budget 个节点（单个顶级主题超过预算时独占一个画布）。
+    
+    Args:
+        structure (dict | CompactTree): 解析后的结构
+        mode (str): SHARD_MODES 之一
+        budget (int): 每个画布的节点预算
+        stats (dict): 解析器附带的统计信息，缺省时自动获取
+        
+    Returns:
+        list: Shard 列表；不需要拆分时返回 None
+    """
+    if mode not in SHARD_MODES:
+        raise ValueError(f"Unknown shard mode: {mode}")
+    if mode == "none":
+        return None
+    if budget < 1:
+        raise ValueError(f"Shard budget must be positive: {budget}")
+    
+    if stats is None:
+        stats = get_tree_stats(structure)
+    if stats["node_count"] <= budget:
+        return None
+    
+    root, _, children_of = get_accessors(structure)
+    children = children_of(root)
+    if len(children) < 2:
+        return None
+    
+    small_topic = budget * SHARD_SMALL_TOPIC_FRACTION
+    shards = []
+    # 最后一个画布是否在合并小主题（topic 方式）
+    merging = False
+    for index, child in enumerate(children):
+        child_count = count_nodes(structure, child)
+        fits = bool(shards) and shards[-1].node_count + child_count <= budget
+        if mode == "topic":
+            small = child_count < small_topic
+            start = not (small and merging and fits)
+            merging = small
+        else:
+            start = not fits
+        if start:
+            shards.append(Shard())
+        shards[-1].add(index, child, child_count)
+    
+    if len(shards) < 2:
+        return None
+    
+    logger.info(f"拆分为 {len(shards)} 个画布, 方式: {mode}, 节点预算: {budget}")
+    return shards
+
+def create_large_file_data(node_count, seed=None):
     """
     创建足够大的数据文件，确保XMind显示全部内容
     
     Args:
         node_count (int): 节点数量
+        seed (int): 随机数种子，指定时生成可复现的伪随机数据
     """
     # 创建随机数据文件，大小和节点数量成正比，至少2MB
     data_size = max(2 * 1024 * 1024, node_count * 500)  # 增加到每节点500字节
     
     # 创建随机数据
+    if seed is not None:
+        # 与 Random.randbytes 相同的结果，但不需要 Python 3.9
+        return random.Random(seed).getrandbits(8 * data_size).to_bytes(data_size, 'little')
     return os.urandom(data_size)
 
-def generate_topic_xml_optimized(topics, parent_id, layout_strategy, level=1):
+def get_deterministic_timestamp():
+    """返回确定性输出使用的时间戳（毫秒）"""
+    source_date_epoch = os.environ.get("SOURCE_DATE_EPOCH")
+    if source_date_epoch:
+        return int(source_date_epoch) * 1000
+    return DETERMINISTIC_TIMESTAMP
+
+def dump_json(value):
+    """把值编码为UTF-8的JSON字节串，安装了 orjson 时使用它加速"""
+    if orjson is not None:
+        return orjson.dumps(value)
+    return json.dumps(value, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+def child_topic_id(parent_id, index):
     """
-    优化的主题XML生成函数，避免内存溢出
-    使用分块的方式处理主题，每块最多处理1000个主题
+    根据父主题ID和序号生成子主题ID
+    
+    通常为 "<父ID>_<序号>"；ID过长时改用该路径的摘要，保持ID唯一且稳定。
+    """
+    topic_id = f"{parent_id}_{index}"
+    if len(topic_id) > MAX_TOPIC_ID_LENGTH:
+        topic_id = "t" + hashlib.sha1(topic_id.encode('utf-8')).hexdigest()[:20]
+    return topic_id
+
+def generate_topic_xml_optimized(topics, parent_id, layout_strategy, level=1, tree=None,
+                                 fold_threshold=FOLD_CHILD_THRESHOLD):
+    """
+    生成一棵子树的主题XML字符串
+    
+    大型导图请直接使用 write_topic_xml 写入输出流，避免在内存中拼出整段XML
     
     Args:
-        topics (dict): 主题字典
+        topics (dict | int): 主题字典，或紧凑树中的节点索引
         parent_id (str): 父主题ID
         layout_strategy (str): 布局策略
         level (int): 当前层级，用于缩进
+        tree (dict | CompactTree): 节点所属的结构，字典节点可省略
+        fold_threshold (int): 深层分支子主题数超过该值时折叠，None 表示不折叠
         
     Returns:
         str: 生成的XML字符串
     """
-    chunks = []
-    
-    if not topics:
-        return ""
-    
-    # 处理当前主题
-    topic_title = topics.get('title', '')
-    if not topic_title:
-        topic_title = "未命名主题"
-    
-    # 转义XML特殊字符
-    topic_title = saxutils.escape(topic_title)
+    out = io.StringIO()
+    write_topic_xml(out, topics, parent_id, layout_strategy, level, tree, fold_threshold)
+    return out.getvalue()
+
+def write_topic_xml(f, topics, parent_id, layout_strategy, level=1, tree=None,
+                    fold_threshold=FOLD_CHILD_THRESHOLD, timestamp=None):
+    """
+    遍历子树，把主题XML直接写入文本流
     
-    logger.debug(f"处理主题: {topic_title[:30]}{'...' if len(topic_title) > 30 else ''}, 长度: {len(topic_title)}")
+    使用显式栈遍历，每个节点的XML只生成一次并立即写出，内存占用与导图大小和深度无关
     
-    # 获取子主题，兼容两种字段格式
-    children = []
-    if 'children' in topics and topics['children']:
-        children = topics['children']
-    elif 'topics' in topics and topics['topics']:
-        children = topics['topics']
+    Args:
+        f: 可写的文本流（文件、压缩包条目或 StringIO）
+        topics (dict | int): 主题字典，或紧凑树中的节点索引
+        parent_id (str): 父主题ID
+        layout_strategy (str): 布局策略
+        level (int): 当前层级，用于缩进
+        tree (dict | CompactTree): 节点所属的结构，字典节点可省略
+        fold_threshold (int): 深层分支子主题数超过该值时折叠，None 表示不折叠
+        timestamp (str): 主题的时间戳，缺省时使用当前时间
+    """
+    if tree is None:
+        if not topics:
+            return
+        tree = topics
+    _, title_of, _ = get_accessors(tree)
+    is_folded = get_folded_test(tree)
+    write = f.write
     
-    # 设置分支折叠
-    folded = 'true' if level > 2 and len(children) > 50 else 'false'
+    # 当前路径上各主题的ID
+    ids = []
     
     # 添加时间戳和标识符 - XMind需要这些属性
-    timestamp = str(int(time.time() * 1000))
-    
-    # 增加样式支持
-    style_id = ""
-    if level == 1:
-        style_id = ' style-id="centralTopic"'
-    elif level == 2:
-        style_id = ' style-id="mainTopic"'
-    elif level > 5:  # 超深层次使用浮动主题样式
-        style_id = ' style-id="floatingTopic"'
-    
-    # 为超长主题添加文字处理
-    if len(topic_title) > 100:
-        topic_title = topic_title[:97] + "..."
-    
-    # 添加主题开始标记 - 确保格式正确    
-    chunks.append(f'<topic id="{parent_id}"{style_id} timestamp="{timestamp}" folded="{folded}">')
-    chunks.append(f'<title>{topic_title}</title>')
-    
-    # 处理子主题，如果存在
-    if children:
-        # XMind的标准结构要求，children标签必须包含topics标签
-        chunks.append('<children>')
-        chunks.append('<topics type="attached">')  # 这个标签很重要
-        
-        # 为超大量子主题优化处理
-        if len(children) > 1000:
-            logger.warning(f"主题 '{topic_title[:30]}...' 有 {len(children)} 个子主题，分批处理")
-            # 切片方式处理，避免递归深度过大
-            batch_size = 200
-            for i in range(0, len(children), batch_size):
-                batch = children[i:i+batch_size]
-                logger.debug(f"处理批次 {i//batch_size + 1}/{(len(children)-1)//batch_size + 1}, 包含 {len(batch)} 个主题")
-                
-                for idx, child in enumerate(batch):
-                    child_id = f"{parent_id}_{i+idx}"
-                    child_xml = generate_topic_xml_optimized(child, child_id, layout_strategy, level + 1)
-                    chunks.append(child_xml)
+    if timestamp is None:
+        timestamp = str(int(time.time() * 1000))
+    
+    def enter(node, depth, index, children):
+        topic_id = child_topic_id(ids[-1], index) if ids else parent_id
+        ids.append(topic_id)
+        node_level = level + depth
+        
+        # 处理当前主题
+        topic_title = title_of(node)
+        if not topic_title:
+            topic_title = "未命名主题"
+        
+        # 转义XML特殊字符
+        topic_title = saxutils.escape(topic_title)
+        
+        # 设置分支折叠，分组等标记为折叠的主题始终折叠
+        if is_folded is not None and is_folded(node):
+            folded = 'true'
         else:
-            for idx, child in enumerate(children):
-                child_id = f"{parent_id}_{idx}"
-                child_xml = generate_topic_xml_optimized(child, child_id, layout_strategy, level + 1)
-                chunks.append(child_xml)
-        
-        # 关闭topics和children标签
-        chunks.append('</topics>')
-        chunks.append('</children>')
+            folded = 'true' if fold_threshold is not None and node_level > 2 and len(children) > fold_threshold else 'false'
+        
+        # 增加样式支持
+        style_id = ""
+        if node_level == 1:
+            style_id = ' style-id="centralTopic"'
+        elif node_level == 2:
+            style_id = ' style-id="mainTopic"'
+        elif node_level > 5:  # 超深层次使用浮动主题样式
+            style_id = ' style-id="floatingTopic"'
+        
+        # 为超长主题添加文字处理
+        if len(topic_title) > 100:
+            topic_title = topic_title[:97] + "..."
+        
+        # 添加主题开始标记 - 确保格式正确；标签之间以换行分隔
+        separator = '\n' if depth else ''
+        if children:
+            if len(children) > 1000:
+                logger.warning(f"主题 '{topic_title[:30]}...' 有 {len(children)} 个子主题")
+            
+            # XMind的标准结构要求，children标签必须包含topics标签
+            write(f'{separator}<topic id="{topic_id}"{style_id} timestamp="{timestamp}" folded="{folded}">'
+                  f'\n<title>{topic_title}</title>\n<children>\n<topics type="attached">')
+        else:
+            write(f'{separator}<topic id="{topic_id}"{style_id} timestamp="{timestamp}" folded="{folded}">'
+                  f'\n<title>{topic_title}</title>')
     
-    # 关闭topic标签
-    chunks.append('</topic>')
+    def exit(node, depth, index, children):
+        ids.pop()
+        
+        # 关闭topics、children和topic标签
+        if children:
+            write('\n</topics>\n</children>\n</topic>')
+        else:
+            write('\n</topic>')
     
-    return '\n'.join(chunks)
+    walk(tree, enter, exit, node=topics)
 
 def generate_relationships(max_relationships=100):
     """
@@ -395,6 +703,19 @@ def generate_relationships(max_relationships=100):
         
     xml = "<relationships>"
     
+    for rel_id, source_id, target_id, rel_type in iter_relationships(max_relationships):
+        xml += f'<relationship end1="{source_id}" end2="{target_id}" id="{rel_id}" timestamp="1615975489000" type="{rel_type}"/>'
+    
+    xml += "</relationships>"
+    return xml
+
+def iter_relationships(max_relationships=100):
+    """
+    生成关系线的 (关系ID, 起点主题ID, 终点主题ID, 类型)
+    
+    Args:
+        max_relationships (int): 最大关系数量
+    """
     # 创建一些示例关系，实际应用中可能需要根据主题间的逻辑关系来创建
     for i in range(min(30, max_relationships)):
         rel_id = f"rel_{i}"
@@ -407,53 +728,61 @@ def generate_relationships(max_relationships=100):
             rel_type = "dashedarrowline"
         elif i % 5 == 0:
             rel_type = "straightline"
-            
-        xml += f'<relationship end1="{source_id}" end2="{target_id}" id="{rel_id}" timestamp="1615975489000" type="{rel_type}"/>'
-    
-    xml += "</relationships>"
-    return xml
+        
+        yield rel_id, source_id, target_id, rel_type
 
-def create_thumbnail_image(structure, output_path, size=(128, 128)):
-    """创建标准缩略图"""
-    try:
-        # 创建一个简单的白色缩略图
-        img = Image.new('RGB', size, color='white')
-        draw = ImageDraw.Draw(img)
+def render_thumbnail(structure, size=(128, 128)):
+    """
+    绘制导图结构的缩略图
+    
+    只对前几层、最多 THUMBNAIL_NODE_BUDGET 个主题做粗略布局（不测量字体），
+    只画主题框和连线，耗时与导图大小无关
+    
+    Args:
+        structure (dict | CompactTree): 解析后的结构
+        size (tuple): 图像大小
         
-        # 尝试获取字体
-        try:
-            font = ImageFont.truetype("Arial", 12)
-        except IOError:
-            font = ImageFont.load_default()
+    Returns:
+        bytes: PNG数据
+    """
+    try:
+        layout = layout_tree(structure, measure=estimate_title, max_depth=THUMBNAIL_MAX_DEPTH,
+                             max_nodes=THUMBNAIL_NODE_BUDGET)
         
-        # 绘制一个基本的XMind缩略图
-        title = structure.get('title', 'Mind Map')
-        if len(title) > 15:
-            title = title[:12] + '...'
+        # 整张导图缩小到缩略图内并居中，小导图不放大
+        width, height = size
+        scale = min(width / layout.width_total, height / layout.height_total, 1.0)
+        origin = ((layout.width_total - width / scale) / 2, (layout.height_total - height / scale) / 2)
         
-        # 绘制缩略图
-        draw.rectangle(((10, 50), (118, 78)), fill="#4675EB", outline="#4675EB")
-        draw.text((15, 55), title, fill="white", font=font)
+        img = Image.new('RGB', size, color='white')
+        draw_layout(ImageDraw.Draw(img), layout, scale, origin, text=False)
         
         # 保存图像 - 确保是PNG格式
-        img.save(output_path, format='PNG')
-        logger.debug(f"标准缩略图创建成功: {output_path}")
+        out = io.BytesIO()
+        img.save(out, format='PNG')
+        logger.debug(f"缩略图创建成功: {len(layout)} 个主题")
+        return out.getvalue()
     except Exception as e:
         logger.error(f"创建缩略图出错: {e}")
-        # 保存一个最小的PNG图像
-        try:
-            # 最简单的有效PNG
-            minimal_png = (
-                b'\x89PNG\r\n\x1a\n\x00\x00\x00\rIHDR\x00\x00\x00\x01\x00\x00'
-                b'\x00\x01\x08\x02\x00\x00\x00\x90wS\xde\x00\x00\x00\x0cIDAT'
-                b'\x08\x99c\xf8\xff\xff?\x00\x05\xfe\x02\xfe\xdc\xcc\x59\xe7'
-                b'\x00\x00\x00\x00IEND\xaeB`\x82'
-            )
+        # 最简单的有效PNG
+        return (
+            b'\x89PNG\r\n\x1a\n\x00\x00\x00\rIHDR\x00\x00\x00\x01\x00\x00'
+            b'\x00\x01\x08\x02\x00\x00\x00\x90wS\xde\x00\x00\x00\x0cIDAT'
+            b'\x08\x99c\xf8\xff\xff?\x00\x05\xfe\x02\xfe\xdc\xcc\x59\xe7'
+            b'\x00\x00\x00\x00IEND\xaeB`\x82'
+        )
+
+def create_thumbnail_image(structure, output_path, size=(128, 128)):
+    """创建标准缩略图，output_path 可以是路径或可写的二进制文件对象"""
+    png = render_thumbnail(structure, size)
+    try:
+        if hasattr(output_path, 'write'):
+            output_path.write(png)
+        else:
             with open(output_path, 'wb') as f:
-                f.write(minimal_png)
-            logger.debug(f"最小PNG缩略图创建成功: {output_path}")
-        except Exception as e2:
-            logger.error(f"创建最小PNG也失败: {e2}")
+                f.write(png)
+    except Exception as e:
+        logger.error(f"保存缩略图出错: {e}")
 
 def get_xmind_pro_styles():
     """返回XMind官方格式的样式文件内容"""
@@ -565,17 +894,22 @@ def get_xmind_pro_styles():
   </master-styles>
 </xmap-styles>"""
 
-def create_fallback_xmind(structure, output_path):
+def create_fallback_xmind(structure, output_path, compression="max"):
     """
     Create a fallback XMind file in case of errors.
     
     Args:
-        structure (dict): The structure to include
+        structure (dict | CompactTree): The structure to include
         output_path (str): The output path
+        compression (str): Compression strategy of the last-resort archive
         
     Returns:
-        str: The output path
+        str | file: The output path or file object
     """
+    # xmind 库只能保存到路径
+    if hasattr(output_path, 'write'):
+        return create_basic_xml_xmind(structure, output_path, compression)
+    
     try:
         import xmind
         # Create a new workbook
@@ -586,19 +920,16 @@ def create_fallback_xmind(structure, output_path):
         
         # Set the root topic
         root_topic = sheet.getRootTopic()
-        root_title = structure.get("title", "思维导图")
+        root, title_of, children_of = get_accessors(structure)
+        root_title = title_of(root) or "思维导图"
         root_topic.setTitle(root_title)
         
         # 获取子主题，兼容两种字段格式
-        subtopics = []
-        if 'children' in structure and structure['children']:
-            subtopics = structure['children']
-        elif 'topics' in structure and structure['topics']:
-            subtopics = structure['topics']
+        subtopics = children_of(root)
         
-        # Recursively add topics
+        # Add topics for the whole tree
         if subtopics:
-            add_topics(root_topic, subtopics)
+            add_topics(root_topic, subtopics, structure)
         
         # Save the workbook
         xmind.save(workbook)
@@ -607,44 +938,48 @@ def create_fallback_xmind(structure, output_path):
     except Exception as e:
         logger.error(f"Error creating fallback XMind file: {e}")
         # If all else fails, create a very basic ZIP file with XMind structure
-        return create_basic_xml_xmind(structure, output_path)
+        return create_basic_xml_xmind(structure, output_path, compression)
 
-def add_topics(parent_topic, topics):
+def add_topics(parent_topic, topics, tree=None):
     """
-    Recursively add topics to a parent topic.
+    Add topics and all their descendants to a parent topic.
+    
+    Uses an explicit stack, so outlines of any depth are supported.
     
     Args:
         parent_topic: The parent XMind topic.
-        topics (list): List of topic dictionaries with 'title' and 'children' or 'topics' keys.
+        topics (list): List of topic dictionaries with 'title' and 'children' or 'topics' keys,
+            or CompactTree node indices when tree is given.
+        tree (dict | CompactTree): The structure the topics belong to, optional for dicts.
     """
+    created = [parent_topic]
+    _, title_of, _ = get_accessors(tree if tree is not None else {})
+    
+    def enter(node, depth, index, children):
+        # Create a new topic under the current parent
+        topic = created[-1].addSubTopic()
+        topic.setTitle(title_of(node))
+        created.append(topic)
+    
+    def exit(node, depth, index, children):
+        created.pop()
+    
     for topic_data in topics:
-        # Create a new topic
-        topic = parent_topic.addSubTopic()
-        topic.setTitle(topic_data["title"])
-        
-        # 获取子主题，兼容两种字段格式
-        subtopics = []
-        if 'children' in topic_data and topic_data['children']:
-            subtopics = topic_data['children']
-        elif 'topics' in topic_data and topic_data['topics']:
-            subtopics = topic_data['topics']
-        
-        # Add subtopics recursively
-        if subtopics:
-            add_topics(topic, subtopics)
+        walk(topic_data if tree is None else tree, enter, exit, node=topic_data)
 
-def create_basic_xml_xmind(structure, output_path):
+def create_basic_xml_xmind(structure, output_path, compression="max"):
     """
     Create a very basic XMind XML-based file for last-resort fallback.
     
     Args:
-        structure (dict): The structure to include
-        output_path (str): The output path
+        structure (dict | CompactTree): The structure to include
+        output_path (str | file): The output path or a binary file object
+        compression (str): Compression strategy, "parallel" is treated like "balanced"
         
     Returns:
-        str: The output path
+        str | file: The output path or file object
     """
-    temp_dir = tempfile.mkdtemp()
+    root, title_of, _ = get_accessors(structure)
     
     try:
         # Create basic content.xml - 使用极度简化版本
@@ -652,24 +987,18 @@ def create_basic_xml_xmind(structure, output_path):
 <xmap-content xmlns="urn:xmind:xmap:xmlns:content:2.0" version="2.0">
   <sheet id="sheet1">
     <topic id="root" structure-class="org.xmind.ui.map.unbalanced">
-      <title>{structure["title"]}</title>
+      <title>{saxutils.escape(title_of(root))}</title>
     </topic>
     <title>Sheet 1</title>
   </sheet>
 </xmap-content>"""
         
-        with open(os.path.join(temp_dir, 'content.xml'), 'w', encoding='utf-8') as f:
-            f.write(content_xml)
-        
         # Create minimal meta.xml
         meta_xml = """<?xml version="1.0" encoding="UTF-8" standalone="no"?>
 <meta xmlns="urn:xmind:xmap:xmlns:meta:2.0" version="2.0">
   <Author><Name>Text2Mind</Name></Author>
 </meta>"""
         
-        with open(os.path.join(temp_dir, 'meta.xml'), 'w', encoding='utf-8') as f:
-            f.write(meta_xml)
-        
         # Create manifest.xml
         manifest_xml = """<?xml version="1.0" encoding="UTF-8" standalone="no"?>
 <manifest xmlns="urn:xmind:xmap:xmlns:manifest:1.0">
@@ -679,265 +1008,439 @@ def create_basic_xml_xmind(structure, output_path):
   <file-entry full-path="META-INF/manifest.xml" media-type="text/xml"/>
 </manifest>"""
         
-        os.makedirs(os.path.join(temp_dir, 'META-INF'), exist_ok=True)
-        with open(os.path.join(temp_dir, 'META-INF', 'manifest.xml'), 'w', encoding='utf-8') as f:
-            f.write(manifest_xml)
-        
-        # Create the ZIP with maximum compression
-        with zipfile.ZipFile(output_path, 'w', zipfile.ZIP_DEFLATED, compresslevel=9) as zipf:
-            for root, dirs, files in os.walk(temp_dir):
-                for file in files:
-                    file_path = os.path.join(root, file)
-                    rel_path = os.path.relpath(file_path, temp_dir)
-                    zipf.write(file_path, rel_path)
+        # Create the ZIP with the requested compression
+        zip_compression, compresslevel = get_compression(compression)
+        with zipfile.ZipFile(output_path, 'w', zip_compression, compresslevel=compresslevel) as zipf:
+            zipf.writestr('content.xml', content_xml)
+            zipf.writestr('meta.xml', meta_xml)
+            zipf.writestr('META-INF/manifest.xml', manifest_xml)
         
         return output_path
     except Exception as e:
         print(f"Error creating basic XMind ZIP: {e}")
         return output_path
-    finally:
-        shutil.rmtree(temp_dir)
 
-def export_xmind_to_png(xmind_path, png_path=None):
+def export_xmind_to_png(xmind_path, png_path=None, tiled=False, tile_size=DEFAULT_TILE_SIZE, workers=None):
     """
     Export an XMind file to PNG image.
     
     Args:
         xmind_path (str): Path to the XMind file.
         png_path (str, optional): Path where the PNG will be saved. If None, uses the same name as XMind.
+        tiled (bool): Write a DeepZoom pyramid of PNG tiles instead of one image: a .dzi
+            descriptor next to png_path and a "<name>_files" tile directory.
+        tile_size (int): Tile edge length in pixels for the tiled mode.
+        workers (int): Number of processes rendering the image or tiles.
         
     Returns:
-        str: The path to the created PNG file.
+        str: The path to the created PNG file, or to the .dzi descriptor when tiled.
     """
     if png_path is None:
         png_path = os.path.splitext(xmind_path)[0] + ".png"
     
-    try:
-        # Try using xmindparser for export
-        import xmindparser
-        xmindparser.config['showTopicId'] = False
-        xmindparser.config['hideEmptyValue'] = True
-    except ImportError:
-        pass
+    # Read the map with the native reader
+    structure = create_simple_mind_map_structure(xmind_path)
+    
+    if tiled:
+        return export_tiles(structure, os.path.splitext(png_path)[0] + ".dzi", tile_size, workers)
+    return render_structure(structure, png_path, "png", workers)
+
+def export_xmind_to_svg(xmind_path, svg_path=None):
+    """
+    Export an XMind file to an SVG image.
     
-    # For this example, we'll create a simple mind map visualization with PIL
-    # since the actual XMind export can be complex
+    The SVG is streamed element by element from the layout, so it is much
+    cheaper to produce than a bitmap of a large map and can be zoomed freely.
     
-    # Create a simple mind map visualization
+    Args:
+        xmind_path (str): Path to the XMind file.
+        svg_path (str | file, optional): Path or writable file object for the SVG.
+            If None, uses the same name as XMind.
+        
+    Returns:
+        str | file: svg_path.
+    """
+    if svg_path is None:
+        svg_path = os.path.splitext(xmind_path)[0] + ".svg"
+    
+    # Read the map with the native reader
     structure = create_simple_mind_map_structure(xmind_path)
     
-    # Draw the mind map
-    img = draw_mind_map(structure)
+    return render_structure(structure, svg_path, VECTOR_IMAGE_FORMAT)
+
+def render_structure(structure, output=None, fmt=DEFAULT_IMAGE_FORMAT, workers=None):
+    """
+    Render a parsed structure straight to an image.
+    
+    Use this instead of export_xmind_to_png when the structure is still in
+    memory: no .xmind archive is written, re-read or re-parsed.
+    
+    Args:
+        structure (dict | CompactTree): The structure to visualize.
+        output (str | file): Path or writable binary file object for the image;
+            None to return the encoded image. For "dzi" the path of the descriptor.
+        fmt (str): One of IMAGE_FORMATS, "svg" for vector output (see export_svg),
+            or "dzi" for a DeepZoom tile pyramid (see export_tiles) when the map is
+            too large for one image.
+        workers (int): Number of processes rendering the image or tiles;
+            None or 1 renders in this process.
+        
+    Returns:
+        str | file | bytes: output, or the encoded image when output is None.
+    """
+    if fmt == TILED_IMAGE_FORMAT:
+        if not isinstance(output, (str, os.PathLike)):
+            raise ValueError("Tiled output needs the path of the .dzi file")
+        return export_tiles(structure, output, workers=workers)
+    if fmt == VECTOR_IMAGE_FORMAT:
+        if output is None:
+            return export_svg(structure, io.BytesIO()).getvalue()
+        return export_svg(structure, output)
+    if fmt not in IMAGE_FORMATS:
+        raise ValueError(f"Unknown image format: {fmt}")
     
-    # Save the image
-    img.save(png_path)
+    img = draw_mind_map(structure, workers)
     
-    return png_path
+    target = io.BytesIO() if output is None else output
+    img.save(target, format=IMAGE_FORMATS[fmt])
+    logger.info(f"图片已导出: {output if output is not None else fmt}")
+    return target.getvalue() if output is None else output
 
 def create_simple_mind_map_structure(xmind_path):
     """
-    Create a simple structure for visualization.
-    In a real app, this would parse the XMind file.
+    Read the structure to visualize from an XMind file.
     
-    For simplicity, we'll just create a structure based on the
-    hierarchy we created earlier.
-    """
-    try:
-        # Try to read the actual xmind file
-        import xmindparser
-        content = xmindparser.xmind_to_dict(xmind_path)
-        if content and isinstance(content, list) and len(content) > 0:
-            return content[0].get("topic", {})
+    The file is streamed by the native reader into a compact tree; errors
+    (missing file, not an XMind archive, malformed content) are raised.
+    
+    Args:
+        xmind_path (str): Path to the XMind file.
         
-        # If xmindparser doesn't work, create a simple structure
-        return {"title": "Sample Mind Map", "topics": []}
-    except:
-        # Fallback to a simple structure
-        return {"title": "Sample Mind Map", "topics": []}
+    Returns:
+        CompactTree: The map's topic tree (shard sheets are stitched back together).
+    """
+    return read_xmind(xmind_path, compact=True)
 
-def draw_mind_map(structure):
+def draw_mind_map(structure, workers=None):
     """
-    Draw a simple mind map visualization.
+    Draw the mind map with a tidy tree layout, on a canvas sized to its content.
+    
+    All levels are drawn; children of folded topics are left out. Maps too large
+    for one bitmap are drawn scaled down (see canvas_scale).
     
     Args:
-        structure (dict): The structure to visualize.
+        structure (dict | CompactTree): The structure to visualize.
+        workers (int): Number of processes drawing horizontal bands of the image;
+            None or 1 draws in this process.
         
     Returns:
         PIL.Image: The generated image.
     """
-    # Create a white canvas - 增加画布宽度
-    img = Image.new('RGB', (2000, 1200), color='white')
-    draw = ImageDraw.Draw(img)
+    layout = layout_tree(structure)
+    scale = canvas_scale(layout)
+    width, height = layout.size
+    logger.info(f"布局完成: {len(layout)} 个主题, 画布 {width}x{height}, 缩放 {scale:.3f}")
     
-    # Try to get a font
-    try:
-        font_large = ImageFont.truetype("Arial", 20)
-        font_medium = ImageFont.truetype("Arial", 16)
-        font_small = ImageFont.truetype("Arial", 12)
-    except IOError:
-        # Fallback to default font
-        font_large = ImageFont.load_default()
-        font_medium = font_large
-        font_small = font_large
-    
-    # Draw the root node - 将根节点放在左侧
-    root_title = structure.get("title", "Mind Map")
-    draw.rectangle(((100, 580), (250, 620)), fill="#4475E3", outline="black")
-    draw.text((110, 590), root_title, fill="white", font=font_large)
-    
-    # 兼容两种字段格式获取主题
-    topics = []
-    if 'children' in structure:
-        topics = structure.get('children', [])
-    elif 'topics' in structure:
-        topics = structure.get('topics', [])
+    img = Image.new('RGB', (max(1, math.ceil(width * scale)), max(1, math.ceil(height * scale))), color='white')
+    if not workers or workers <= 1:
+        draw_layout(ImageDraw.Draw(img), layout, scale)
+        return img
     
-    if topics:
-        y_spacing = 800 // (len(topics) + 1)
-        for i, topic in enumerate(topics):
-            title = topic.get("title", f"Topic {i+1}")
-            y = 200 + (i+1) * y_spacing
-            
-            # Draw the topic box
-            draw.rectangle(((300, y), (500, y+30)), fill="lightyellow", outline="black")
-            draw.text((310, y+5), title, fill="black", font=font_medium)
-            
-            # Draw line to root
-            draw.line(((300, y+15), (250, 600)), fill="black", width=2)
-            
-            # 兼容两种字段格式获取子主题
-            subtopics = []
-            if 'children' in topic:
-                subtopics = topic.get('children', [])
-            elif 'topics' in topic:
-                subtopics = topic.get('topics', [])
-            
-            if subtopics:
-                sub_y_spacing = y_spacing // (len(subtopics) + 1)
-                for j, subtopic in enumerate(subtopics):
-                    sub_title = subtopic.get("title", f"Subtopic {j+1}")
-                    sub_y = y - (y_spacing // 3) + (j+1) * sub_y_spacing
-                    
-                    # Draw the subtopic box
-                    draw.rectangle(((550, sub_y), (750, sub_y+25)), fill="lightgreen", outline="black")
-                    draw.text((560, sub_y+2), sub_title, fill="black", font=font_small)
-                    
-                    # Draw line to parent topic
-                    draw.line(((550, sub_y+12), (500, y+15)), fill="black", width=1)
-                    
-                    # 兼容两种字段格式获取子子主题
-                    sub_subtopics = []
-                    if 'children' in subtopic:
-                        sub_subtopics = subtopic.get('children', [])
-                    elif 'topics' in subtopic:
-                        sub_subtopics = subtopic.get('topics', [])
-                    
-                    if sub_subtopics:
-                        sub_sub_y_spacing = sub_y_spacing // (len(sub_subtopics) + 1)
-                        for k, sub_subtopic in enumerate(sub_subtopics):
-                            sub_sub_title = sub_subtopic.get("title", f"Sub-subtopic {k+1}")
-                            sub_sub_y = sub_y - (sub_y_spacing // 3) + (k+1) * sub_sub_y_spacing
-                            
-                            # Draw the sub-subtopic box
-                            draw.rectangle(((800, sub_sub_y), (1000, sub_sub_y+20)), fill="lightpink", outline="black")
-                            draw.text((810, sub_sub_y+2), sub_sub_title, fill="black", font=font_small)
-                            
-                            # Draw line to parent subtopic
-                            draw.line(((800, sub_sub_y+10), (750, sub_y+12)), fill="black", width=1)
+    # 按横条分给工作进程绘制，再拼接到整张图上
+    band = DEFAULT_TILE_SIZE
+    grid = SpatialGrid(layout, band / scale)
+    bands = ((top, scale, 0, top, img.width, min(band, img.height - top)) for top in range(0, img.height, band))
+    for top, part in iter_rendered_tiles(layout, grid, bands, workers):
+        if part is not None:
+            img.paste(part, (0, top))
     
     return img
 
-def create_content_xml(temp_dir, parsed_data, layout_strategy):
-    """创建content.xml文件"""
+def content_buffer_size(stats):
+    """按预估的输出大小计算写入content.xml的缓冲区大小"""
+    # 标题字节加上每个节点约160字节的标签开销
+    estimated_size = stats["title_bytes"] + stats["node_count"] * 160
+    return min(max(estimated_size, 64 * 1024), 10 * 1024 * 1024)
+
+def create_content_xml(temp_dir, parsed_data, layout_strategy, stats=None):
+    """在 temp_dir 中创建content.xml文件，stats 为解析器附带的统计信息，缺省时自动获取"""
     content_path = os.path.join(temp_dir, 'content.xml')
     
+    if stats is None:
+        stats = get_tree_stats(parsed_data)
+    
+    with open(content_path, 'w', encoding='utf-8', buffering=content_buffer_size(stats)) as f:
+        write_content_xml(f, parsed_data, layout_strategy, stats)
+    
+    # 检查文件大小
+    file_size = os.path.getsize(content_path)
+    logger.info(f"content.xml文件大小: {file_size/1024/1024:.2f} MB")
+    
+    return content_path
+
+def write_content_xml(f, parsed_data, layout_strategy, stats=None, timestamp=None, shards=None):
+    """
+    把content.xml写入文本流 f（文件或压缩包条目）
+    
+    stats 缺省时自动获取；timestamp（毫秒）缺省时使用当前时间，所有主题和sheet共用该时间戳。
+    shards 为 plan_shards 的结果时，第一个画布是链接到各分画布的总览，每个分画布按自身节点数选择布局。
+    """
     # 记录开始时间，用于性能监控
     start_time = time.time()
     
     # 根据节点数量选择生成方法
-    node_count = count_nodes(parsed_data)
+    if stats is None:
+        stats = get_tree_stats(parsed_data)
+    node_count = stats["node_count"]
     logger.info(f"创建content.xml，共有 {node_count} 个节点, 布局策略: {layout_strategy}")
     
-    # 设置适当的缓冲区大小，根据节点数量扩大
-    buffer_size = max(10 * 1024 * 1024, node_count * 500)  # 至少10MB
+    # 只有存在超宽分支时才需要逐节点判断折叠
+    fold_threshold = FOLD_CHILD_THRESHOLD if stats["max_fanout"] > FOLD_CHILD_THRESHOLD else None
     
     # 生成时间戳和ID
-    timestamp = str(int(time.time() * 1000))
+    if timestamp is None:
+        timestamp = int(time.time() * 1000)
+    timestamp = str(timestamp)
     sheet_id = f"sheet_{timestamp[:8]}"
     
-    with open(content_path, 'w', encoding='utf-8', buffering=buffer_size) as f:
-        # 写入XML头部
-        f.write('<?xml version="1.0" encoding="UTF-8" standalone="no"?>')
-        f.write('<xmap-content xmlns="urn:xmind:xmap:xmlns:content:2.0" xmlns:fo="http://www.w3.org/1999/XSL/Format" xmlns:svg="http://www.w3.org/2000/svg" xmlns:xhtml="http://www.w3.org/1999/xhtml" xmlns:xlink="http://www.w3.org/1999/xlink" modified-by="XMind" timestamp="' + timestamp + '" version="2.0">')
-        
-        # 写入sheets开始标签
-        f.write(f'<sheet id="{sheet_id}" timestamp="{timestamp}" theme="0bjllfq8ghidkddh57pckr1vv1">')
-        f.write(f'<topic id="root" timestamp="{timestamp}" structure-class="{layout_strategy}">')
-        
-        # 处理根主题
-        root_title = parsed_data.get('title', '思维导图')
-        root_title = saxutils.escape(root_title)
-        f.write(f'<title>{root_title}</title>')
-        f.write('<position x="121" y="133"/>')
-        
+    # 写入XML头部
+    f.write('<?xml version="1.0" encoding="UTF-8" standalone="no"?>')
+    f.write('<xmap-content xmlns="urn:xmind:xmap:xmlns:content:2.0" xmlns:fo="http://www.w3.org/1999/XSL/Format" xmlns:svg="http://www.w3.org/2000/svg" xmlns:xhtml="http://www.w3.org/1999/xhtml" xmlns:xlink="http://www.w3.org/1999/xlink" modified-by="XMind" timestamp="' + timestamp + '" version="2.0">')
+    
+    # 处理根主题
+    root, title_of, children_of = get_accessors(parsed_data)
+    root_title = title_of(root) or '思维导图'
+    
+    if shards:
+        sheets = describe_shard_sheets(parsed_data, shards, sheet_id)
+        write_overview_sheet_xml(f, sheet_id, root_title, sheets, timestamp)
+        for shard_sheet_id, sheet_title, root_id, shard_root_title, topics, shard_count in sheets:
+            write_sheet_xml(f, parsed_data, shard_sheet_id, sheet_title, root_id, shard_root_title, topics,
+                            select_layout_strategy(shard_count), timestamp, fold_threshold)
+    else:
         # 兼容两种字段格式获取子主题
-        children = []
-        if 'children' in parsed_data and parsed_data['children']:
-            children = parsed_data['children']
-        elif 'topics' in parsed_data and parsed_data['topics']:
-            children = parsed_data['topics']
-        
-        # 处理子主题，使用优化的方法
-        if children:
-            f.write('<children>')
-            f.write('<topics type="attached">')  # 这是XMind的规范格式
-            
-            # 使用分批处理方式
-            batch_size = 200
-            
-            # 检查子主题数量
-            if len(children) > 1000:
-                logger.warning(f"根主题有 {len(children)} 个子主题，分批处理")
-                
-                for i in range(0, len(children), batch_size):
-                    batch = children[i:i+batch_size]
-                    logger.debug(f"处理批次 {i//batch_size + 1}/{(len(children)-1)//batch_size + 1}, "
-                                f"包含 {len(batch)} 个主题")
-                    
-                    for idx, child in enumerate(batch):
-                        child_id = f"root_{i+idx}"
-                        # 直接写入，避免过多字符串连接
-                        child_xml = generate_topic_xml_optimized(child, child_id, layout_strategy)
-                        f.write(child_xml)
-                        # 强制刷新到文件
-                        if (i+idx) % 100 == 0:
-                            f.flush()
-            else:
-                for idx, child in enumerate(children):
-                    child_id = f"root_{idx}"
-                    child_xml = generate_topic_xml_optimized(child, child_id, layout_strategy)
-                    f.write(child_xml)
-            
-            f.write('</topics>')
-            f.write('</children>')
-        
-        # 写入sheets结束标签
-        f.write('</topic>')
-        f.write('<title>Sheet 1</title>')  # 添加sheet标题
+        topics = [(f"root_{idx}", child) for idx, child in enumerate(children_of(root))]
         
         # 添加关系，如果节点很多，则只处理部分
         max_relationships = min(30, node_count // 100)
-        f.write(generate_relationships(max_relationships))
-        
-        f.write('</sheet>')
-        f.write('</xmap-content>')
+        write_sheet_xml(f, parsed_data, sheet_id, "Sheet 1", "root", root_title, topics, layout_strategy,
+                        timestamp, fold_threshold, max_relationships)
+    
+    f.write('</xmap-content>')
     
     # 记录完成时间
     elapsed = time.time() - start_time
-    logger.info(f"content.xml创建完成，用时 {elapsed:.2f} 秒")
+    logger.info(f"content.xml创建完成，用时 {elapsed:.2f} 秒") 
+
+def write_sheet_xml(f, tree, sheet_id, sheet_title, root_id, root_title, topics, layout_strategy, timestamp,
+                    fold_threshold=None, max_relationships=0):
+    """
+    把一个画布（sheet）的XML写入文本流 f
     
-    # 检查文件大小
-    file_size = os.path.getsize(content_path)
-    logger.info(f"content.xml文件大小: {file_size/1024/1024:.2f} MB")
+    Args:
+        f: 可写的文本流
+        tree (dict | CompactTree): 主题所属的结构
+        sheet_id (str): 画布ID
+        sheet_title (str): 画布标题
+        root_id (str): 中心主题ID
+        root_title (str): 中心主题标题
+        topics (list): 中心主题下的 (主题ID, 节点) 列表
+        layout_strategy (str): 布局策略
+        timestamp (str): 时间戳（毫秒）
+        fold_threshold (int): 深层分支子主题数超过该值时折叠，None 表示不折叠
+        max_relationships (int): 最大关系数量
+    """
+    # 写入sheets开始标签
+    f.write(f'<sheet id="{sheet_id}" timestamp="{timestamp}" theme="0bjllfq8ghidkddh57pckr1vv1">')
+    f.write(f'<topic id="{root_id}" timestamp="{timestamp}" structure-class="{layout_strategy}">')
+    f.write(f'<title>{saxutils.escape(root_title)}</title>')
+    f.write('<position x="121" y="133"/>')
+    
+    # 处理子主题，使用优化的方法
+    if topics:
+        f.write('<children>')
+        f.write('<topics type="attached">')  # 这是XMind的规范格式
+        
+        # 检查子主题数量
+        if len(topics) > 1000:
+            logger.warning(f"根主题有 {len(topics)} 个子主题")
+        
+        # 边遍历边写入输出流，不在内存中拼接子树XML
+        for topic_id, child in topics:
+            write_topic_xml(f, child, topic_id, layout_strategy, tree=tree,
+                            fold_threshold=fold_threshold, timestamp=timestamp)
+        
+        f.write('</topics>')
+        f.write('</children>')
+    
+    # 写入sheets结束标签
+    f.write('</topic>')
+    f.write(f'<title>{saxutils.escape(sheet_title)}</title>')  # 添加sheet标题
+    f.write(generate_relationships(max_relationships))
+    f.write('</sheet>')
+
+def write_overview_sheet_xml(f, sheet_id, root_title, sheets, timestamp):
+    """写入总览画布：中心主题下每个分画布一个主题，链接到对应画布"""
+    f.write(f'<sheet id="{sheet_id}" timestamp="{timestamp}" theme="0bjllfq8ghidkddh57pckr1vv1">')
+    f.write(f'<topic id="root" timestamp="{timestamp}" structure-class="{select_layout_strategy(len(sheets) + 1)}">')
+    f.write(f'<title>{saxutils.escape(root_title)}</title>')
+    f.write('<position x="121" y="133"/>')
+    f.write('<children><topics type="attached">')
+    for number, (shard_sheet_id, _, _, shard_root_title, _, shard_count) in enumerate(sheets):
+        title = saxutils.escape(f"{shard_root_title} ({shard_count})")
+        f.write(f'\n<topic id="{OVERVIEW_TOPIC_PREFIX}{number}" xlink:href="{SHEET_LINK_PREFIX}{shard_sheet_id}" timestamp="{timestamp}">'
+                f'\n<title>{title}</title>\n</topic>')
+    f.write('</topics></children>')
+    f.write('</topic>')
+    f.write('<title>Overview</title>')
+    f.write('</sheet>')
+
+def describe_shard_sheets(structure, shards, sheet_id):
+    """
+    返回各分画布的 (画布ID, 画布标题, 中心主题ID, 中心主题标题, [(主题ID, 节点)], 节点数) 列表
+    
+    只含一个顶级主题的画布以该主题为中心主题；其余画布的中心主题为 "首个主题 … 末个主题"，
+    顶级主题作为其子主题。两种情况下主题ID都与不拆分时相同。
+    """
+    _, title_of, children_of = get_accessors(structure)
+    
+    def short_title(node):
+        title = title_of(node) or "未命名主题"
+        return title[:97] + "..." if len(title) > 100 else title
+    
+    sheets = []
+    for number, shard in enumerate(shards, 1):
+        if len(shard.topics) == 1:
+            index, node = shard.topics[0]
+            root_id = f"root_{index}"
+            root_title = short_title(node)
+            topics = [(child_topic_id(root_id, i), child) for i, child in enumerate(children_of(node))]
+            node_count = shard.node_count
+        else:
+            root_id = f"{SHARD_ROOT_PREFIX}{number}"
+            root_title = f"{short_title(shard.topics[0][1])} … {short_title(shard.topics[-1][1])}"
+            topics = [(f"root_{index}", node) for index, node in shard.topics]
+            node_count = shard.node_count + 1
+        sheet_title = root_title if len(root_title) <= 30 else root_title[:27] + "..."
+        sheets.append((f"{sheet_id}_{number}", sheet_title, root_id, root_title, topics, node_count))
+    return sheets
+
+def json_structure_class(layout_strategy):
+    """把XML使用的布局策略名转换为content.json中的structureClass"""
+    if layout_strategy == "map":
+        return "org.xmind.ui.map.unbalanced"
+    if not layout_strategy.startswith("org.xmind.ui."):
+        return "org.xmind.ui." + layout_strategy
+    return layout_strategy
+
+def write_content_json(f, parsed_data, layout_strategy, stats=None, timestamp=None, shards=None):
+    """
+    把XMind Zen格式的content.json写入二进制流 f（文件或压缩包条目）
+    
+    边遍历边写出，每个节点的JSON只生成一次；安装了 orjson 时用它编码标题。
+    主题ID、折叠规则、关系线和分画布方式与content.xml一致。
+    
+    Args:
+        f: 可写的二进制流
+        parsed_data (dict | CompactTree): 解析后的结构
+        layout_strategy (str): 布局策略
+        stats (dict): 解析器附带的统计信息，缺省时自动获取
+        timestamp (int): 时间戳（毫秒），缺省时使用当前时间
+        shards (list): plan_shards 的结果，缺省时只写一个画布
+    """
+    start_time = time.time()
+    
+    if stats is None:
+        stats = get_tree_stats(parsed_data)
+    node_count = stats["node_count"]
+    logger.info(f"创建content.json，共有 {node_count} 个节点, 布局策略: {layout_strategy}")
+    
+    fold_threshold = FOLD_CHILD_THRESHOLD if stats["max_fanout"] > FOLD_CHILD_THRESHOLD else None
+    
+    if timestamp is None:
+        timestamp = int(time.time() * 1000)
+    sheet_id = f"sheet_{str(timestamp)[:8]}"
+    
+    root, title_of, children_of = get_accessors(parsed_data)
+    root_title = title_of(root) or '思维导图'
+    
+    f.write(b'[')
+    if shards:
+        sheets = describe_shard_sheets(parsed_data, shards, sheet_id)
+        
+        # 总览画布的主题链接到各分画布
+        overview = [{"id": f"{OVERVIEW_TOPIC_PREFIX}{number}", "class": "topic",
+                     "title": f"{shard_root_title} ({shard_count})", "href": SHEET_LINK_PREFIX + shard_sheet_id}
+                    for number, (shard_sheet_id, _, _, shard_root_title, _, shard_count) in enumerate(sheets)]
+        root_topic = {"id": "root", "class": "topic", "title": root_title,
+                      "structureClass": json_structure_class(select_layout_strategy(len(sheets) + 1)),
+                      "children": {"attached": overview}}
+        f.write(dump_json({"id": sheet_id, "class": "sheet", "title": "Overview", "rootTopic": root_topic}))
+        
+        for shard_sheet_id, sheet_title, root_id, shard_root_title, topics, shard_count in sheets:
+            f.write(b',')
+            write_sheet_json(f, parsed_data, shard_sheet_id, sheet_title, root_id, shard_root_title, topics,
+                             select_layout_strategy(shard_count), fold_threshold)
+    else:
+        topics = [(f"root_{idx}", child) for idx, child in enumerate(children_of(root))]
+        write_sheet_json(f, parsed_data, sheet_id, "Sheet 1", "root", root_title, topics, layout_strategy,
+                         fold_threshold, min(30, node_count // 100))
+    f.write(b']')
+    
+    elapsed = time.time() - start_time
+    logger.info(f"content.json创建完成，用时 {elapsed:.2f} 秒")
+
+def write_sheet_json(f, tree, sheet_id, sheet_title, root_id, root_title, topics, layout_strategy,
+                     fold_threshold=None, max_relationships=0):
+    """
+    把一个画布（sheet）的JSON对象写入二进制流 f，参数同 write_sheet_xml
+    """
+    _, title_of, _ = get_accessors(tree)
+    is_folded = get_folded_test(tree)
+    write = f.write
+    ids = []
+    
+    def enter(node, depth, index, children):
+        topic_id = child_topic_id(ids[-1], index) if ids else start_id
+        title = title_of(node) or "未命名主题"
+        if len(title) > 100:
+            title = title[:97] + "..."
+        extra = b''
+        if ((is_folded is not None and is_folded(node))
+                or (fold_threshold is not None and depth > 2 and len(children) > fold_threshold)):
+            extra = b',"branch":"folded"'
+        ids.append(topic_id)
+        
+        separator = b',' if index else b''
+        head = separator + b'{"id":"' + topic_id.encode('ascii') + b'","class":"topic","title":' + dump_json(title) + extra
+        if children:
+            if len(children) > 1000:
+                logger.warning(f"主题 '{title[:30]}...' 有 {len(children)} 个子主题")
+            write(head + b',"children":{"attached":[')
+        else:
+            write(head)
+    
+    def exit(node, depth, index, children):
+        ids.pop()
+        write(b']}}' if children else b'}')
+    
+    write(b'{"id":' + dump_json(sheet_id) + b',"class":"sheet","title":' + dump_json(sheet_title) + b',"rootTopic":')
+    head = (b'{"id":"' + root_id.encode('ascii') + b'","class":"topic","title":' + dump_json(root_title)
+            + b',"structureClass":' + dump_json(json_structure_class(layout_strategy)))
+    if topics:
+        write(head + b',"children":{"attached":[')
+        for number, (start_id, child) in enumerate(topics):
+            if number:
+                write(b',')
+            # 顶级主题的深度为1，与不拆分时的折叠规则一致
+            walk(tree, enter, exit, node=child, depth=1)
+        write(b']}}')
+    else:
+        write(head + b'}')
     
-    return content_path 
\ No newline at end of file
+    # 关系线与content.xml相同
+    relationships = [{"id": rel_id, "end1Id": source_id, "end2Id": target_id}
+                     for rel_id, source_id, target_id, _ in iter_relationships(max_relationships)]
+    if relationships:
+        write(b',"relationships":' + dump_json(relationships))
+    write(b'}')
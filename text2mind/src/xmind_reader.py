@@ -0,0 +1,376 @@
+"""
+Native reader for .xmind files (XMind 8 content.xml and XMind Zen content.json).
+"""
+
+import json
+import logging
+import zipfile
+import xml.etree.ElementTree as ET
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import ijson
+except ImportError:
+    ijson = None
+
+try:
+    from .parser import OPEN, CLOSE, build_from_events
+except ImportError:
+    # When run directly
+    from parser import OPEN, CLOSE, build_from_events
+
+logger = logging.getLogger("xmind_reader")
+
+def _local_name(tag):
+    """Strip the namespace from an ElementTree tag."""
+    return tag.rsplit('}', 1)[-1]
+
+# 画布开始事件: (SHEET, 画布ID)
+SHEET = "sheet"
+
+# 分画布文件中总览主题链接到画布时使用的前缀
+SHEET_LINK_PREFIX = "xmind:#"
+
+# 合并了多个顶级主题的分画布，其中心主题ID的前缀；这样的中心主题不是原导图中的主题
+SHARD_ROOT_PREFIX = "shard_"
+
+# 总览画布中链接到分画布的主题，其ID的前缀
+OVERVIEW_TOPIC_PREFIX = "overview_"
+
+XLINK_HREF = "{http://www.w3.org/1999/xlink}href"
+
+def iter_content_xml_sheets(fileobj):
+    """
+    Stream the topics of every sheet of a content.xml.
+
+    Elements are cleared and detached from their parent as soon as they end,
+    so memory use depends only on the depth of the map, not its size.
+    Topics in non-attached lists (e.g. floating topics) are skipped.
+
+    Args:
+        fileobj: A binary file object with the content.xml data.
+
+    Yields:
+        tuple: (SHEET, sheet_id) before each sheet's topics, then
+        (OPEN, depth, title, topic_id, href) and (CLOSE, depth, None).
+    """
+    # 当前打开的元素，用于找到父元素并在结束时把元素从父元素中移除
+    elements = []
+    # 已发出 OPEN 事件的主题数
+    depth = 0
+    # 已开始但还没有读到标题的主题: (ID, 链接)
+    pending = None
+    # 跳过的主题列表所在的元素层数
+    skipping = None
+
+    for event, elem in ET.iterparse(fileobj, events=('start', 'end')):
+        tag = _local_name(elem.tag)
+        if event == 'start':
+            elements.append(elem)
+            if skipping is not None:
+                continue
+            if tag == 'sheet':
+                yield (SHEET, elem.get('id'))
+            elif tag == 'topics' and elem.get('type', 'attached') != 'attached':
+                skipping = len(elements)
+            elif tag == 'topic':
+                pending = (elem.get('id'), elem.get(XLINK_HREF))
+            elif tag == 'children' and pending:
+                # 没有标题的主题
+                yield (OPEN, depth, '') + pending
+                depth += 1
+                pending = None
+            continue
+
+        elements.pop()
+        parent = elements[-1] if elements else None
+        if skipping is not None:
+            if len(elements) < skipping:
+                skipping = None
+        elif tag == 'title' and pending and _local_name(parent.tag) == 'topic':
+            yield (OPEN, depth, elem.text or '') + pending
+            depth += 1
+            pending = None
+        elif tag == 'topic':
+            if pending:
+                yield (OPEN, depth, '') + pending
+                depth += 1
+                pending = None
+            depth -= 1
+            yield (CLOSE, depth, None)
+
+        elem.clear()
+        if parent is not None:
+            parent.remove(elem)
+
+def iter_content_json_sheets(data):
+    """
+    Yield the topics of every sheet of a content.json, like iter_content_xml_sheets.
+
+    The JSON document is decoded in one go (with orjson when available); the
+    topic trees are then walked with an explicit stack. See
+    iter_content_json_stream_sheets for reading without loading the document.
+
+    Args:
+        data (bytes): The content.json data.
+
+    Yields:
+        tuple: (SHEET, sheet_id), (OPEN, depth, title, topic_id, href) or (CLOSE, depth, None).
+    """
+    sheets = orjson.loads(data) if orjson is not None else json.loads(data)
+    for sheet in sheets:
+        yield (SHEET, sheet.get('id'))
+        depth = 0
+        stack = [(sheet['rootTopic'], False)]
+        while stack:
+            topic, closing = stack.pop()
+            if closing:
+                depth -= 1
+                yield (CLOSE, depth, None)
+                continue
+
+            yield (OPEN, depth, topic.get('title', ''), topic.get('id'), topic.get('href'))
+            depth += 1
+            stack.append((topic, True))
+            children = (topic.get('children') or {}).get('attached') or []
+            for child in reversed(children):
+                stack.append((child, False))
+
+# 流式读取 content.json 时各层容器的类型
+_JSON_SHEETS, _JSON_SHEET, _JSON_TOPIC, _JSON_CHILDREN, _JSON_ATTACHED, _JSON_SKIP = range(6)
+
+def iter_content_json_stream_sheets(fileobj):
+    """
+    Stream the topics of every sheet of a content.json with ijson, like iter_content_xml_sheets.
+
+    Only the open containers are kept, so memory use depends on the depth of
+    the map, not its size. A topic is opened at its children (or its end), so
+    its id, title and href must come before its children, and a sheet's id
+    before its root topic, as XMind writes them; values after that are
+    ignored. Detached topics are skipped.
+
+    Args:
+        fileobj: A binary file object with the content.json data.
+
+    Yields:
+        tuple: (SHEET, sheet_id), (OPEN, depth, title, topic_id, href) or (CLOSE, depth, None).
+    """
+    containers = []
+    key = None
+    depth = 0
+    # 已开始但还没有发出 OPEN 事件的主题: {键: 值}
+    pending = None
+    # 当前画布的 SHEET 事件是否已发出
+    sheet_started = False
+
+    for event, value in ijson.basic_parse(fileobj):
+        if event == 'map_key':
+            key = value
+            continue
+
+        parent = containers[-1] if containers else None
+        if event in ('start_map', 'start_array'):
+            if parent is None:
+                kind = _JSON_SHEETS
+            elif parent == _JSON_SHEETS and event == 'start_map':
+                kind = _JSON_SHEET
+                sheet_started = False
+            elif (parent == _JSON_SHEET and key == 'rootTopic') or parent == _JSON_ATTACHED:
+                kind = _JSON_TOPIC if event == 'start_map' else _JSON_SKIP
+                if kind == _JSON_TOPIC:
+                    if not sheet_started:
+                        yield (SHEET, None)
+                        sheet_started = True
+                    pending = {}
+            elif parent == _JSON_TOPIC and key == 'children' and event == 'start_map':
+                kind = _JSON_CHILDREN
+                if pending is not None:
+                    yield (OPEN, depth, pending.get('title', ''), pending.get('id'), pending.get('href'))
+                    depth += 1
+                    pending = None
+            elif parent == _JSON_CHILDREN and key == 'attached' and event == 'start_array':
+                kind = _JSON_ATTACHED
+            else:
+                kind = _JSON_SKIP
+            containers.append(kind)
+        elif event in ('end_map', 'end_array'):
+            kind = containers.pop()
+            if kind == _JSON_TOPIC:
+                if pending is not None:
+                    yield (OPEN, depth, pending.get('title', ''), pending.get('id'), pending.get('href'))
+                    depth += 1
+                    pending = None
+                depth -= 1
+                yield (CLOSE, depth, None)
+        elif parent == _JSON_TOPIC and pending is not None and key in ('id', 'title', 'href'):
+            pending[key] = value
+        elif parent == _JSON_SHEET and key == 'id' and not sheet_started:
+            yield (SHEET, value)
+            sheet_started = True
+
+def is_overview_topic(event):
+    """Return whether an OPEN event is a topic of a sharded map's overview sheet (see stitch_sheets)."""
+    return (event[3] or '').startswith(OVERVIEW_TOPIC_PREFIX) and (event[4] or '').startswith(SHEET_LINK_PREFIX)
+
+def stitch_sheets(sheet_events):
+    """
+    Turn the per-sheet events of a content file into the outline events of the map.
+
+    Normally that is the first sheet, read unchanged. When the first sheet is
+    the overview written for a sharded map (see plan_shards) - every top-level
+    topic has an id starting with OVERVIEW_TOPIC_PREFIX, links to another
+    sheet and has no children - the linked sheets are stitched back under the
+    overview's central topic instead: a sheet whose central topic is one
+    top-level topic is attached as that topic; for a sheet grouping several
+    top-level topics (central topic id starting with SHARD_ROOT_PREFIX) its
+    children are attached. Ordinary links between sheets do not count.
+
+    Events of the first sheet are held back only while it still looks like
+    such an overview, so an ordinary map is streamed as soon as it does not.
+
+    Args:
+        sheet_events: Events from iter_content_xml_sheets or iter_content_json_sheets.
+
+    Yields:
+        tuple: (OPEN, depth, title) or (CLOSE, depth, None).
+    """
+    sheet_number = 0
+    # 第一个画布是否为总览；确定之前它的事件暂存在 held 中
+    overview = None
+    held = []
+    links = set()
+    # 当前分画布: 是否读取、深度偏移、是否跳过中心主题
+    stitching = False
+    offset = 0
+    skip_root = False
+
+    for event in sheet_events:
+        kind = event[0]
+        if kind == SHEET:
+            sheet_number += 1
+            if sheet_number > 1:
+                if not overview:
+                    return
+                stitching = event[1] in links
+            continue
+
+        depth = event[1]
+        if sheet_number == 1:
+            if overview is None:
+                held.append(event)
+                if depth > 1 or (kind == OPEN and depth == 1 and not is_overview_topic(event)):
+                    overview = False
+                elif kind == OPEN and depth == 1:
+                    links.add(event[4][len(SHEET_LINK_PREFIX):])
+                elif kind == CLOSE and depth == 0:
+                    overview = bool(links)
+                if overview is not None:
+                    # 总览画布只保留中心主题，分画布的主题接在它下面
+                    for held_event in (held if not overview else held[:1]):
+                        yield held_event[:3]
+                    held = None
+                continue
+            yield event[:3]
+            if kind == CLOSE and depth == 0:
+                return
+            continue
+
+        if not stitching:
+            continue
+        if depth == 0:
+            if kind == OPEN:
+                skip_root = (event[3] or '').startswith(SHARD_ROOT_PREFIX)
+                offset = 0 if skip_root else 1
+            if skip_root:
+                continue
+        yield (kind, depth + offset) + event[2:3]
+
+    if overview:
+        yield (CLOSE, 0, None)
+    elif held:
+        # 内容在第一个画布结束之前就中断了
+        for held_event in held:
+            yield held_event[:3]
+
+def iter_content_xml_events(fileobj):
+    """
+    Stream the topics of a content.xml as outline events (see stitch_sheets).
+
+    Args:
+        fileobj: A binary file object with the content.xml data.
+
+    Yields:
+        tuple: (OPEN, depth, title) or (CLOSE, depth, None).
+    """
+    yield from stitch_sheets(iter_content_xml_sheets(fileobj))
+
+def iter_content_json_events(source):
+    """
+    Yield the topics of a content.json as outline events (see stitch_sheets).
+
+    File objects are streamed with ijson when it is installed; otherwise, and
+    for data already in memory, the document is decoded in one go.
+
+    Args:
+        source (bytes | file): The content.json data, or a binary file object with it.
+
+    Yields:
+        tuple: (OPEN, depth, title) or (CLOSE, depth, None).
+    """
+    if isinstance(source, (bytes, bytearray)):
+        sheets = iter_content_json_sheets(source)
+    elif ijson is not None:
+        sheets = iter_content_json_stream_sheets(source)
+    else:
+        sheets = iter_content_json_sheets(source.read())
+    yield from stitch_sheets(sheets)
+
+def iter_xmind_events(source):
+    """
+    Stream the map of an .xmind file as outline events: the first sheet, or
+    all shard sheets of a sharded map (see stitch_sheets).
+
+    content.json is preferred when present, since XMind Zen files may also
+    carry a placeholder content.xml.
+
+    Args:
+        source (str | file): Path or binary file object of the .xmind archive.
+
+    Yields:
+        tuple: (OPEN, depth, title) or (CLOSE, depth, None), the same events
+        iter_outline_events produces.
+
+    Raises:
+        ValueError: If the archive has neither content.json nor content.xml.
+    """
+    with zipfile.ZipFile(source) as archive:
+        names = set(archive.namelist())
+        if 'content.json' in names:
+            logger.debug("读取 content.json")
+            with archive.open('content.json') as f:
+                yield from iter_content_json_events(f)
+        elif 'content.xml' in names:
+            logger.debug("读取 content.xml")
+            with archive.open('content.xml') as f:
+                yield from iter_content_xml_events(f)
+        else:
+            raise ValueError(f"Not an XMind file (no content.xml or content.json): {source}")
+
+def read_xmind(source, compact=False):
+    """
+    Read the map of an .xmind file into the parser's structure (see iter_xmind_events).
+
+    Args:
+        source (str | file): Path or binary file object of the .xmind archive.
+        compact (bool): Return a CompactTree instead of nested dicts.
+
+    Returns:
+        dict | CompactTree: The hierarchical structure with statistics attached,
+        exactly like parse_text would return for the equivalent outline.
+    """
+    logger.info(f"开始读取XMind文件: {source}")
+    return build_from_events(iter_xmind_events(source), compact=compact)
@@ -0,0 +1,104 @@
+import unittest
+import sys
+import os
+import io
+import zlib
+import zipfile
+import threading
+from unittest import mock
+
+# Add the parent directory to the path so we can import the src module
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src import archive
+from src.archive import precompress, write_precompressed, ParallelCompressor, open_parallel_deflated
+
+class UnseekableWriter(io.RawIOBase):
+    """A write-only stream without seek/tell, like a socket or a pipe."""
+    
+    def __init__(self):
+        self.data = bytearray()
+    
+    def writable(self):
+        return True
+    
+    def write(self, b):
+        self.data += b
+        return len(b)
+
+class TestArchive(unittest.TestCase):
+    
+    def test_precompressed_members(self):
+        """Test that pre-compressed members read back like normally written ones."""
+        entry = precompress('styles.xml', '<xmap-styles>' + 'x' * 1000 + '</xmap-styles>')
+        other = precompress('数据/说明.txt', '中文内容')
+        self.assertLess(len(entry.compressed), entry.file_size)
+        
+        for target in (io.BytesIO(), UnseekableWriter()):
+            with zipfile.ZipFile(target, 'w', zipfile.ZIP_DEFLATED) as zipf:
+                write_precompressed(zipf, entry)
+                zipf.writestr('content.xml', '<xmap-content/>')
+                write_precompressed(zipf, other)
+            
+            data = target.getvalue() if isinstance(target, io.BytesIO) else bytes(target.data)
+            with zipfile.ZipFile(io.BytesIO(data)) as zipf:
+                self.assertIsNone(zipf.testzip())
+                self.assertEqual(zipf.namelist(), ['styles.xml', 'content.xml', '数据/说明.txt'])
+                self.assertEqual(zipf.read('styles.xml').decode('utf-8'), '<xmap-styles>' + 'x' * 1000 + '</xmap-styles>')
+                self.assertEqual(zipf.read('数据/说明.txt').decode('utf-8'), '中文内容')
+    
+    def test_precompressed_fallback(self):
+        """Test that members are written with writestr where ZipFile internals are not known."""
+        entry = precompress('styles.xml', '<xmap-styles>' + 'x' * 1000 + '</xmap-styles>')
+        raw = io.BytesIO()
+        with zipfile.ZipFile(raw, 'w', zipfile.ZIP_DEFLATED) as zipf:
+            write_precompressed(zipf, entry, (2021, 3, 17, 0, 0, 0))
+        
+        fallback = io.BytesIO()
+        with mock.patch.object(archive, 'RAW_COPY_VERSIONS', ((3, 0), (3, 0))):
+            with zipfile.ZipFile(fallback, 'w', zipfile.ZIP_DEFLATED) as zipf:
+                self.assertFalse(archive.can_copy_raw(zipf))
+                write_precompressed(zipf, entry, (2021, 3, 17, 0, 0, 0))
+        
+        with zipfile.ZipFile(io.BytesIO(fallback.getvalue())) as zipf:
+            self.assertIsNone(zipf.testzip())
+            self.assertEqual(zipf.read('styles.xml').decode('utf-8'), '<xmap-styles>' + 'x' * 1000 + '</xmap-styles>')
+        # writestr 以相同的级别压缩，结果与直接复制的一致
+        self.assertEqual(fallback.getvalue(), raw.getvalue())
+    
+    def test_parallel_compressor(self):
+        """Test that block-wise parallel deflate produces one valid raw deflate stream."""
+        data = b''.join(b'<topic id="%d"><title>node %d</title></topic>' % (i, i % 97) for i in range(20000))
+        compressor = ParallelCompressor(block_size=4096, workers=3)
+        compressed = b''.join(compressor.compress(data[i:i + 1000]) for i in range(0, len(data), 1000))
+        compressed += compressor.flush()
+        
+        self.assertEqual(zlib.decompressobj(-15).decompress(compressed), data)
+        self.assertLess(len(compressed), len(data) // 5)
+    
+    def test_parallel_compressor_close(self):
+        """Test that closing a compressor mid-stream stops its worker threads."""
+        threads = threading.active_count()
+        compressor = ParallelCompressor(block_size=4096, workers=3)
+        compressor.compress(b'x' * 100000)
+        compressor.close()
+        
+        self.assertEqual(threading.active_count(), threads)
+        with self.assertRaises(RuntimeError):
+            compressor.compress(b'x' * 100000)
+    
+    def test_parallel_member(self):
+        """Test that a parallel-deflated member is a regular deflated zip member."""
+        data = ('中文标题 ' * 50000).encode('utf-8')
+        target = io.BytesIO()
+        with zipfile.ZipFile(target, 'w', zipfile.ZIP_DEFLATED) as zipf:
+            with open_parallel_deflated(zipf, 'content.xml', workers=2) as entry:
+                entry.write(data)
+        
+        with zipfile.ZipFile(io.BytesIO(target.getvalue())) as zipf:
+            self.assertIsNone(zipf.testzip())
+            self.assertEqual(zipf.getinfo('content.xml').compress_type, zipfile.ZIP_DEFLATED)
+            self.assertEqual(zipf.read('content.xml'), data)
+
+if __name__ == '__main__':
+    unittest.main()
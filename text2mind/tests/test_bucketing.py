@@ -0,0 +1,58 @@
+import unittest
+import sys
+import os
+
+# Add the parent directory to the path so we can import the src module
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.parser import parse_text
+from src.bucketing import bucket_fanouts
+from src.traversal import iter_preorder
+from src.xmind_generator import generate_topic_xml_optimized
+
+def wide_text(count):
+    """Return an outline whose root has count children, the first one with a child."""
+    lines = ["Root", "    item 0", "        detail"]
+    lines.extend(f"    item {i}" for i in range(1, count))
+    return "\n".join(lines)
+
+def leaf_titles(tree):
+    """Return the titles of the original topics (not buckets) in pre-order."""
+    return [node["title"] for node, _ in iter_preorder(tree) if not node.get("folded")]
+
+class TestBucketing(unittest.TestCase):
+
+    def test_range_buckets(self):
+        """Test that a wide fan-out is regrouped into nested, folded range buckets."""
+        structure = parse_text(wide_text(250))
+        result = bucket_fanouts(structure, bucket_size=10)
+
+        self.assertEqual([node["title"] for node in result["topics"]], ["1–100", "101–200", "201–250"])
+        self.assertEqual(result["topics"][0]["topics"][1]["title"], "11–20")
+        self.assertTrue(result["topics"][0]["folded"])
+        self.assertEqual(result["stats"]["max_fanout"], 10)
+        self.assertEqual(leaf_titles(result), leaf_titles(structure))
+
+        xml = generate_topic_xml_optimized(result["topics"][0], "root_0", "map")
+        self.assertIn('folded="true">\n<title>1–100</title>', xml)
+        self.assertIn('folded="false">\n<title>item 0</title>', xml)
+
+    def test_compact_and_alpha(self):
+        """Test alphabetic bucket titles and that CompactTrees are bucketed like dicts."""
+        structure = bucket_fanouts(parse_text(wide_text(30)), bucket_size=10, mode="alpha")
+        compact = bucket_fanouts(parse_text(wide_text(30), compact=True), bucket_size=10, mode="alpha")
+
+        self.assertEqual([compact.title(node) for node, _ in iter_preorder(compact)],
+                         [node["title"] for node, _ in iter_preorder(structure)])
+        self.assertEqual([compact.title(node) for node in compact.children(0)],
+                         ["item 0–item 9", "item 10–item 19", "item 20–item 29"])
+        self.assertEqual(len(compact.folded), 3)
+        self.assertEqual(compact.stats["node_count"], 35)
+
+    def test_small_fanout_unchanged(self):
+        """Test that structures without wide fan-outs are copied unchanged."""
+        structure = parse_text(wide_text(5))
+        self.assertEqual(bucket_fanouts(structure, bucket_size=10), structure)
+
+if __name__ == '__main__':
+    unittest.main()
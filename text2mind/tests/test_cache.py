@@ -0,0 +1,77 @@
+import unittest
+import sys
+import os
+import tempfile
+import shutil
+from unittest import mock
+
+# Add the parent directory to the path so we can import the src module
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.cache import ConversionCache
+from src.main import convert
+
+class TestConversionCache(unittest.TestCase):
+    
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+    
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+    
+    def test_keys(self):
+        """Test that keys depend on the input and the options."""
+        cache = ConversionCache(self.directory)
+        self.assertEqual(cache.key("Root"), cache.key(b"Root"))
+        self.assertNotEqual(cache.key("Root"), cache.key("Root2"))
+        self.assertNotEqual(cache.key("Root"), cache.key("Root", {"profile": "lean"}))
+        
+        path = os.path.join(self.directory, "input.txt")
+        with open(path, 'wb') as f:
+            f.write(b"Root\n    Child")
+        self.assertEqual(cache.file_key(path), cache.key("Root\n    Child"))
+    
+    def test_get_and_fetch(self):
+        """Test storing and reading back an entry."""
+        cache = ConversionCache(self.directory)
+        self.assertIsNone(cache.get("missing"))
+        cache.put("abc", b"xmind bytes")
+        self.assertEqual(cache.get("abc"), b"xmind bytes")
+        
+        output_path = os.path.join(self.directory, "out.xmind")
+        self.assertTrue(cache.fetch("abc", output_path))
+        with open(output_path, 'rb') as f:
+            self.assertEqual(f.read(), b"xmind bytes")
+    
+    def test_lru_eviction(self):
+        """Test that the least recently used entries are evicted over budget."""
+        cache = ConversionCache(self.directory, max_bytes=250)
+        cache.put("first", b"1" * 100)
+        cache.put("second", b"2" * 100)
+        # 让 first 成为最近使用的条目
+        os.utime(os.path.join(self.directory, "second.xmind"), (0, 0))
+        cache.get("first")
+        cache.put("third", b"3" * 100)
+        
+        self.assertIsNone(cache.get("second"))
+        self.assertIsNotNone(cache.get("first"))
+        self.assertIsNotNone(cache.get("third"))
+
+    def test_fallback_is_not_cached(self):
+        """Test that a degraded fallback archive is written but never stored in the cache."""
+        input_path = os.path.join(self.directory, "input.txt")
+        with open(input_path, 'w', encoding='utf-8') as f:
+            f.write("Root\n    Child")
+        output_path = os.path.join(self.directory, "out.xmind")
+        cache_dir = os.path.join(self.directory, "cache")
+        
+        with mock.patch("src.xmind_generator.write_content_xml", side_effect=RuntimeError("broken")):
+            convert.callback(input_path, output_path, use_cache=True, cache_dir=cache_dir)
+        self.assertTrue(os.path.exists(output_path))
+        self.assertFalse(os.path.isdir(cache_dir) and os.listdir(cache_dir))
+        
+        convert.callback(input_path, output_path, use_cache=True, cache_dir=cache_dir)
+        self.assertEqual(len(os.listdir(cache_dir)), 1)
+
+if __name__ == '__main__':
+    unittest.main()
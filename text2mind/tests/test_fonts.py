@@ -0,0 +1,51 @@
+import unittest
+import sys
+import os
+
+# Add the parent directory to the path so we can import the src module
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.fonts import get_font, font_for_text, needs_cjk, text_width, wrap_text, fit_text, ELLIPSIS
+
+class TestFonts(unittest.TestCase):
+
+    def test_fonts_are_loaded_once(self):
+        """Test that the registry returns the same font object for the same size."""
+        self.assertIs(get_font(16), get_font(16))
+        self.assertIs(font_for_text("Topic", 16), get_font(16))
+        self.assertIs(font_for_text("中文主题", 16), get_font(16, True))
+        self.assertTrue(needs_cjk("Topic 主题"))
+        self.assertFalse(needs_cjk("Topic é"))
+
+    def test_text_width(self):
+        """Test that cached glyph widths add up to the measured width of the text."""
+        for text in ["Topic 123", "中文标题", ""]:
+            self.assertAlmostEqual(text_width(text, 16), font_for_text(text, 16).getlength(text), delta=len(text))
+        self.assertGreater(text_width("Topic 1234", 16), text_width("Topic 1234", 12))
+
+    def test_wrap_text(self):
+        """Test wrapping at spaces and between CJK characters."""
+        text = "the quick brown fox jumps over the lazy dog"
+        lines = wrap_text(text, 12, 80)
+        self.assertGreater(len(lines), 1)
+        self.assertEqual(" ".join(lines), text)
+        for line in lines:
+            self.assertLessEqual(text_width(line, 12), 80)
+
+        cjk = "思维导图中的长标题会按照可用宽度自动换行"
+        lines = wrap_text(cjk, 12, 60)
+        self.assertEqual("".join(lines), cjk)
+        self.assertTrue(all(text_width(line, 12) <= 60 for line in lines))
+
+        self.assertEqual(wrap_text("x" * 40, 12, 50)[0], "x" * int(50 // text_width("x", 12)))
+        self.assertEqual(wrap_text("", 12, 50), ("",))
+
+    def test_fit_text(self):
+        """Test truncating a title to a width."""
+        self.assertEqual(fit_text("Short", 12, 100), "Short")
+        fitted = fit_text("A very long central topic title", 12, 80)
+        self.assertTrue(fitted.endswith(ELLIPSIS))
+        self.assertLessEqual(text_width(fitted, 12), 80)
+
+if __name__ == '__main__':
+    unittest.main()
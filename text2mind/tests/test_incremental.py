@@ -0,0 +1,75 @@
+import unittest
+import sys
+import os
+
+# Add the parent directory to the path so we can import the src module
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.parser import parse_text
+from src.incremental import parse_document, reparse
+
+TEXT = """Root Topic
+    Subtopic 1
+        Sub-subtopic A
+        Sub-subtopic B
+    Subtopic 2
+        Sub-subtopic C
+    Subtopic 3"""
+
+def parse_without_stats(text):
+    result = parse_text(text)
+    result.pop("stats")
+    return result
+
+class TestIncremental(unittest.TestCase):
+    
+    def test_parse_document(self):
+        """Test that a document parses like parse_text."""
+        document = parse_document(TEXT)
+        self.assertEqual(document.tree, parse_without_stats(TEXT))
+    
+    def test_edit_title(self):
+        """Test editing one title reports only that node."""
+        document = parse_document(TEXT)
+        tree, changed = reparse(document, 3, 4, ["        Sub-subtopic B2"])
+        
+        lines = TEXT.split("\n")
+        lines[3] = "        Sub-subtopic B2"
+        self.assertEqual(tree, parse_without_stats("\n".join(lines)))
+        self.assertEqual(changed, [(0, 1)])
+    
+    def test_edit_changes_nesting(self):
+        """Test that indenting a line re-attaches the following siblings."""
+        document = parse_document(TEXT)
+        tree, changed = reparse(document, 4, 5, ["        Subtopic 2"])
+        
+        lines = TEXT.split("\n")
+        lines[4] = "        Subtopic 2"
+        self.assertEqual(tree, parse_without_stats("\n".join(lines)))
+        self.assertEqual(tree["topics"][0]["topics"][2]["title"], "Subtopic 2")
+        self.assertIn((), changed)
+    
+    def test_insert_and_delete_lines(self):
+        """Test inserting and deleting whole lines."""
+        document = parse_document(TEXT)
+        lines = TEXT.split("\n")
+        
+        tree, changed = reparse(document, 6, 6, ["        New C2", "            Deep"])
+        lines[6:6] = ["        New C2", "            Deep"]
+        self.assertEqual(tree, parse_without_stats("\n".join(lines)))
+        self.assertEqual(changed, [(1, 1)])
+        
+        tree, changed = reparse(document, 1, 4, [])
+        del lines[1:4]
+        self.assertEqual(tree, parse_without_stats("\n".join(lines)))
+        self.assertEqual(changed, [()])
+    
+    def test_edit_root(self):
+        """Test that editing the root line falls back to a full parse."""
+        document = parse_document(TEXT)
+        tree, changed = reparse(document, 0, 1, ["New Root"])
+        self.assertEqual(tree["title"], "New Root")
+        self.assertEqual(changed, [()])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,106 @@
+import unittest
+import sys
+import os
+import random
+
+# Add the parent directory to the path so we can import the src module
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.parser import parse_text
+from src.bucketing import bucket_fanouts
+from src.layout import (layout_tree, measure_title, title_lines, box_height, LEVEL_GAP, MAX_TITLE_WIDTH,
+                        MAX_TITLE_LINES)
+from src.fonts import text_width, line_height, ELLIPSIS
+from src.xmind_generator import draw_mind_map
+
+def fixed_measure(title, depth):
+    """Measure titles without fonts, so layouts are the same on every machine."""
+    return len(title) * 7 + 20, 20 if depth else 30
+
+def random_outline(seed, count):
+    """Return a random indented outline with count topics below the root."""
+    rng = random.Random(seed)
+    lines = ["Root"]
+    depth = 1
+    for i in range(count):
+        depth = max(1, min(depth + rng.choice([-1, 0, 0, 1, 1]), 8))
+        lines.append("    " * depth + "x" * rng.randint(1, 12))
+    return "\n".join(lines)
+
+class TestLayout(unittest.TestCase):
+
+    def assert_tidy(self, layout):
+        """Check that boxes in a column never overlap, and parents are centred on their children."""
+        columns = {}
+        children = {}
+        for i in range(len(layout)):
+            columns.setdefault(layout.depth[i], []).append(layout.box(i))
+            if i:
+                children.setdefault(layout.parent[i], []).append(i)
+            left, top, right, bottom = layout.box(i)
+            self.assertTrue(0 <= left and right <= layout.width_total)
+            self.assertTrue(0 <= top and bottom <= layout.height_total)
+
+        for boxes in columns.values():
+            boxes.sort(key=lambda box: box[1])
+            for above, below in zip(boxes, boxes[1:]):
+                self.assertGreaterEqual(below[1], above[3] - 1e-6)
+
+        for parent, nodes in children.items():
+            centre = lambda node: layout.y[node] + layout.height[node] / 2
+            self.assertAlmostEqual(centre(parent), (centre(nodes[0]) + centre(nodes[-1])) / 2)
+            self.assertGreaterEqual(layout.x[nodes[0]], layout.x[parent] + layout.width[parent] + LEVEL_GAP)
+
+    def test_tidy_layout(self):
+        """Test the layout invariants on random dict and compact trees."""
+        for seed in range(10):
+            text = random_outline(seed, 300)
+            layout = layout_tree(parse_text(text, compact=seed % 2 == 0), measure=fixed_measure)
+            self.assertEqual(len(layout), 301)
+            self.assert_tidy(layout)
+
+    def test_subtrees_are_packed(self):
+        """Test that a small subtree slides into the space left beside a deep one."""
+        text = "Root\n    A\n        A1\n        A2\n        A3\n        A4\n    B\n    C"
+        layout = layout_tree(parse_text(text), measure=fixed_measure)
+        self.assert_tidy(layout)
+        # B 和 C 与 A 的子主题不在同一列，可以紧贴 A 排列
+        self.assertLess(layout.y[7] - layout.y[1], 4 * (20 + 6))
+
+    def test_folded_topics_are_not_expanded(self):
+        """Test that the children of folded buckets are not laid out or drawn."""
+        structure = bucket_fanouts(parse_text("Root\n" + "\n".join(f"    {i}" for i in range(1000))), 10)
+        layout = layout_tree(structure, measure=fixed_measure)
+        self.assertEqual(len(layout), 11)
+        self.assertEqual(draw_mind_map(structure).size, layout_tree(structure).size)
+
+    def test_node_budget(self):
+        """Test that a budgeted layout keeps the top levels and stays tidy."""
+        text = random_outline(3, 2000)
+        for compact in (False, True):
+            layout = layout_tree(parse_text(text, compact=compact), measure=fixed_measure, max_nodes=50)
+            self.assertEqual(len(layout), 50)
+            self.assertEqual(list(layout.depth), sorted(layout.depth))
+            self.assert_tidy(layout)
+
+        wide = parse_text("Root\n" + "\n".join(f"    {i}" for i in range(1000)), compact=True)
+        layout = layout_tree(wide, measure=fixed_measure, max_nodes=10)
+        self.assertEqual(layout.titles, ["Root"] + [str(i) for i in range(9)])
+
+    def test_long_titles_wrap(self):
+        """Test that long titles wrap into taller boxes and are cut after the last line."""
+        title = "a long topic title that needs more than one line " * 2
+        lines = title_lines(title, 2)
+        self.assertGreater(len(lines), 1)
+        self.assertTrue(all(text_width(line, 12) <= MAX_TITLE_WIDTH for line in lines))
+        width, height = measure_title(title, 2)
+        self.assertLessEqual(width, MAX_TITLE_WIDTH + 20)
+        self.assertEqual(height, box_height(2) + (len(lines) - 1) * line_height(12))
+
+        lines = title_lines(title * 10, 2)
+        self.assertEqual(len(lines), MAX_TITLE_LINES)
+        self.assertTrue(lines[-1].endswith(ELLIPSIS))
+        self.assertEqual(title_lines("Short", 2), ("Short",))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -5,7 +5,11 @@ import os
 # Add the parent directory to the path so we can import the src module
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from src.parser import parse_text
+import io
+import tempfile
+
+from src.parser import parse_text, parse_stream, parse_file, parse_text_parallel, iter_outline_events, OPEN, CLOSE
+from src.compact_tree import CompactTree, NO_NODE
 
 class TestParser(unittest.TestCase):
     
@@ -48,5 +52,113 @@ class TestParser(unittest.TestCase):
         self.assertEqual(subtopic2["title"], "Subtopic 2")
         self.assertEqual(len(subtopic2["topics"]), 0)
     
+    def test_iter_outline_events(self):
+        """Test that the streaming parser emits balanced open/close events."""
+        text = """- Root
+    - A
+        - A1
+    - B
+"""
+        events = list(iter_outline_events(io.StringIO(text)))
+        self.assertEqual(events, [
+            (OPEN, 0, "Root"),
+            (OPEN, 1, "A"),
+            (OPEN, 2, "A1"),
+            (CLOSE, 2, None),
+            (CLOSE, 1, None),
+            (OPEN, 1, "B"),
+            (CLOSE, 1, None),
+            (CLOSE, 0, None),
+        ])
+    
+    def test_parse_stream_bytes(self):
+        """Test parsing from a binary stream such as request.stream."""
+        text = "Root\n    子主题 1\n        A\n\n    子主题 2\n"
+        result = parse_stream(io.BytesIO(text.encode("utf-8")))
+        self.assertEqual(result, parse_text(text))
+        self.assertEqual(result["topics"][0]["title"], "子主题 1")
+        self.assertEqual(result["topics"][0]["topics"][0]["title"], "A")
+    
+    def test_parse_compact(self):
+        """Test that the compact tree matches the dict structure."""
+        text = """Root Topic
+    Subtopic 1
+        Sub-subtopic A
+        子主题 B
+    Subtopic 2"""
+        
+        tree = parse_text(text, compact=True)
+        
+        self.assertIsInstance(tree, CompactTree)
+        self.assertEqual(len(tree), 5)
+        self.assertEqual(tree.title(0), "Root Topic")
+        self.assertEqual(tree.parent[0], NO_NODE)
+        self.assertEqual(tree.children(0), [1, 4])
+        self.assertEqual(list(tree.depth), [0, 1, 2, 2, 1])
+        self.assertEqual(tree.title(3), "子主题 B")
+        expected = parse_text(text)
+        expected.pop("stats")
+        self.assertEqual(tree.to_dict(), expected)
+        self.assertEqual(CompactTree.from_structure(expected).to_dict(), expected)
+    
+    def test_parse_stats(self):
+        """Test that the parser attaches statistics computed in the same pass."""
+        text = """Root
+    A
+        A1
+        A2
+        A3
+    B
+        B1
+            B1a"""
+        
+        expected = {
+            "node_count": 8,
+            "max_depth": 3,
+            "max_fanout": 3,
+            "title_bytes": 17,
+            "level_histogram": [1, 2, 4, 1],
+        }
+        self.assertEqual(parse_text(text)["stats"], expected)
+        self.assertEqual(parse_text(text, compact=True).stats, expected)
+        self.assertEqual(parse_text("")["stats"]["node_count"], 1)
+    
+    def test_parse_parallel(self):
+        """Test that chunked parallel parsing matches sequential parsing."""
+        lines = ["- Root"]
+        for i in range(40):
+            lines.append(f"    - Topic {i}")
+            for j in range(i % 4):
+                lines.append(f"        - Item {i}.{j}")
+                lines.append(f"            - Detail {i}.{j}")
+        text = "\n".join(lines)
+        
+        self.assertEqual(parse_text_parallel(text, workers=2), parse_text(text))
+        
+        tree = parse_text_parallel(text, workers=2, compact=True)
+        expected = parse_text(text, compact=True)
+        self.assertEqual(tree.to_dict(), expected.to_dict())
+        self.assertEqual(list(tree.depth), list(expected.depth))
+        self.assertEqual(tree.stats, expected.stats)
+    
+    def test_parse_file_mmap(self):
+        """Test parsing a file through the memory-mapped path."""
+        text = "\ufeffRoot\r\n    - 子主题 1\r\n\u3000\u3000全角缩进\n\t\n        - A  \n    B"
+        
+        with tempfile.NamedTemporaryFile(suffix=".txt", delete=False) as f:
+            f.write(text.encode("utf-8"))
+        try:
+            self.assertEqual(parse_file(f.name), parse_text(text))
+            self.assertEqual(parse_file(f.name, compact=True).to_dict()["topics"][0]["title"], "子主题 1")
+        finally:
+            os.remove(f.name)
+        
+        with tempfile.NamedTemporaryFile(suffix=".txt", delete=False) as f:
+            pass
+        try:
+            self.assertEqual(parse_file(f.name)["title"], "Empty")
+        finally:
+            os.remove(f.name)
+    
 if __name__ == "__main__":
     unittest.main() 
\ No newline at end of file
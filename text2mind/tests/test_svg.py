@@ -0,0 +1,74 @@
+import unittest
+import sys
+import os
+import io
+import tempfile
+import shutil
+import xml.etree.ElementTree as ET
+
+# Add the parent directory to the path so we can import the src module
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.parser import parse_text
+from src.bucketing import bucket_fanouts
+from src.layout import layout_tree, title_lines
+from src.svg import export_svg, write_svg
+from src.xmind_generator import create_xmind_from_structure, export_xmind_to_svg, render_structure
+
+SVG = "{http://www.w3.org/2000/svg}"
+
+TEXT = "Root\n    A & B\n        <A1>\n    C\n        C1\n        C2"
+
+class TestSvg(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def test_write_svg(self):
+        """Test that every laid-out topic becomes a box, a title and a connector."""
+        layout = layout_tree(parse_text(TEXT))
+        out = io.StringIO()
+        write_svg(out, layout)
+
+        root = ET.fromstring(out.getvalue().encode('utf-8'))
+        self.assertEqual((root.get("width"), root.get("height")), tuple(map(str, layout.size)))
+        self.assertEqual([text.text for text in root.iter(SVG + "text")], layout.titles)
+        self.assertEqual(len(list(root.iter(SVG + "path"))), len(layout) - 1)
+        # 背景加每个主题一个矩形
+        self.assertEqual(len(list(root.iter(SVG + "rect"))), len(layout) + 1)
+
+        first = [text for text in root.iter(SVG + "text")][1]
+        self.assertEqual(first.get("class"), "t1")
+        self.assertAlmostEqual(float(first.get("y")), layout.y[1] + layout.height[1] / 2, places=1)
+
+    def test_wrapped_titles(self):
+        """Test that a wrapped title is written as one tspan per line."""
+        title = "a long topic title that needs more than one line " * 2
+        out = io.StringIO()
+        write_svg(out, layout_tree(parse_text("Root\n    " + title)))
+        texts = list(ET.fromstring(out.getvalue().encode('utf-8')).iter(SVG + "text"))
+        self.assertEqual([span.text for span in texts[1].iter(SVG + "tspan")], list(title_lines(title.strip(), 1)))
+
+    def test_outputs(self):
+        """Test SVG output to paths, binary streams and bytes, and folded topics."""
+        structure = bucket_fanouts(parse_text("Root\n" + "\n".join(f"    {i}" for i in range(50))), 10)
+        data = render_structure(structure, fmt="svg")
+        self.assertEqual(len(list(ET.fromstring(data).iter(SVG + "text"))), 6)
+
+        stream = io.BytesIO()
+        self.assertIs(export_svg(structure, stream), stream)
+        self.assertFalse(stream.closed)
+        self.assertEqual(stream.getvalue(), data)
+
+        xmind_path = os.path.join(self.directory, "map.xmind")
+        create_xmind_from_structure(parse_text(TEXT), xmind_path, profile="lean")
+        svg_path = export_xmind_to_svg(xmind_path)
+        self.assertEqual(svg_path, os.path.join(self.directory, "map.svg"))
+        titles = [text.text for text in ET.parse(svg_path).getroot().iter(SVG + "text")]
+        self.assertEqual(titles, ["Root", "A & B", "<A1>", "C", "C1", "C2"])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,107 @@
+import unittest
+import sys
+import os
+import tempfile
+import shutil
+import xml.etree.ElementTree as ET
+from PIL import Image, ImageChops
+
+# Add the parent directory to the path so we can import the src module
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.parser import parse_text
+from src.layout import layout_tree
+from src.tiles import SpatialGrid, pyramid_levels, write_tiles, DEFAULT_TILE_SIZE
+from src.xmind_generator import create_xmind_from_structure, draw_mind_map, export_xmind_to_png
+
+TEXT = "\n".join(["Root"] + [f"    Topic {i}\n        Detail {i}" for i in range(12)])
+
+class TestTiles(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def test_pyramid_levels(self):
+        """Test the DeepZoom level sizes."""
+        self.assertEqual(pyramid_levels(1000, 300)[0], (0, 1 / 1024, 1, 1))
+        self.assertEqual(pyramid_levels(1000, 300)[-1], (10, 1.0, 1000, 300))
+        self.assertEqual(pyramid_levels(1000, 300)[8][2:], (250, 75))
+
+    def test_grid_query(self):
+        """Test that the grid finds the nodes whose box or connector touches a rectangle."""
+        layout = layout_tree(parse_text(TEXT))
+        grid = SpatialGrid(layout, 64)
+        left, top, right, bottom = layout.box(5)
+        found = grid.query(left + 1, top + 1, right - 1, bottom - 1)
+        self.assertIn(5, found)
+        self.assertLess(len(found), len(layout))
+        self.assertEqual(grid.query(0, 0, layout.width_total, layout.height_total), list(range(len(layout))))
+
+    def test_tiles_match_single_image(self):
+        """Test that the full-resolution tiles stitch together into the single-image rendering."""
+        structure = parse_text(TEXT)
+        dzi_path = os.path.join(self.directory, "map.dzi")
+        layout = layout_tree(structure)
+        write_tiles(layout, dzi_path, tile_size=128)
+
+        size = ET.parse(dzi_path).getroot()[0].attrib
+        width, height = layout.size
+        self.assertEqual((int(size["Width"]), int(size["Height"])), (width, height))
+
+        levels = pyramid_levels(width, height)
+        files_dir = os.path.join(self.directory, "map_files")
+        self.assertEqual(sorted(map(int, os.listdir(files_dir))), [level[0] for level in levels])
+        with Image.open(os.path.join(files_dir, "0", "0_0.png")) as tile:
+            self.assertEqual(tile.size, (1, 1))
+
+        stitched = Image.new('RGB', (width, height))
+        top_dir = os.path.join(files_dir, str(levels[-1][0]))
+        for name in os.listdir(top_dir):
+            col, row = map(int, os.path.splitext(name)[0].split("_"))
+            with Image.open(os.path.join(top_dir, name)) as tile:
+                self.assertLessEqual(max(tile.size), 128)
+                stitched.paste(tile, (col * 128, row * 128))
+        # 跨瓦片的斜线被裁剪后光栅化略有不同，只允许极少数像素不一致
+        difference = ImageChops.difference(stitched, draw_mind_map(structure)).convert('L')
+        self.assertLess(width * height - difference.histogram()[0], width * height // 1000)
+
+    def test_parallel_tiles_match_serial(self):
+        """Test that tiles rendered in worker processes are identical to the serial ones."""
+        layout = layout_tree(parse_text(TEXT))
+        write_tiles(layout, os.path.join(self.directory, "serial.dzi"), tile_size=128)
+        write_tiles(layout, os.path.join(self.directory, "parallel.dzi"), tile_size=128, workers=2)
+
+        serial_dir = os.path.join(self.directory, "serial_files")
+        parallel_dir = os.path.join(self.directory, "parallel_files")
+        for level in os.listdir(serial_dir):
+            names = sorted(os.listdir(os.path.join(serial_dir, level)))
+            self.assertEqual(sorted(os.listdir(os.path.join(parallel_dir, level))), names)
+            for name in names:
+                with open(os.path.join(serial_dir, level, name), 'rb') as f:
+                    serial = f.read()
+                with open(os.path.join(parallel_dir, level, name), 'rb') as f:
+                    self.assertEqual(f.read(), serial, f"{level}/{name}")
+
+    def test_parallel_single_image(self):
+        """Test that an image drawn in bands by worker processes matches the serial drawing."""
+        # 画布高于一个横条，由多个进程分别绘制
+        structure = parse_text("\n".join(["Root"] + [f"    Topic {i}\n        Detail {i}" for i in range(40)]))
+        serial = draw_mind_map(structure)
+        self.assertGreater(serial.height, DEFAULT_TILE_SIZE)
+        parallel = draw_mind_map(structure, workers=2)
+        self.assertEqual(parallel.size, serial.size)
+        self.assertEqual(parallel.tobytes(), serial.tobytes())
+
+    def test_export_tiled(self):
+        """Test the tiled mode of export_xmind_to_png."""
+        xmind_path = os.path.join(self.directory, "map.xmind")
+        create_xmind_from_structure(parse_text(TEXT), xmind_path, profile="lean")
+        dzi_path = export_xmind_to_png(xmind_path, tiled=True, tile_size=256)
+        self.assertEqual(dzi_path, os.path.join(self.directory, "map.dzi"))
+        self.assertTrue(os.path.isdir(os.path.join(self.directory, "map_files")))
+
+if __name__ == '__main__':
+    unittest.main()
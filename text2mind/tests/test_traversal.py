@@ -0,0 +1,110 @@
+import unittest
+import sys
+import os
+import tempfile
+import shutil
+
+# Add the parent directory to the path so we can import the src module
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.compact_tree import CompactTree, NO_NODE, compute_tree_stats
+from src.traversal import walk, iter_preorder, count_subtree, trees_equal
+from src.xmind_generator import count_nodes, generate_topic_xml_optimized, create_content_xml, draw_mind_map
+
+CHAIN_DEPTH = 100000
+
+def build_dict_chain(depth):
+    """Build a chain of nested dicts, one node per level."""
+    root = {"title": "node 0", "topics": []}
+    node = root
+    for i in range(1, depth):
+        child = {"title": f"node {i}", "topics": []}
+        node["topics"].append(child)
+        node = child
+    return root
+
+def build_compact_chain(depth):
+    """Build a chain as a CompactTree."""
+    tree = CompactTree()
+    parent = NO_NODE
+    for i in range(depth):
+        parent = tree.add_node(parent, f"node {i}")
+    return tree
+
+class TestTraversal(unittest.TestCase):
+    
+    def test_walk_order(self):
+        """Test enter/exit order and the arguments passed to callbacks."""
+        structure = {"title": "R", "topics": [
+            {"title": "A", "topics": [{"title": "A1", "topics": []}]},
+            {"title": "B", "topics": []},
+        ]}
+        events = []
+        walk(structure,
+             enter=lambda node, depth, index, children: events.append(("enter", node["title"], depth, index)),
+             exit=lambda node, depth, index, children: events.append(("exit", node["title"])))
+        
+        self.assertEqual(events, [
+            ("enter", "R", 0, 0),
+            ("enter", "A", 1, 0),
+            ("enter", "A1", 2, 0),
+            ("exit", "A1"),
+            ("exit", "A"),
+            ("enter", "B", 1, 1),
+            ("exit", "B"),
+            ("exit", "R"),
+        ])
+    
+    def test_walk_skip_children(self):
+        """Test that returning False from enter skips the subtree."""
+        tree = CompactTree()
+        root = tree.add_node(NO_NODE, "R")
+        a = tree.add_node(root, "A")
+        tree.add_node(a, "A1")
+        tree.add_node(root, "B")
+        
+        visited = []
+        def enter(node, depth, index, children):
+            visited.append(tree.title(node))
+            return depth < 1
+        walk(tree, enter)
+        
+        self.assertEqual(visited, ["R", "A", "B"])
+        self.assertEqual([tree.title(n) for n, _ in iter_preorder(tree)], ["R", "A", "A1", "B"])
+    
+    def test_deep_dict_chain(self):
+        """Test that every walk handles a depth-100k dict chain."""
+        chain = build_dict_chain(CHAIN_DEPTH)
+        
+        self.assertEqual(count_nodes(chain), CHAIN_DEPTH)
+        self.assertEqual(count_subtree(chain), CHAIN_DEPTH)
+        self.assertTrue(trees_equal(chain, build_dict_chain(CHAIN_DEPTH)))
+        
+        stats = compute_tree_stats(chain)
+        self.assertEqual(stats["max_depth"], CHAIN_DEPTH - 1)
+        
+        xml = generate_topic_xml_optimized(chain, "root_0", "map")
+        self.assertEqual(xml.count("<topic "), CHAIN_DEPTH)
+        self.assertEqual(xml.count("</topic>"), CHAIN_DEPTH)
+        self.assertLess(len(xml), CHAIN_DEPTH * 300)
+        
+        draw_mind_map(chain)
+    
+    def test_deep_compact_chain(self):
+        """Test that every walk handles a depth-100k compact chain."""
+        tree = build_compact_chain(CHAIN_DEPTH)
+        
+        self.assertEqual(count_subtree(tree), CHAIN_DEPTH)
+        self.assertEqual(compute_tree_stats(tree)["level_histogram"], [1] * CHAIN_DEPTH)
+        self.assertTrue(trees_equal(tree.to_dict(), build_dict_chain(CHAIN_DEPTH)))
+        
+        temp_dir = tempfile.mkdtemp()
+        try:
+            content_path = create_content_xml(temp_dir, tree, "map")
+            with open(content_path, encoding="utf-8") as f:
+                self.assertEqual(f.read().count("</topic>"), CHAIN_DEPTH)
+        finally:
+            shutil.rmtree(temp_dir)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,200 @@
+import unittest
+import sys
+import os
+import tempfile
+import shutil
+import io
+import json
+import zipfile
+import time
+from PIL import Image, ImageChops
+
+# Add the parent directory to the path so we can import the src module
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from xmindparser import xmind_to_dict
+
+from src.parser import parse_text
+from src.compact_tree import CompactTree
+from src.xmind_generator import (create_xmind_from_structure, render_structure, export_xmind_to_png, render_thumbnail,
+                                 plan_shards)
+from src.archive import COMPRESSION_STRATEGIES
+
+TEXT = """Root Topic
+    Subtopic 1
+        Sub-subtopic A
+        Sub-subtopic B
+    Subtopic 2 & <more>
+        Sub-subtopic C"""
+
+def titles_of(topic):
+    """Return the nested (title, children) tuples of an xmindparser topic."""
+    return (topic['title'], [titles_of(child) for child in topic.get('topics', [])])
+
+class TestXmindGenerator(unittest.TestCase):
+    
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+    
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+    
+    def convert(self, profile):
+        output_path = os.path.join(self.directory, f"{profile}.xmind")
+        self.assertEqual(create_xmind_from_structure(parse_text(TEXT), output_path, profile=profile), output_path)
+        return output_path
+    
+    def test_lean_profile_is_readable(self):
+        """Test that lean output re-opens with xmindparser and keeps the whole tree."""
+        standard_path = self.convert("standard")
+        lean_path = self.convert("lean")
+        
+        expected = ('Root Topic', [
+            ('Subtopic 1', [('Sub-subtopic A', []), ('Sub-subtopic B', [])]),
+            ('Subtopic 2 & <more>', [('Sub-subtopic C', [])]),
+        ])
+        for path in (standard_path, lean_path):
+            sheets = xmind_to_dict(path)
+            self.assertEqual(titles_of(sheets[0]['topic']), expected)
+    
+    def test_lean_profile_omits_padding(self):
+        """Test that lean output has no padding entry and is much smaller."""
+        standard_path = self.convert("standard")
+        lean_path = self.convert("lean")
+        
+        with zipfile.ZipFile(lean_path) as archive:
+            names = archive.namelist()
+            manifest = archive.read('META-INF/manifest.xml').decode('utf-8')
+        self.assertNotIn('attachments/padding.bin', names)
+        self.assertNotIn('padding.bin', manifest)
+        self.assertIn('content.xml', names)
+        self.assertLess(os.path.getsize(lean_path) * 10, os.path.getsize(standard_path))
+    
+    def test_compression_strategies(self):
+        """Test that every compression strategy produces a readable file."""
+        for compression in COMPRESSION_STRATEGIES:
+            output_path = os.path.join(self.directory, f"{compression}.xmind")
+            create_xmind_from_structure(parse_text(TEXT), output_path, profile="lean", compression=compression)
+            with zipfile.ZipFile(output_path) as archive:
+                self.assertIsNone(archive.testzip())
+            self.assertEqual(xmind_to_dict(output_path)[0]['topic']['title'], 'Root Topic')
+    
+    def test_deterministic_output(self):
+        """Test that deterministic mode produces identical bytes on every run."""
+        structure = parse_text(TEXT)
+        for profile, compression in (("standard", "balanced"), ("lean", "parallel")):
+            outputs = []
+            for _ in range(2):
+                target = io.BytesIO()
+                create_xmind_from_structure(structure, target, profile=profile, compression=compression,
+                                            deterministic=True)
+                outputs.append(target.getvalue())
+            self.assertEqual(outputs[0], outputs[1])
+        
+        with zipfile.ZipFile(io.BytesIO(outputs[0])) as archive:
+            # ZIP 时间的精度为2秒
+            self.assertEqual({info.date_time[:5] for info in archive.infolist()}, {(2021, 3, 17, 10, 4)})
+            self.assertIn('id="root_1_0"', archive.read('content.xml').decode('utf-8'))
+    
+    def test_json_format(self):
+        """Test the XMind Zen content.json output."""
+        output_path = os.path.join(self.directory, "zen.xmind")
+        create_xmind_from_structure(parse_text(TEXT), output_path, profile="lean", format="json")
+        
+        with zipfile.ZipFile(output_path) as archive:
+            self.assertEqual(sorted(archive.namelist()),
+                             ['Thumbnails/thumbnail.png', 'content.json', 'manifest.json', 'metadata.json'])
+            sheets = json.loads(archive.read('content.json'))
+            manifest = json.loads(archive.read('manifest.json'))
+        
+        self.assertEqual(sheets[0]['rootTopic']['title'], 'Root Topic')
+        self.assertEqual(sheets[0]['rootTopic']['children']['attached'][1]['id'], 'root_1')
+        self.assertIn('content.json', manifest['file-entries'])
+        
+        sheets = xmind_to_dict(output_path)
+        self.assertEqual(titles_of(sheets[0]['topic'])[1][1], ('Subtopic 2 & <more>', [('Sub-subtopic C', [])]))
+    
+    def test_sharded_sheets(self):
+        """Test that budget sharding splits the map into linked sheets without losing topics."""
+        output_path = os.path.join(self.directory, "sharded.xmind")
+        create_xmind_from_structure(parse_text(TEXT), output_path, profile="lean", shard="budget", shard_budget=4)
+        
+        sheets = xmind_to_dict(output_path)
+        self.assertEqual(len(sheets), 3)
+        overview = titles_of(sheets[0]['topic'])
+        self.assertEqual(overview, ('Root Topic', [('Subtopic 1 (3)', []), ('Subtopic 2 & <more> (2)', [])]))
+        self.assertEqual(titles_of(sheets[1]['topic']), ('Subtopic 1', [('Sub-subtopic A', []), ('Sub-subtopic B', [])]))
+        self.assertEqual(titles_of(sheets[2]['topic']), ('Subtopic 2 & <more>', [('Sub-subtopic C', [])]))
+        
+        create_xmind_from_structure(parse_text(TEXT), output_path, profile="lean", format="json", shard="topic",
+                                    shard_budget=4)
+        with zipfile.ZipFile(output_path) as archive:
+            sheets = json.loads(archive.read('content.json'))
+        links = [topic['href'] for topic in sheets[0]['rootTopic']['children']['attached']]
+        self.assertEqual(links, ['xmind:#' + sheet['id'] for sheet in sheets[1:]])
+        
+        # 小于预算的导图不拆分
+        create_xmind_from_structure(parse_text(TEXT), output_path, profile="lean", format="json", shard="topic")
+        self.assertEqual(len(xmind_to_dict(output_path)), 1)
+    
+    def test_topic_shards_merge_small_topics(self):
+        """Test that topic sharding gives large topics their own sheet and packs small ones up to the budget."""
+        lines = ["Root", "    Large"] + [f"        Detail {i}" for i in range(30)]
+        lines += [f"    Small {i}" for i in range(250)]
+        structure = parse_text("\n".join(lines))
+        shards = plan_shards(structure, "topic", 100)
+        self.assertEqual([shard.node_count for shard in shards], [31, 100, 100, 50])
+        self.assertEqual([len(shard.topics) for shard in shards], [1, 100, 100, 50])
+    
+    def test_render_structure(self):
+        """Test rendering straight from the structure matches exporting the generated file."""
+        structure = parse_text(TEXT)
+        png = render_structure(structure)
+        self.assertTrue(png.startswith(b'\x89PNG'))
+        
+        xmind_path = os.path.join(self.directory, "map.xmind")
+        create_xmind_from_structure(structure, xmind_path, profile="lean")
+        with open(export_xmind_to_png(xmind_path), 'rb') as f:
+            self.assertEqual(f.read(), png)
+        
+        jpeg_path = os.path.join(self.directory, "map.jpeg")
+        self.assertEqual(render_structure(structure, jpeg_path, fmt="jpeg"), jpeg_path)
+        with open(jpeg_path, 'rb') as f:
+            self.assertEqual(f.read(2), b'\xff\xd8')
+        with self.assertRaises(ValueError):
+            render_structure(structure, fmt="gif")
+    
+    def test_structure_thumbnail(self):
+        """Test that the archive thumbnail is a miniature of the map itself."""
+        output_path = os.path.join(self.directory, "map.xmind")
+        create_xmind_from_structure(parse_text(TEXT), output_path, profile="lean")
+        with zipfile.ZipFile(output_path) as z:
+            self.assertEqual(z.read('Thumbnails/thumbnail.png'), render_thumbnail(parse_text(TEXT)))
+
+        with Image.open(io.BytesIO(render_thumbnail(parse_text(TEXT)))) as img:
+            self.assertEqual(img.size, (128, 128))
+            self.assertIsNotNone(ImageChops.invert(img.convert('RGB')).getbbox())
+        self.assertNotEqual(render_thumbnail(parse_text("Root\n    Only child")), render_thumbnail(parse_text(TEXT)))
+
+    def test_thumbnail_cost(self):
+        """Benchmark: the thumbnail of a huge map costs no more than a few milliseconds."""
+        tree = CompactTree()
+        tree.add_node(-1, "Root")
+        for i in range(200000):
+            tree.add_node(0 if i < 1000 else 1 + i % 1000, f"Topic {i}")
+
+        timings = []
+        for _ in range(5):
+            start = time.perf_counter()
+            render_thumbnail(tree)
+            timings.append(time.perf_counter() - start)
+        # 目标是几毫秒，取多次中最快的一次以排除偶发的调度延迟
+        self.assertLess(min(timings), 0.015)
+
+    def test_unknown_profile(self):
+        """Test that an unknown profile is rejected."""
+        with self.assertRaises(ValueError):
+            create_xmind_from_structure(parse_text(TEXT), os.path.join(self.directory, "x.xmind"), profile="tiny")
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,142 @@
+import unittest
+import sys
+import os
+import io
+import json
+import zipfile
+from unittest import mock
+
+# Add the parent directory to the path so we can import the src module
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.parser import parse_text, iter_outline_events
+from src.xmind_generator import create_xmind_from_structure
+from src import xmind_reader
+from src.xmind_reader import read_xmind, iter_xmind_events, iter_content_xml_events, iter_content_json_events
+from src.traversal import trees_equal
+
+TEXT = """Root Topic
+    Subtopic 1
+        Sub-subtopic A
+        Sub-subtopic B
+    Subtopic 2 & <more>
+        Sub-subtopic C
+            Deep "quoted" 中文
+    Subtopic 3"""
+
+def write_xmind(structure, output_format):
+    target = io.BytesIO()
+    create_xmind_from_structure(structure, target, profile="lean", format=output_format)
+    target.seek(0)
+    return target
+
+class TestXmindReader(unittest.TestCase):
+    
+    def test_round_trip(self):
+        """Test that generated files read back to the parsed structure, in both formats."""
+        structure = parse_text(TEXT)
+        expected = list(iter_outline_events(io.StringIO(TEXT)))
+        for output_format in ("xml", "json"):
+            self.assertEqual(list(iter_xmind_events(write_xmind(structure, output_format))), expected)
+            
+            result = read_xmind(write_xmind(structure, output_format))
+            self.assertTrue(trees_equal(result, structure))
+            self.assertEqual(result["stats"], structure["stats"])
+            
+            compact = read_xmind(write_xmind(structure, output_format), compact=True)
+            self.assertTrue(trees_equal(compact.to_dict(), structure))
+    
+    def test_sharded_round_trip(self):
+        """Test that the sheets of a sharded map are stitched back into the original map."""
+        lines = ["Root", "    Large"] + [f"        Detail {i}" for i in range(30)]
+        lines += [f"    Small {i}" for i in range(40)]
+        structure = parse_text("\n".join(lines))
+        for output_format in ("xml", "json"):
+            for shard in ("topic", "budget"):
+                target = io.BytesIO()
+                create_xmind_from_structure(structure, target, profile="lean", format=output_format,
+                                            shard=shard, shard_budget=20)
+                target.seek(0)
+                self.assertTrue(trees_equal(read_xmind(target), structure), (output_format, shard))
+    
+    def test_sheet_links_are_not_shards(self):
+        """Test that an ordinary map linking to another sheet is read as its first sheet."""
+        xml = b"""<?xml version="1.0" encoding="UTF-8"?>
+<xmap-content xmlns="urn:xmind:xmap:xmlns:content:2.0" xmlns:xlink="http://www.w3.org/1999/xlink">
+  <sheet id="s1">
+    <topic id="root">
+      <title>Project</title>
+      <children><topics type="attached">
+        <topic id="link" xlink:href="xmind:#s2"><title>See details</title></topic>
+        <topic id="budget"><title>Budget</title>
+          <children><topics type="attached"><topic id="q1"><title>Q1</title></topic></topics></children>
+        </topic>
+      </topics></children>
+    </topic>
+  </sheet>
+  <sheet id="s2"><topic id="details"><title>Details sheet</title></topic></sheet>
+</xmap-content>"""
+        expected = list(iter_outline_events(io.StringIO("Project\n    See details\n    Budget\n        Q1")))
+        self.assertEqual(list(iter_content_xml_events(io.BytesIO(xml))), expected)
+        
+        # 即使链接主题的ID像总览主题，带子主题的也不是总览
+        xml = xml.replace(b'id="link"', b'id="overview_0"').replace(b'id="budget"', b'id="overview_1" xlink:href="xmind:#s2"')
+        self.assertEqual(list(iter_content_xml_events(io.BytesIO(xml))), expected)
+        
+        sheets = [{"id": "s1", "rootTopic": {"id": "root", "title": "Project", "children": {"attached": [
+                      {"id": "link", "title": "See details", "href": "xmind:#s2"},
+                      {"id": "budget", "title": "Budget", "children": {"attached": [{"id": "q1", "title": "Q1"}]}}]}}},
+                  {"id": "s2", "rootTopic": {"id": "details", "title": "Details sheet"}}]
+        self.assertEqual(list(iter_content_json_events(json.dumps(sheets).encode('utf-8'))), expected)
+    
+    def test_skips_detached_topics(self):
+        """Test that floating topics and sheet titles are not read as attached topics."""
+        xml = b"""<?xml version="1.0" encoding="UTF-8"?>
+<xmap-content xmlns="urn:xmind:xmap:xmlns:content:2.0">
+  <sheet id="s1">
+    <topic id="root">
+      <title>Root</title>
+      <children>
+        <topics type="attached"><topic id="a"><title>A</title></topic></topics>
+        <topics type="detached"><topic id="f"><title>Floating</title></topic></topics>
+      </children>
+    </topic>
+    <title>Sheet 1</title>
+  </sheet>
+  <sheet id="s2"><topic id="other"><title>Other sheet</title></topic></sheet>
+</xmap-content>"""
+        events = list(iter_content_xml_events(io.BytesIO(xml)))
+        self.assertEqual(events, [("open", 0, "Root"), ("open", 1, "A"), ("close", 1, None), ("close", 0, None)])
+    
+    def test_json_streaming(self):
+        """Test that content.json read from a stream gives the same events with and without ijson."""
+        sheets = [{"id": "s1", "class": "sheet", "title": "Sheet 1", "rootTopic": {
+            "id": "root", "title": "Root", "style": {"properties": {}},
+            "children": {
+                "attached": [{"id": "a", "title": "A", "children": {"attached": [{"id": "a1"}]}},
+                             {"id": "b", "title": "B", "markers": [{"markerId": "x"}]}],
+                "detached": [{"id": "f", "title": "Floating"}]}}},
+            {"id": "s2", "rootTopic": {"id": "other", "title": "Other sheet"}}]
+        data = json.dumps(sheets).encode('utf-8')
+        expected = [("open", 0, "Root"), ("open", 1, "A"), ("open", 2, ""), ("close", 2, None), ("close", 1, None),
+                    ("open", 1, "B"), ("close", 1, None), ("close", 0, None)]
+        self.assertEqual(list(iter_content_json_events(data)), expected)
+        if xmind_reader.ijson is not None:
+            self.assertEqual(list(iter_content_json_events(io.BytesIO(data))), expected)
+        with mock.patch.object(xmind_reader, 'ijson', None):
+            self.assertEqual(list(iter_content_json_events(io.BytesIO(data))), expected)
+            
+            structure = parse_text(TEXT)
+            self.assertTrue(trees_equal(read_xmind(write_xmind(structure, "json")), structure))
+    
+    def test_not_an_xmind_file(self):
+        """Test that archives without content are rejected instead of silently replaced."""
+        target = io.BytesIO()
+        with zipfile.ZipFile(target, 'w') as archive:
+            archive.writestr('readme.txt', 'hello')
+        target.seek(0)
+        with self.assertRaises(ValueError):
+            read_xmind(target)
+
+if __name__ == '__main__':
+    unittest.main()